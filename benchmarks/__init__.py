@@ -0,0 +1,5 @@
+"""
+Benchmarks of the service. Run them from the root of the project
+with the same environment as the app (ENV and DB_URL variables), for example:
+python -m benchmarks.serializer
+"""
@@ -0,0 +1,416 @@
+"""
+Generator of a synthetic dataset for the scale testing.
+The rows are written directly into the database of the current ENV
+with COPY (executemany for the other drivers), for example:
+python -m benchmarks.dataset --users 100000 --tweets 1000000 --truncate
+
+The shape of the data is realistic and is the same for the same seed:
+- the followers of the users follow a power law (Zipf by the popularity rank),
+  the number of the followed authors is exponential;
+- the popular users also tweet more;
+- the likes of the tweets are Zipf-distributed;
+- a part of the tweets have 1-4 attachments, hashtags and mentions.
+The ids, the texts and the timestamps are generated, so the same seed
+always gives the same rows
+"""
+
+import argparse
+import asyncio
+import math
+import os
+import random
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Dict, Iterator, List, Set, Tuple
+
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import (
+    AsyncConnection,
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+
+from src.config.config import get_config
+from src.database import queries as q
+from src.database.bulk import Row, copy_rows
+from src.database.models import Base, Image, User
+from src.service.backfill import backfill_entities
+from src.service.images import IMAGES_DIR
+
+DEFAULT_END: datetime = datetime(2024, 10, 1, tzinfo=timezone.utc)
+# the prime, which permutes the popularity ranks into the ids
+_PERMUTATION_PRIME: int = 2_654_435_761
+MAX_ATTACHMENTS: int = 4
+WORDS: Tuple[str, ...] = (
+    "the", "a", "new", "today", "coffee", "python", "database", "query", "fast",
+    "slow", "index", "cache", "feed", "like", "follow", "morning", "weekend",
+    "release", "bug", "fix", "deploy", "server", "latency", "throughput", "team",
+    "music", "movie", "book", "city", "travel", "weather", "rain", "sun", "code",
+    "review", "test", "love", "great", "tired", "happy", "launch", "update",
+)  # fmt: skip
+HASHTAGS: int = 1000
+
+
+@dataclass
+class DatasetConfig:
+    """The size and the shape of the dataset"""
+
+    users: int = 10_000
+    tweets: int = 100_000
+    # mean number of the authors followed by a user
+    follows: int = 20
+    # total number of the likes (approximately)
+    likes: int = 500_000
+    # fraction of the tweets with attachments
+    attachments: float = 0.2
+    # fraction of the tweets with a hashtag and with a mention
+    hashtags: float = 0.1
+    mentions: float = 0.05
+    # exponent of the Zipf distributions
+    zipf: float = 1.1
+    seed: int = 42
+    # the tweets are spread over the days before end
+    days: int = 30
+    end: datetime = DEFAULT_END
+
+
+class ZipfSampler:
+    """
+    The sampler of the ids 1..n with the Zipf distribution of the popularity.
+    The ranks are sampled from the continuous bounded power law
+    (inverse transform, O(1) memory), and the ranks are permuted into the ids,
+    so the popular ids are spread over the table
+    :param n: number of the ids
+    :param exponent: exponent of the distribution, > 0
+    """
+
+    def __init__(self, n: int, exponent: float) -> None:
+        self.n = n
+        self.exponent = exponent
+        self._power: float = 1.0 - exponent
+        # the permutation must be a bijection of 0..n-1
+        self._prime: int = (
+            _PERMUTATION_PRIME if math.gcd(_PERMUTATION_PRIME, n) == 1 else 1
+        )
+
+    def rank(self, rng: random.Random) -> int:
+        """The method returns the popularity rank, 1 is the most popular"""
+        u: float = rng.random()
+        if abs(self._power) < 1e-9:
+            value: float = math.exp(u * math.log(self.n + 1))
+        else:
+            value = (u * ((self.n + 1) ** self._power - 1) + 1) ** (1 / self._power)
+        return min(int(value), self.n)
+
+    def id_of_rank(self, rank: int) -> int:
+        """The method returns the id of the rank"""
+        return (rank - 1) * self._prime % self.n + 1
+
+    def sample(self, rng: random.Random) -> int:
+        """The method returns a random id"""
+        return self.id_of_rank(self.rank(rng))
+
+
+class DatasetGenerator:
+    """
+    The generator of the rows of the tables. Every table has its own
+    random generator derived from the seed, so the rows of a table
+    do not depend on the sizes of the other tables
+    :param config: the size and the shape of the dataset
+    """
+
+    def __init__(self, config: DatasetConfig) -> None:
+        self.config = config
+        self.users = ZipfSampler(config.users, config.zipf)
+        self.tweets = ZipfSampler(config.tweets, config.zipf)
+        self.hashtags = ZipfSampler(HASHTAGS, config.zipf)
+        self.start: datetime = config.end - timedelta(days=config.days)
+        self._tweet_step: float = config.days * 86400 / max(config.tweets, 1)
+
+    def _rng(self, table: str) -> random.Random:
+        return random.Random(f"{self.config.seed}:{table}")
+
+    def _count(self, rng: random.Random, mean: float, limit: int) -> int:
+        """Exponentially distributed number with the mean, at most limit"""
+        return min(int(rng.expovariate(1 / mean)) if mean > 0 else 0, limit)
+
+    def tweet_created_at(self, tweet_id: int) -> datetime:
+        """The tweets are evenly spread in time, in the order of their ids"""
+        return self.start + timedelta(seconds=(tweet_id - 1) * self._tweet_step)
+
+    def users_rows(self) -> Iterator[Row]:
+        """(id, name, api_key)"""
+        for user_id in range(1, self.config.users + 1):
+            yield user_id, f"user_{user_id}", f"api_key_{user_id}"
+
+    def following_rows(self) -> Iterator[Row]:
+        """(follower_id, author_id, created_at)"""
+        rng: random.Random = self._rng("following")
+        span: float = self.config.days * 86400
+        for follower_id in range(1, self.config.users + 1):
+            num: int = self._count(rng, self.config.follows, self.config.users - 1)
+            authors: Set[int] = set()
+            # the popular authors are drawn again and again, so the tries are bounded
+            for _ in range(num * 3):
+                if len(authors) >= num:
+                    break
+                author_id: int = self.users.sample(rng)
+                if author_id != follower_id:
+                    authors.add(author_id)
+            for author_id in sorted(authors):
+                created_at = self.start + timedelta(seconds=rng.random() * span)
+                yield follower_id, author_id, created_at
+
+    def _tweet_text(self, rng: random.Random) -> str:
+        words: List[str] = rng.choices(WORDS, k=rng.randint(3, 30))
+        if rng.random() < self.config.hashtags:
+            words.insert(rng.randint(0, len(words)), f"#tag{self.hashtags.rank(rng)}")
+        if rng.random() < self.config.mentions:
+            words.insert(rng.randint(0, len(words)), f"@user_{self.users.sample(rng)}")
+        return " ".join(words)
+
+    def tweets_rows(self) -> Iterator[Row]:
+        """(id, tweet_data, user_id, created_at). The prolific authors are popular"""
+        rng: random.Random = self._rng("tweets")
+        for tweet_id in range(1, self.config.tweets + 1):
+            yield (
+                tweet_id,
+                self._tweet_text(rng),
+                self.users.sample(rng),
+                self.tweet_created_at(tweet_id),
+            )
+
+    def images_rows(self) -> Iterator[Row]:
+        """(id, tweet_id)"""
+        rng: random.Random = self._rng("images")
+        image_id: int = 0
+        for tweet_id in range(1, self.config.tweets + 1):
+            if rng.random() < self.config.attachments:
+                for _ in range(rng.randint(1, MAX_ATTACHMENTS)):
+                    image_id += 1
+                    yield image_id, tweet_id
+
+    def likes_rows(self) -> Iterator[Row]:
+        """(user_id, tweet_id, created_at). A like is never older than the tweet"""
+        rng: random.Random = self._rng("likes")
+        mean: float = self.config.likes / max(self.config.users, 1)
+        for user_id in range(1, self.config.users + 1):
+            num: int = self._count(rng, mean, self.config.tweets)
+            tweets: Set[int] = set()
+            for _ in range(num * 3):
+                if len(tweets) >= num:
+                    break
+                tweets.add(self.tweets.sample(rng))
+            for tweet_id in sorted(tweets):
+                tweet_time: datetime = self.tweet_created_at(tweet_id)
+                delay: float = (self.config.end - tweet_time).total_seconds()
+                yield user_id, tweet_id, tweet_time + timedelta(
+                    seconds=rng.random() * delay
+                )
+
+
+# the secondary indexes of the tables, i.e. without the constraints' indexes
+INDEXES_SQL: str = (
+    "SELECT indexname, indexdef FROM pg_indexes"
+    " WHERE schemaname = current_schema() AND tablename = ANY(:tables)"
+    " AND NOT EXISTS (SELECT 1 FROM pg_constraint"
+    " WHERE conindid = format('%I.%I', schemaname, indexname)::regclass)"
+)
+FOREIGN_KEYS_SQL: str = (
+    "SELECT conrelid::regclass::text, conname, pg_get_constraintdef(oid)"
+    " FROM pg_constraint WHERE contype = 'f'"
+    " AND conrelid::regclass::text = ANY(:tables)"
+)
+
+
+@asynccontextmanager
+async def without_indexes(
+    conn: AsyncConnection, tables: List[str]
+) -> AsyncIterator[None]:
+    """
+    The context manager drops the secondary indexes and the foreign keys
+    of the tables, and creates them again after the block.
+    Building an index once and checking a foreign key with one join
+    are much faster than maintaining them row by row (PostgreSQL only)
+    """
+    if conn.dialect.name != "postgresql":
+        yield
+        return
+    params: Dict[str, Any] = {"tables": tables}
+    indexes: List[Row] = [
+        tuple(row) for row in await conn.execute(text(INDEXES_SQL), params)
+    ]
+    foreign_keys: List[Row] = [
+        tuple(row) for row in await conn.execute(text(FOREIGN_KEYS_SQL), params)
+    ]
+    for table, name, _ in foreign_keys:
+        await conn.execute(text(f'ALTER TABLE {table} DROP CONSTRAINT "{name}"'))
+    for name, _ in indexes:
+        await conn.execute(text(f'DROP INDEX "{name}"'))
+    yield
+    for _, definition in indexes:
+        await conn.execute(text(definition))
+    for table, name, definition in foreign_keys:
+        await conn.execute(
+            text(f'ALTER TABLE {table} ADD CONSTRAINT "{name}" {definition}')
+        )
+
+
+# the tables in the order of writing -> the columns of the generated rows
+COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "users": ("id", "name", "api_key"),
+    "following": ("follower_id", "author_id", "created_at"),
+    "tweets": ("id", "tweet_data", "user_id", "created_at"),
+    "images": ("id", "tweet_id"),
+    "likes": ("user_id", "tweet_id", "created_at"),
+}
+
+
+async def generate(
+    engine: AsyncEngine,
+    config: DatasetConfig,
+    batch_size: int = 10_000,
+    truncate: bool = False,
+    gravity: float = q.DEFAULT_GRAVITY,
+) -> Dict[str, int]:
+    """
+    The function writes the dataset into the empty tables
+    (or truncates them first), counts the likes and the scores of the tweets,
+    indexes their hashtags and mentions, and updates the statistics of the tables
+    :param engine: engine of the database
+    :param config: the size and the shape of the dataset
+    :param batch_size: rows per COPY
+    :param truncate: delete the existing rows first
+    :param gravity: gravity of the popularity scores
+    :return: table name -> number of the written rows
+    """
+    generator = DatasetGenerator(config)
+    counts: Dict[str, int] = dict()
+    async with engine.begin() as conn:
+        # the transaction is started before COPY, so COPY is a part of it
+        if truncate:
+            names: str = ", ".join(COLUMNS)
+            await conn.execute(text(f"TRUNCATE {names} RESTART IDENTITY CASCADE"))
+        elif await conn.scalar(select(func.count()).select_from(User)):
+            raise RuntimeError("The tables are not empty, use --truncate")
+
+        async with without_indexes(conn, list(COLUMNS)):
+            for name, columns in COLUMNS.items():
+                rows: Iterator[Row] = getattr(generator, f"{name}_rows")()
+                counts[name] = await copy_rows(
+                    conn, Base.metadata.tables[name], columns, rows, batch_size
+                )
+
+        await conn.execute(
+            text(
+                "UPDATE tweets SET likes_count = counts.n FROM"
+                " (SELECT tweet_id, count(*) AS n FROM likes GROUP BY tweet_id) counts"
+                " WHERE tweets.id = counts.tweet_id"
+            )
+        )
+        # the ids were given explicitly, the next ones continue after them
+        for name in COLUMNS:
+            await conn.execute(
+                text(
+                    f"SELECT setval(pg_get_serial_sequence('{name}', 'id'),"
+                    f" (SELECT coalesce(max(id), 0) + 1 FROM {name}), false)"
+                )
+            )
+
+    async with AsyncSession(engine) as session:
+        await q.refresh_scores(session, gravity)
+    # the hashtags and the mentions of the texts
+    await backfill_entities(
+        async_sessionmaker(engine, expire_on_commit=False), batch_size, restart=True
+    )
+    async with engine.connect() as conn:
+        await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text("ANALYZE"))
+    return counts
+
+
+def write_image_files(num_images: int, directory: str = IMAGES_DIR) -> None:
+    """
+    The function writes the placeholder files of the images,
+    so the attachments of the generated tweets have file names
+    """
+    os.makedirs(directory, exist_ok=True)
+    for image_id in range(1, num_images + 1):
+        path: str = os.path.join(directory, f"{image_id}.jpg")
+        if not os.path.exists(path):
+            with open(path, "wb") as file:
+                file.write(b"\xff\xd8\xff\xd9")
+
+
+async def run(args: argparse.Namespace) -> None:
+    config = DatasetConfig(
+        users=args.users,
+        tweets=args.tweets,
+        follows=args.follows,
+        likes=args.likes,
+        attachments=args.attachments,
+        zipf=args.zipf,
+        seed=args.seed,
+        days=args.days,
+        end=datetime.fromisoformat(args.end),
+    )
+    app_config = get_config()
+    engine: AsyncEngine = create_async_engine(app_config.db.url)
+    start: float = time.perf_counter()
+    try:
+        counts: Dict[str, int] = await generate(
+            engine, config, args.batch_size, args.truncate, app_config.ranking.gravity
+        )
+    finally:
+        await engine.dispose()
+    seconds: float = time.perf_counter() - start
+    if args.image_files:
+        write_image_files(counts[Image.__tablename__])
+
+    total: int = sum(counts.values())
+    for table, num in counts.items():
+        print(f"{table:<12} {num:>12,} rows")
+    print(f"{total:,} rows in {seconds:.1f} s, {total / seconds:,.0f} rows/s")
+
+
+def main() -> None:
+    defaults = DatasetConfig()
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--users", type=int, default=defaults.users)
+    parser.add_argument("--tweets", type=int, default=defaults.tweets)
+    parser.add_argument(
+        "--follows", type=int, default=defaults.follows, help="mean per user"
+    )
+    parser.add_argument("--likes", type=int, default=defaults.likes, help="total")
+    parser.add_argument(
+        "--attachments",
+        type=float,
+        default=defaults.attachments,
+        help="fraction of the tweets with images",
+    )
+    parser.add_argument("--zipf", type=float, default=defaults.zipf)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--days", type=int, default=defaults.days)
+    parser.add_argument(
+        "--end", default=defaults.end.isoformat(), help="time of the last tweet"
+    )
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument(
+        "--truncate", action="store_true", help="delete the existing rows first"
+    )
+    parser.add_argument(
+        "--image-files",
+        action="store_true",
+        help="write placeholder files of the images",
+    )
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,414 @@
+"""
+Benchmark of the endpoints. The real app runs in-process (httpx ASGITransport,
+as in the tests) against the database of the current ENV, which is seeded
+with benchmarks.dataset. For every scenario the latency percentiles
+and the throughput are measured and saved as JSON, for example:
+python -m benchmarks.dataset --truncate
+python -m benchmarks.endpoints run --output results.json
+python -m benchmarks.endpoints compare baseline.json results.json
+
+The mutations are undone after the measurement of every scenario,
+so the dataset stays the same
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient, Response
+from sqlalchemy import delete, func, select
+
+from src.api.routes import create_app
+from src.config.config import get_config
+from src.database.engine import Database
+from src.database.models import Image, Tweet, User
+from src.service.images import delete_images_by_ids
+
+# the metrics of the results and whether the higher value is better
+METRICS: Dict[str, bool] = {
+    "p50_ms": False,
+    "p95_ms": False,
+    "p99_ms": False,
+    "throughput_rps": True,
+}
+DEFAULT_THRESHOLD: float = 0.1
+IMAGE_SIZE: int = 64 * 1024
+
+
+@dataclass
+class BenchmarkContext:
+    """The dataset and the objects created by the scenarios"""
+
+    users: int
+    tweets: int
+    rng: random.Random
+    image: bytes
+    created_tweets: List[int] = field(default_factory=list)
+    uploaded_images: List[int] = field(default_factory=list)
+    # the pairs of the likes and the follows, which are undone after the scenario
+    pairs: Set[Tuple[int, int]] = field(default_factory=set)
+
+    def api_key(self, user_id: Optional[int] = None) -> Dict[str, str]:
+        """The headers of a user, a random one by default (see benchmarks.dataset)"""
+        if user_id is None:
+            user_id = self.user_id()
+        return {"api-key": f"api_key_{user_id}"}
+
+    def user_id(self) -> int:
+        return self.rng.randint(1, self.users)
+
+    def tweet_id(self) -> int:
+        return self.rng.randint(1, self.tweets)
+
+    def new_pair(
+        self, first: Callable[[], int], second: Callable[[], int], distinct: bool
+    ) -> Tuple[int, int]:
+        """
+        The method returns a random pair of ids, which is not used yet
+        :param distinct: the ids must be different, e.g. a user does not follow self
+        """
+        pair: Tuple[int, int] = (first(), second())
+        while pair in self.pairs or (distinct and pair[0] == pair[1]):
+            pair = (first(), second())
+        self.pairs.add(pair)
+        return pair
+
+
+# a scenario makes the measured request and returns its response
+# and an optional request, which undoes the mutation and is not measured
+Scenario = Callable[
+    [AsyncClient, BenchmarkContext],
+    Awaitable[Tuple[Response, Optional[Callable[[], Awaitable[Response]]]]],
+]
+
+
+async def create_tweet(client: AsyncClient, ctx: BenchmarkContext):
+    response = await client.post(
+        "/api/tweets",
+        json={"tweet_data": "benchmark tweet #benchmark"},
+        headers=ctx.api_key(),
+    )
+    if response.status_code == 201:
+        ctx.created_tweets.append(response.json()["tweet_id"])
+    return response, None
+
+
+async def like(client: AsyncClient, ctx: BenchmarkContext):
+    tweet_id, user_id = ctx.new_pair(ctx.tweet_id, ctx.user_id, distinct=False)
+    url: str = f"/api/tweets/{tweet_id}/likes"
+    headers: Dict[str, str] = ctx.api_key(user_id)
+    response = await client.post(url, headers=headers)
+    return response, lambda: client.delete(url, headers=headers)
+
+
+async def follow(client: AsyncClient, ctx: BenchmarkContext):
+    follower_id, author_id = ctx.new_pair(ctx.user_id, ctx.user_id, distinct=True)
+    url: str = f"/api/users/{author_id}/follow"
+    headers: Dict[str, str] = ctx.api_key(follower_id)
+    response = await client.post(url, headers=headers)
+    return response, lambda: client.delete(url, headers=headers)
+
+
+async def popular_feed(client: AsyncClient, ctx: BenchmarkContext):
+    return await client.get("/api/tweets", headers=ctx.api_key()), None
+
+
+async def chronological_feed(client: AsyncClient, ctx: BenchmarkContext):
+    response = await client.get(
+        "/api/tweets", params={"mode": "chronological"}, headers=ctx.api_key()
+    )
+    return response, None
+
+
+async def user_info(client: AsyncClient, ctx: BenchmarkContext):
+    return await client.get("/api/users/me", headers=ctx.api_key()), None
+
+
+async def other_user_info(client: AsyncClient, ctx: BenchmarkContext):
+    return await client.get(f"/api/users/{ctx.user_id()}"), None
+
+
+async def upload_media(client: AsyncClient, ctx: BenchmarkContext):
+    response = await client.post(
+        "/api/medias",
+        files={"file": ("benchmark.jpg", ctx.image, "image/jpeg")},
+        headers=ctx.api_key(),
+    )
+    if response.status_code == 201:
+        ctx.uploaded_images.append(response.json()["media_id"])
+    return response, None
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    "create_tweet": create_tweet,
+    "like": like,
+    "follow": follow,
+    "feed_popular": popular_feed,
+    "feed_chronological": chronological_feed,
+    "user_info": user_info,
+    "other_user_info": other_user_info,
+    "upload_media": upload_media,
+}
+
+
+def summarize(latencies: List[float], errors: int, seconds: float) -> Dict[str, Any]:
+    """
+    The function computes the statistics of a scenario
+    :param latencies: latencies of the requests in seconds
+    :param errors: number of the responses with the error status
+    :param seconds: wall time of the scenario
+    """
+    cuts: List[float] = (
+        statistics.quantiles(latencies, n=100, method="inclusive")
+        if len(latencies) > 1
+        else latencies * 99
+    )
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+        "p50_ms": cuts[49] * 1000,
+        "p95_ms": cuts[94] * 1000,
+        "p99_ms": cuts[98] * 1000,
+        "throughput_rps": len(latencies) / seconds,
+    }
+
+
+async def run_scenario(
+    client: AsyncClient,
+    ctx: BenchmarkContext,
+    scenario: Scenario,
+    requests: int,
+    concurrency: int,
+) -> Dict[str, Any]:
+    """
+    The function makes the requests of the scenario by the concurrent workers.
+    The mutations are undone after the measurement
+    :return: the statistics of the scenario
+    """
+    latencies: List[float] = list()
+    undos: List[Callable[[], Awaitable[Response]]] = list()
+    errors: int = 0
+    remaining: int = requests
+
+    async def worker() -> None:
+        nonlocal errors, remaining
+        while remaining > 0:
+            remaining -= 1
+            start: float = time.perf_counter()
+            response, undo = await scenario(client, ctx)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+            elif undo is not None:
+                undos.append(undo)
+
+    start: float = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    seconds: float = time.perf_counter() - start
+    for undo in undos:
+        await undo()
+    return summarize(latencies, errors, seconds)
+
+
+async def cleanup(client: AsyncClient, ctx: BenchmarkContext, database: Database):
+    """The function deletes the tweets and the images created by the scenarios"""
+    for tweet_id in ctx.created_tweets:
+        async with database.Session() as session:
+            user_id: Optional[int] = await session.scalar(
+                select(Tweet.user_id).where(Tweet.id == tweet_id)
+            )
+        if user_id is not None:
+            await client.delete(f"/api/tweets/{tweet_id}", headers=ctx.api_key(user_id))
+    if ctx.uploaded_images:
+        await delete_images_by_ids(ctx.uploaded_images)
+        async with database.Session() as session:
+            await session.execute(
+                delete(Image).where(Image.id.in_(ctx.uploaded_images))
+            )
+            await session.commit()
+    ctx.created_tweets.clear()
+    ctx.pairs.clear()
+    ctx.uploaded_images.clear()
+
+
+async def run_benchmarks(
+    app: FastAPI,
+    database: Database,
+    scenarios: List[str],
+    requests: int = 200,
+    warmup: int = 20,
+    concurrency: int = 1,
+    seed: int = 42,
+) -> Dict[str, Any]:
+    """
+    The function runs the scenarios against the app
+    :param app: the app
+    :param database: the database of the app, seeded with benchmarks.dataset
+    :param scenarios: names of the scenarios
+    :param requests: measured requests per scenario
+    :param warmup: requests per scenario before the measured ones
+    :param concurrency: concurrent clients
+    :param seed: seed of the random users and tweets
+    :return: the meta information and the statistics by scenario
+    """
+    async with database.Session() as session:
+        users: int = await session.scalar(select(func.max(User.id))) or 0
+        tweets: int = await session.scalar(select(func.max(Tweet.id))) or 0
+    if not users or not tweets:
+        raise RuntimeError("The database is empty, run benchmarks.dataset first")
+
+    rng = random.Random(seed)
+    ctx = BenchmarkContext(users, tweets, rng, rng.randbytes(IMAGE_SIZE))
+    results: Dict[str, Dict[str, Any]] = dict()
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://benchmark"
+    ) as client:
+        for name in scenarios:
+            try:
+                if warmup:
+                    await run_scenario(client, ctx, SCENARIOS[name], warmup, 1)
+                results[name] = await run_scenario(
+                    client, ctx, SCENARIOS[name], requests, concurrency
+                )
+            finally:
+                await cleanup(client, ctx, database)
+    return {
+        "meta": {
+            "time": datetime.now(timezone.utc).isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "users": users,
+            "tweets": tweets,
+            "requests": requests,
+            "warmup": warmup,
+            "concurrency": concurrency,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def compare(
+    baseline: Dict[str, Any],
+    current: Dict[str, Any],
+    threshold: float = DEFAULT_THRESHOLD,
+) -> Tuple[List[str], List[str]]:
+    """
+    The function compares the results with the baseline
+    :param baseline: the stored results
+    :param current: the new results
+    :param threshold: the relative change, which is a regression
+    :return: the report lines and the regressions
+    """
+    lines: List[str] = list()
+    regressions: List[str] = list()
+    for name, result in current["results"].items():
+        base: Optional[Dict[str, Any]] = baseline["results"].get(name)
+        if base is None:
+            lines.append(f"{name:<20} not in the baseline")
+            continue
+        for metric, higher_is_better in METRICS.items():
+            old, new = base[metric], result[metric]
+            change: float = (new - old) / old if old else 0.0
+            worse: float = -change if higher_is_better else change
+            line: str = (
+                f"{name:<20} {metric:<15} {old:10.2f} -> {new:10.2f} {change:+8.1%}"
+            )
+            if worse > threshold:
+                line += "  REGRESSION"
+                regressions.append(line)
+            lines.append(line)
+    return lines, regressions
+
+
+def print_results(results: Dict[str, Any]) -> None:
+    print(
+        f"{'scenario':<20} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+        f" {'req/s':>9} {'errors':>7}"
+    )
+    for name, result in results["results"].items():
+        print(
+            f"{name:<20} {result['p50_ms']:9.2f} {result['p95_ms']:9.2f}"
+            f" {result['p99_ms']:9.2f} {result['throughput_rps']:9.1f}"
+            f" {result['errors']:7d}"
+        )
+
+
+async def run(args: argparse.Namespace) -> None:
+    config = get_config()
+    database = Database.from_config(config.db)
+    app: FastAPI = create_app(config, database)
+    try:
+        results: Dict[str, Any] = await run_benchmarks(
+            app,
+            database,
+            args.scenarios,
+            args.requests,
+            args.warmup,
+            args.concurrency,
+            args.seed,
+        )
+    finally:
+        await database.dispose()
+    print_results(results)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument(
+        "--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS)
+    )
+    run_parser.add_argument("--requests", type=int, default=200)
+    run_parser.add_argument("--warmup", type=int, default=20)
+    run_parser.add_argument("--concurrency", type=int, default=1)
+    run_parser.add_argument("--seed", type=int, default=42)
+    run_parser.add_argument("--output", help="JSON file of the results")
+
+    compare_parser = commands.add_parser(
+        "compare", help="compare the results with the baseline"
+    )
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("results")
+    compare_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="relative change, which is a regression",
+    )
+
+    args = parser.parse_args()
+    if args.command == "run":
+        asyncio.run(run(args))
+        return
+
+    with open(args.baseline) as file:
+        baseline: Dict[str, Any] = json.load(file)
+    with open(args.results) as file:
+        current: Dict[str, Any] = json.load(file)
+    lines, regressions = compare(baseline, current, args.threshold)
+    print("\n".join(lines))
+    if regressions:
+        print(f"\n{len(regressions)} regressions:\n" + "\n".join(regressions))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,353 @@
+"""
+Closed-loop load generator for a running server. Every virtual user (VU)
+repeats an action of the mix (read the feed 80%, like 15%, post 5%),
+waits for the response and thinks for a while, until the end of the stage.
+The VUs start evenly during the ramp-up. The stages with the growing numbers
+of the VUs show the saturation point: the throughput stops growing,
+the latency and the errors grow. For example, against the seeded dataset
+(python -m benchmarks.dataset) and one worker (SERVER_WORKERS=1):
+python -m benchmarks.load --url http://localhost:5000 --vus 10 100 500 1000
+
+For every interval the throughput, the latency percentiles, the errors
+(5xx, timeouts, connection errors) and the rejected requests (4xx)
+are reported. The lag of the event loop of the generator itself is reported
+too: if it grows, the generator is saturated, not the server
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Set
+
+import httpx
+
+from benchmarks.endpoints import summarize
+
+# status of the requests, which failed without a response
+NO_RESPONSE: int = 0
+
+
+@dataclass
+class LoadConfig:
+    """The load of a stage and the dataset (see benchmarks.dataset)"""
+
+    vus: int = 100
+    # seconds
+    duration: float = 30.0
+    ramp_up: float = 5.0
+    # mean pause of a VU between the actions, exponential
+    think_time: float = 0.5
+    timeout: float = 10.0
+    users: int = 10_000
+    tweets: int = 100_000
+    seed: int = 42
+
+
+@dataclass
+class VirtualUser:
+    """The state of a VU: the user and the tweets liked by the VU"""
+
+    user_id: int
+    rng: random.Random
+    config: LoadConfig
+    liked: Set[int] = field(default_factory=set)
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return {"api-key": f"api_key_{self.user_id}"}
+
+
+async def read_feed(client: httpx.AsyncClient, vu: VirtualUser) -> httpx.Response:
+    return await client.get("/api/tweets", headers=vu.headers)
+
+
+async def like(client: httpx.AsyncClient, vu: VirtualUser) -> httpx.Response:
+    """Likes a random tweet, or unlikes it, if the VU has liked it"""
+    tweet_id: int = vu.rng.randint(1, vu.config.tweets)
+    url: str = f"/api/tweets/{tweet_id}/likes"
+    if tweet_id in vu.liked:
+        vu.liked.discard(tweet_id)
+        return await client.delete(url, headers=vu.headers)
+    vu.liked.add(tweet_id)
+    return await client.post(url, headers=vu.headers)
+
+
+async def post_tweet(client: httpx.AsyncClient, vu: VirtualUser) -> httpx.Response:
+    return await client.post(
+        "/api/tweets",
+        json={"tweet_data": f"load test tweet {vu.rng.random()}"},
+        headers=vu.headers,
+    )
+
+
+Action = Callable[[httpx.AsyncClient, VirtualUser], Awaitable[httpx.Response]]
+# name of the action -> the action and its share of the mix
+ACTIONS: Dict[str, Action] = {"feed": read_feed, "like": like, "post": post_tweet}
+MIX: Dict[str, float] = {"feed": 0.80, "like": 0.15, "post": 0.05}
+
+
+@dataclass
+class Sample:
+    """The result of a request"""
+
+    # seconds since the start of the stage
+    time: float
+    action: str
+    latency: float
+    status: int
+    error: Optional[str] = None
+
+    @property
+    def is_error(self) -> bool:
+        return self.status == NO_RESPONSE or self.status >= 500
+
+    @property
+    def is_rejected(self) -> bool:
+        return 400 <= self.status < 500
+
+
+async def virtual_user(
+    client: httpx.AsyncClient,
+    vu: VirtualUser,
+    mix: Dict[str, float],
+    start: float,
+    stop_at: float,
+    samples: List[Sample],
+) -> None:
+    """The loop of a VU: the action, the response, the pause, until stop_at"""
+    names: List[str] = list(mix)
+    weights: List[float] = list(mix.values())
+    while True:
+        name: str = vu.rng.choices(names, weights)[0]
+        sent: float = time.perf_counter()
+        if sent >= stop_at:
+            return
+        try:
+            response: httpx.Response = await ACTIONS[name](client, vu)
+            status, error = response.status_code, None
+        except httpx.HTTPError as exc:
+            status, error = NO_RESPONSE, type(exc).__name__
+        received: float = time.perf_counter()
+        samples.append(Sample(sent - start, name, received - sent, status, error))
+        if vu.config.think_time > 0:
+            await asyncio.sleep(vu.rng.expovariate(1 / vu.config.think_time))
+
+
+async def monitor_loop_lag(lags: List[tuple], start: float, period: float = 0.1):
+    """The task measures how late the event loop of the generator wakes it up"""
+    while True:
+        before: float = time.perf_counter()
+        await asyncio.sleep(period)
+        lags.append((before - start, time.perf_counter() - before - period))
+
+
+def timeline(
+    samples: Sequence[Sample], lags: Sequence[tuple], interval: float
+) -> List[Dict[str, Any]]:
+    """
+    The function groups the samples by the intervals of the time of sending
+    :return: the statistics of every interval
+    """
+    buckets: Dict[int, List[Sample]] = defaultdict(list)
+    for sample in samples:
+        buckets[int(sample.time // interval)].append(sample)
+    max_lags: Dict[int, float] = defaultdict(float)
+    for at, lag in lags:
+        bucket: int = int(at // interval)
+        max_lags[bucket] = max(max_lags[bucket], lag)
+
+    result: List[Dict[str, Any]] = list()
+    for bucket in range(max(buckets, default=-1) + 1):
+        bucket_samples: List[Sample] = buckets.get(bucket, list())
+        row: Dict[str, Any] = {"time": bucket * interval}
+        if bucket_samples:
+            row.update(_stats(bucket_samples, interval))
+        else:
+            row.update({"requests": 0, "errors": 0, "rejected": 0})
+        row["loop_lag_ms"] = max_lags[bucket] * 1000
+        result.append(row)
+    return result
+
+
+def _stats(samples: Sequence[Sample], seconds: float) -> Dict[str, Any]:
+    result: Dict[str, Any] = summarize(
+        [sample.latency for sample in samples],
+        sum(sample.is_error for sample in samples),
+        seconds,
+    )
+    result["rejected"] = sum(sample.is_rejected for sample in samples)
+    result["error_rate"] = result["errors"] / len(samples)
+    return result
+
+
+def report(
+    samples: Sequence[Sample],
+    lags: Sequence[tuple],
+    config: LoadConfig,
+    interval: float,
+    seconds: float,
+) -> Dict[str, Any]:
+    """
+    The function returns the timeline and the summary of a stage
+    :param seconds: wall time of the stage with the requests in flight at the end
+    """
+    by_action: Dict[str, List[Sample]] = defaultdict(list)
+    for sample in samples:
+        by_action[sample.action].append(sample)
+    errors: Counter = Counter(
+        sample.error or str(sample.status) for sample in samples if sample.is_error
+    )
+    return {
+        "vus": config.vus,
+        "seconds": seconds,
+        "summary": _stats(samples, seconds) if samples else {"requests": 0},
+        "actions": {
+            name: _stats(action_samples, seconds)
+            for name, action_samples in by_action.items()
+        },
+        "error_types": dict(errors),
+        "max_loop_lag_ms": max((lag for _, lag in lags), default=0.0) * 1000,
+        "timeline": timeline(samples, lags, interval),
+    }
+
+
+async def run_stage(
+    base_url: str,
+    config: LoadConfig,
+    mix: Optional[Dict[str, float]] = None,
+    interval: float = 1.0,
+    transport: Optional[httpx.AsyncBaseTransport] = None,
+) -> Dict[str, Any]:
+    """
+    The function runs the VUs of the stage against the server
+    :param base_url: url of the server
+    :param config: the load of the stage
+    :param mix: action name -> share, MIX by default
+    :param interval: seconds, the resolution of the timeline
+    :param transport: transport of the client, e.g. ASGITransport in tests
+    :return: the report of the stage
+    """
+    samples: List[Sample] = list()
+    lags: List[tuple] = list()
+    limits = httpx.Limits(max_connections=config.vus, max_keepalive_connections=None)
+    async with httpx.AsyncClient(
+        base_url=base_url,
+        timeout=config.timeout,
+        limits=limits,
+        transport=transport,
+    ) as client:
+        start: float = time.perf_counter()
+        stop_at: float = start + config.duration
+        monitor = asyncio.create_task(monitor_loop_lag(lags, start))
+
+        async def start_vu(num: int) -> None:
+            # the VUs are started evenly during the ramp-up
+            await asyncio.sleep(config.ramp_up * num / config.vus)
+            rng = random.Random(f"{config.seed}:{num}")
+            vu = VirtualUser(rng.randint(1, config.users), rng, config)
+            await virtual_user(client, vu, mix or MIX, start, stop_at, samples)
+
+        try:
+            await asyncio.gather(*(start_vu(num) for num in range(config.vus)))
+        finally:
+            monitor.cancel()
+        seconds: float = time.perf_counter() - start
+    return report(samples, lags, config, interval, seconds)
+
+
+def print_stage(stage: Dict[str, Any]) -> None:
+    summary: Dict[str, Any] = stage["summary"]
+    print(f"\n{stage['vus']} VUs")
+    print(
+        f"{'time s':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+        f" {'errors':>7} {'4xx':>6} {'lag ms':>7}"
+    )
+    for row in stage["timeline"]:
+        if not row["requests"]:
+            continue
+        print(
+            f"{row['time']:7.1f} {row['throughput_rps']:8.1f} {row['p50_ms']:8.1f}"
+            f" {row['p95_ms']:8.1f} {row['p99_ms']:8.1f} {row['errors']:7d}"
+            f" {row['rejected']:6d} {row['loop_lag_ms']:7.1f}"
+        )
+    if summary["requests"]:
+        print(
+            f"total: {summary['throughput_rps']:.1f} req/s,"
+            f" p95 {summary['p95_ms']:.1f} ms, p99 {summary['p99_ms']:.1f} ms,"
+            f" error rate {summary['error_rate']:.2%},"
+            f" max generator lag {stage['max_loop_lag_ms']:.1f} ms"
+        )
+    if stage["error_types"]:
+        print(f"errors: {stage['error_types']}")
+
+
+async def run(args: argparse.Namespace) -> None:
+    stages: List[Dict[str, Any]] = list()
+    for vus in args.vus:
+        config = LoadConfig(
+            vus=vus,
+            duration=args.duration,
+            ramp_up=args.ramp_up,
+            think_time=args.think_time,
+            timeout=args.timeout,
+            users=args.users,
+            tweets=args.tweets,
+            seed=args.seed,
+        )
+        stage: Dict[str, Any] = await run_stage(
+            args.url, config, interval=args.interval
+        )
+        print_stage(stage)
+        stages.append(stage)
+
+    print(f"\n{'VUs':>6} {'req/s':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>8}")
+    for stage in stages:
+        summary = stage["summary"]
+        if summary["requests"]:
+            print(
+                f"{stage['vus']:6d} {summary['throughput_rps']:8.1f}"
+                f" {summary['p95_ms']:8.1f} {summary['p99_ms']:8.1f}"
+                f" {summary['error_rate']:8.2%}"
+            )
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"url": args.url, "stages": stages}, file, indent=2)
+
+
+def main() -> None:
+    defaults = LoadConfig()
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--url", default="http://localhost:5000")
+    parser.add_argument(
+        "--vus",
+        type=int,
+        nargs="+",
+        default=[defaults.vus],
+        help="virtual users of the stages",
+    )
+    parser.add_argument(
+        "--duration", type=float, default=defaults.duration, help="seconds per stage"
+    )
+    parser.add_argument("--ramp-up", type=float, default=defaults.ramp_up)
+    parser.add_argument("--think-time", type=float, default=defaults.think_time)
+    parser.add_argument("--timeout", type=float, default=defaults.timeout)
+    parser.add_argument("--interval", type=float, default=1.0)
+    parser.add_argument(
+        "--users", type=int, default=defaults.users, help="users of the dataset"
+    )
+    parser.add_argument(
+        "--tweets", type=int, default=defaults.tweets, help="tweets of the dataset"
+    )
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--output", help="JSON file of the reports")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Microbenchmark of rendering the feed and user info responses:
+jsonable_encoder with the stdlib JSONResponse (before),
+FastJSONResponse (after) and MsgPackResponse (Accept: application/msgpack).
+The encode time and the size of the payload are printed
+"""
+
+import argparse
+from typing import Any, Callable, Dict, List
+
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import JSONResponse
+
+from benchmarks.serializer import make_feed, measure
+from src.schemas.schemas import UserOutSchema
+from src.service.responses import FastJSONResponse, MsgPackResponse
+from src.service.serializers import Likers, serialize_tweets
+
+
+def make_user_info(num_follows: int) -> Dict[str, Any]:
+    """The function creates a user info payload without the database"""
+    users: List[Dict[str, Any]] = [
+        {"id": num, "name": f"user_{num}"} for num in range(num_follows)
+    ]
+    return {
+        "result": True,
+        "user": {"id": 0, "name": "user_0", "followers": users, "following": users},
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tweets", type=int, default=1000)
+    parser.add_argument("--images", type=int, default=2)
+    parser.add_argument("--likes", type=int, default=20)
+    parser.add_argument("--follows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    tweets = make_feed(args.tweets, args.images, args.likes)
+    images_names: Dict[int, str] = {
+        image.id: f"{image.id}.jpg" for tweet in tweets for image in tweet.images or ()
+    }
+    likers: Likers = {
+        tweet.id: [(user.id, user.name) for user in tweet.users_like or ()]
+        for tweet in tweets
+    }
+    feed: Dict[str, Any] = {
+        "result": True,
+        "tweets": serialize_tweets(tweets, images_names, likers),
+    }
+    user_info: UserOutSchema = UserOutSchema.model_validate(
+        make_user_info(args.follows)
+    )
+
+    cases: Dict[str, Callable[[], Any]] = {
+        "feed before": lambda: JSONResponse(jsonable_encoder(feed)),
+        "feed after": lambda: FastJSONResponse(feed),
+        "feed msgpack": lambda: MsgPackResponse(feed),
+        "user info before": lambda: JSONResponse(jsonable_encoder(user_info)),
+        "user info after": lambda: FastJSONResponse(user_info),
+        "user info msgpack": lambda: MsgPackResponse(user_info),
+    }
+
+    print(
+        f"Feed of {args.tweets} tweets, {args.images} images"
+        f" and {args.likes} likes per tweet;"
+        f" user info with {args.follows} followers and followings"
+    )
+    for name, func in cases.items():
+        seconds: float = measure(func, args.repeat)
+        print(
+            f"{name:<20} {seconds * 1000:8.2f} ms"
+            f" {len(func().body) / 1024:10.1f} KiB"
+        )
+
+
+if __name__ == "__main__":
+    main()
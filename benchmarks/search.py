@@ -0,0 +1,242 @@
+"""
+Benchmark of the full-text search of the tweets (queries.search_tweets)
+against the database of the current ENV, which is seeded with
+benchmarks.dataset. The queries have different selectivity: the rare
+and the popular hashtags, the common words, the phrases. The first page
+and the pages deep in the results (by the cursors) are measured,
+optionally with the naive ILIKE scan as the baseline, for example:
+python -m benchmarks.dataset --users 100000 --tweets 10000000 --truncate
+python -m benchmarks.search run --baseline --output search.json
+python -m benchmarks.search compare baseline.json search.json
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import src.database.queries as q
+from benchmarks.endpoints import DEFAULT_THRESHOLD, compare, print_results, summarize
+from src.config.config import get_config
+from src.database.engine import Database
+from src.database.models import SEARCH_VECTOR_INDEX, Tweet
+
+# name -> the search query. The texts of the dataset have the words of
+# benchmarks.dataset.WORDS and the Zipf-distributed hashtags #tag1, #tag2, ...
+QUERIES: Dict[str, str] = {
+    "rare_hashtag": "tag900",
+    "popular_hashtag": "tag1",
+    "common_word": "coffee",
+    "two_words": "coffee python",
+    "phrase": '"morning coffee"',
+    "no_match": "nonexistent",
+}
+PAGE_SIZE: int = 20
+
+
+async def measure(call: Callable[[], Awaitable[Any]], repeats: int) -> Dict[str, Any]:
+    """
+    The function measures the latency of the call
+    :param call: the measured call
+    :param repeats: number of the measured calls
+    :return: the statistics of the latency (see summarize)
+    """
+    latencies: List[float] = list()
+    start: float = time.perf_counter()
+    for _ in range(repeats):
+        sent: float = time.perf_counter()
+        await call()
+        latencies.append(time.perf_counter() - sent)
+    return summarize(latencies, 0, time.perf_counter() - start)
+
+
+async def page_cursor(
+    session: AsyncSession, query: str, pages: int, limit: int, candidates: int
+) -> Optional[Tuple[float, int, int]]:
+    """
+    The function reads the pages of the results one by one
+    :return: the cursor (rank, id, max_id) of the last page,
+    None if there are fewer pages
+    """
+    after: Optional[Tuple[float, int, int]] = None
+    for _ in range(pages):
+        found = await q.search_tweets(
+            session, query, limit, after, {"content"}, candidates
+        )
+        if len(found) < limit:
+            return None
+        tweet, rank, max_id = found[-1]
+        after = (rank, tweet.id, max_id)
+    return after
+
+
+async def naive_search(session: AsyncSession, query: str, limit: int) -> List[Tweet]:
+    """The baseline: the substring search, the newest first"""
+    search_q = await session.execute(
+        select(Tweet)
+        .where(Tweet.tweet_data.ilike(f"%{query.strip(chr(34))}%"))
+        .order_by(Tweet.id.desc())
+        .limit(limit)
+    )
+    return list(search_q.scalars())
+
+
+async def run_search_benchmark(
+    database: Database,
+    queries: List[str],
+    repeats: int = 20,
+    pages: int = 10,
+    limit: int = PAGE_SIZE,
+    candidates: int = q.SEARCH_CANDIDATES,
+    baseline: bool = False,
+) -> Dict[str, Any]:
+    """
+    The function runs the search queries against the database
+    :param database: the database, seeded with benchmarks.dataset
+    :param queries: names of the queries
+    :param repeats: measured calls per query
+    :param pages: the deep page is read by the cursor after this number of pages
+    :param limit: page size
+    :param candidates: the number of the matches, which are ranked together
+    :param baseline: measure the ILIKE scan too
+    :return: the meta information, the matches and the statistics by query
+    """
+    results: Dict[str, Dict[str, Any]] = dict()
+    matches: Dict[str, int] = dict()
+    async with database.Session() as session:
+        tweets: int = await session.scalar(select(func.count()).select_from(Tweet)) or 0
+        if not tweets:
+            raise RuntimeError("The database is empty, run benchmarks.dataset first")
+        index_size: Optional[int] = await session.scalar(
+            text("SELECT pg_relation_size(to_regclass(:index))"),
+            {"index": SEARCH_VECTOR_INDEX},
+        )
+        for name in queries:
+            query: str = QUERIES[name]
+            matches[name] = await session.scalar(
+                text(
+                    "SELECT count(*) FROM tweets"
+                    " WHERE search_vector @@ websearch_to_tsquery('english', :query)"
+                ),
+                {"query": query},
+            )
+
+            def first_page(query: str = query) -> Awaitable[Any]:
+                return q.search_tweets(session, query, limit, None, None, candidates)
+
+            # warmup
+            await first_page()
+            results[name] = await measure(first_page, repeats)
+            after = await page_cursor(session, query, pages, limit, candidates)
+            if after is not None:
+
+                def deep_page(query: str = query, after=after) -> Awaitable[Any]:
+                    return q.search_tweets(
+                        session, query, limit, after, None, candidates
+                    )
+
+                results[f"{name}_page_{pages + 1}"] = await measure(deep_page, repeats)
+            if baseline:
+
+                def naive(query: str = query) -> Awaitable[Any]:
+                    return naive_search(session, query, limit)
+
+                results[f"{name}_ilike"] = await measure(naive, repeats)
+    return {
+        "meta": {
+            "time": datetime.now(timezone.utc).isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "tweets": tweets,
+            "index_size_mb": (index_size or 0) / 2**20,
+            "matches": matches,
+            "repeats": repeats,
+            "pages": pages,
+            "limit": limit,
+            "candidates": candidates,
+        },
+        "results": results,
+    }
+
+
+async def run(args: argparse.Namespace) -> None:
+    database = Database.from_config(get_config().db)
+    try:
+        results: Dict[str, Any] = await run_search_benchmark(
+            database,
+            args.queries,
+            args.repeats,
+            args.pages,
+            args.limit,
+            args.candidates,
+            args.baseline,
+        )
+    finally:
+        await database.dispose()
+    meta: Dict[str, Any] = results["meta"]
+    print(
+        f"{meta['tweets']} tweets, the GIN index {meta['index_size_mb']:.1f} MB,"
+        f" matches: {meta['matches']}"
+    )
+    print_results(results)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the benchmark")
+    run_parser.add_argument(
+        "--queries", nargs="+", choices=list(QUERIES), default=list(QUERIES)
+    )
+    run_parser.add_argument("--repeats", type=int, default=20)
+    run_parser.add_argument("--pages", type=int, default=10)
+    run_parser.add_argument("--limit", type=int, default=PAGE_SIZE)
+    run_parser.add_argument(
+        "--candidates",
+        type=int,
+        default=q.SEARCH_CANDIDATES,
+        help="the number of the matches, which are ranked together",
+    )
+    run_parser.add_argument(
+        "--baseline", action="store_true", help="measure the ILIKE scan too"
+    )
+    run_parser.add_argument("--output", help="JSON file of the results")
+
+    compare_parser = commands.add_parser(
+        "compare", help="compare the results with the baseline"
+    )
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("results")
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+
+    args = parser.parse_args()
+    if args.command == "run":
+        asyncio.run(run(args))
+        return
+
+    with open(args.baseline) as file:
+        baseline: Dict[str, Any] = json.load(file)
+    with open(args.results) as file:
+        current: Dict[str, Any] = json.load(file)
+    lines, regressions = compare(baseline, current, args.threshold)
+    print("\n".join(lines))
+    if regressions:
+        print(f"\n{len(regressions)} regressions:\n" + "\n".join(regressions))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Microbenchmark of serializing a feed page: the batch serializer
+versus re-validating the same output with TweetOutSchema
+"""
+
+import argparse
+import timeit
+from typing import Any, Callable, Dict, List
+
+from fastapi.encoders import jsonable_encoder
+
+from src.api.tweets_router import FEED_TOP_LIKERS
+from src.database.models import Image, Tweet, User
+from src.schemas.schemas import TweetOutSchema
+from src.service.serializers import Likers, serialize_tweets
+
+
+def make_feed(num_tweets: int, num_images: int, num_likes: int) -> List[Tweet]:
+    """
+    The function creates a feed page without the database. Like the feed,
+    every tweet carries the number of its likes and only a few of the likers
+    """
+    likers: List[User] = [
+        User(id=num, name=f"user_{num}", api_key=f"api_key_{num}")
+        for num in range(num_likes)
+    ]
+    return [
+        Tweet(
+            id=num,
+            tweet_data=f"tweet number {num} " * 5,
+            user=User(id=num, name=f"author_{num}", api_key=f"author_{num}"),
+            images=[Image(id=num * num_images + img) for img in range(num_images)],
+            likes_count=len(likers),
+            users_like=likers[:FEED_TOP_LIKERS],
+        )
+        for num in range(num_tweets)
+    ]
+
+
+def measure(func: Callable[[], Any], repeat: int) -> float:
+    """The function returns the best time of one call in seconds"""
+    return min(timeit.Timer(func).repeat(repeat=repeat, number=1))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tweets", type=int, default=1000)
+    parser.add_argument("--images", type=int, default=2)
+    parser.add_argument("--likes", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    tweets: List[Tweet] = make_feed(args.tweets, args.images, args.likes)
+    images_names: Dict[int, str] = {
+        image.id: f"{image.id}.jpg" for tweet in tweets for image in tweet.images or ()
+    }
+    likers: Likers = {
+        tweet.id: [(user.id, user.name) for user in tweet.users_like or ()]
+        for tweet in tweets
+    }
+    page: Dict[str, Any] = {
+        "result": True,
+        "tweets": serialize_tweets(tweets, images_names, likers),
+    }
+
+    results: Dict[str, float] = {
+        "serialize_tweets": measure(
+            lambda: serialize_tweets(tweets, images_names, likers), args.repeat
+        ),
+        # what FastAPI does with the returned dict when response_model is set
+        "response_model validation": measure(
+            lambda: jsonable_encoder(TweetOutSchema.model_validate(page)),
+            args.repeat,
+        ),
+    }
+
+    print(
+        f"Feed of {args.tweets} tweets, {args.images} images"
+        f" and {args.likes} likes per tweet"
+    )
+    for name, seconds in results.items():
+        print(
+            f"{name:<28} {seconds * 1000:8.2f} ms per page"
+            f" {seconds / args.tweets * 1e6:8.2f} us per tweet"
+        )
+
+
+if __name__ == "__main__":
+    main()
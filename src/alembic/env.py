@@ -7,7 +7,7 @@ from sqlalchemy.ext.asyncio import async_engine_from_config
 
 from alembic import context
 from src.config.config import DB, load_config
-from src.database.models import Base
+from src.database.models import SEARCH_VECTOR_COLUMN, SEARCH_VECTOR_INDEX, Base
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -29,6 +29,15 @@ if config.config_file_name is not None:
 # target_metadata = mymodel.Base.metadata
 target_metadata = Base.metadata
 
+# the full-text search column and its index are created by DDL (models.SEARCH_DDL),
+# they are not in the metadata, so autogenerate must not drop them
+NOT_IN_METADATA = {SEARCH_VECTOR_COLUMN, SEARCH_VECTOR_INDEX}
+
+
+def include_object(object, name, type_, reflected, compare_to) -> bool:
+    return not (reflected and compare_to is None and name in NOT_IN_METADATA)
+
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -51,6 +60,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -60,7 +70,11 @@ def run_migrations_offline() -> None:
 
 
 def do_run_migrations(connection: Connection) -> None:
-    context.configure(connection=connection, target_metadata=target_metadata)
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        include_object=include_object,
+    )
 
     with context.begin_transaction():
         context.run_migrations()
@@ -12,6 +12,10 @@ import sqlalchemy as sa
 
 from alembic import op
 
+# The last revision of the schema, which the app created with create_all
+# before the migrations managed it
+CREATE_ALL_REVISION: str = "d810d15cfc88"
+
 # revision identifiers, used by Alembic.
 revision: str = "28aa896b019f"
 down_revision: Union[str, None] = None
@@ -20,12 +24,57 @@ depends_on: Union[str, Sequence[str], None] = None
 
 
 def upgrade() -> None:
-    # ### commands auto generated by Alembic - please adjust! ###
-    pass
-    # ### end Alembic commands ###
+    # The databases created by the app at startup (create_all) have the tables
+    # of CREATE_ALL_REVISION, but no alembic_version. They must be stamped
+    # with that revision once, the next revisions would fail to create
+    # the tables again. A new database gets the tables the next revisions expect
+    if sa.inspect(op.get_bind()).has_table("users"):
+        raise RuntimeError(
+            "The tables already exist, the database was created before"
+            " the migrations. Run 'alembic stamp %s' once, then"
+            " 'alembic upgrade head'" % CREATE_ALL_REVISION
+        )
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("api_key", sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_users_api_key"), "users", ["api_key"], unique=True)
+    op.create_table(
+        "tweets",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("tweet_data", sa.Text(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_tweets_id"), "tweets", ["id"], unique=False)
+    op.create_table(
+        "images",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("tweet_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["tweet_id"], ["tweets.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_images_id"), "images", ["id"], unique=False)
+    op.create_table(
+        "likes",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=True),
+        sa.Column("tweet_id", sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(["tweet_id"], ["tweets.id"]),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("user_id", "tweet_id", name="unq_likes"),
+    )
 
 
 def downgrade() -> None:
-    # ### commands auto generated by Alembic - please adjust! ###
-    pass
-    # ### end Alembic commands ###
+    op.drop_table("likes")
+    op.drop_index(op.f("ix_images_id"), table_name="images")
+    op.drop_table("images")
+    op.drop_index(op.f("ix_tweets_id"), table_name="tweets")
+    op.drop_table("tweets")
+    op.drop_index(op.f("ix_users_api_key"), table_name="users")
+    op.drop_table("users")
@@ -0,0 +1,51 @@
+"""add foreign keys indexes
+
+Revision ID: 3c1e0f9a7b42
+Revises: d810d15cfc88
+Create Date: 2026-10-19 10:12:31.204518
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "3c1e0f9a7b42"
+down_revision: Union[str, None] = "d810d15cfc88"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# table -> column. The unique constraints cover only their leading columns
+INDEXES = (
+    ("tweets", "user_id"),
+    ("likes", "tweet_id"),
+    ("images", "tweet_id"),
+    ("following", "follower_id"),
+)
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY does not lock writes,
+    # but it cannot be run inside a transaction
+    with op.get_context().autocommit_block():
+        for table, column in INDEXES:
+            op.create_index(
+                op.f(f"ix_{table}_{column}"),
+                table,
+                [column],
+                unique=False,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for table, column in INDEXES:
+            op.drop_index(
+                op.f(f"ix_{table}_{column}"),
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
@@ -0,0 +1,62 @@
+"""add created_at timestamps
+
+Revision ID: 7e4b2d6c9f10
+Revises: 3c1e0f9a7b42
+Create Date: 2026-10-19 11:03:47.618290
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "7e4b2d6c9f10"
+down_revision: Union[str, None] = "3c1e0f9a7b42"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# index name -> (table, leading column)
+INDEXES = {
+    "ix_tweets_user_id_created_at": ("tweets", "user_id"),
+    "ix_likes_user_id_created_at": ("likes", "user_id"),
+    "ix_following_follower_id_created_at": ("following", "follower_id"),
+}
+
+
+def upgrade() -> None:
+    # the existing rows get the time of the migration
+    for table in ("tweets", "likes", "following"):
+        op.add_column(
+            table,
+            sa.Column(
+                "created_at",
+                sa.DateTime(timezone=True),
+                server_default=sa.text("now()"),
+                nullable=False,
+            ),
+        )
+
+    with op.get_context().autocommit_block():
+        for name, (table, column) in INDEXES.items():
+            op.create_index(
+                name,
+                table,
+                [column, sa.text("created_at DESC")],
+                unique=False,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, (table, _) in INDEXES.items():
+            op.drop_index(
+                name, table_name=table, postgresql_concurrently=True, if_exists=True
+            )
+
+    for table in ("tweets", "likes", "following"):
+        op.drop_column(table, "created_at")
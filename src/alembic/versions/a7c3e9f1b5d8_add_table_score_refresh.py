@@ -0,0 +1,40 @@
+"""add table score_refresh
+
+Revision ID: a7c3e9f1b5d8
+Revises: f3b9c1d7e5a2
+Create Date: 2026-10-19 18:42:37.204915
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a7c3e9f1b5d8"
+down_revision: Union[str, None] = "f3b9c1d7e5a2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "score_refresh",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column(
+            "refreshed_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column("refreshed_tweets", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    # the time of the last refresh was kept in backfill_progress before
+    op.execute("DELETE FROM backfill_progress WHERE job = 'refresh_scores'")
+
+
+def downgrade() -> None:
+    op.drop_table("score_refresh")
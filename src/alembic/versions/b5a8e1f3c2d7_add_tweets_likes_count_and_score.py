@@ -0,0 +1,62 @@
+"""add tweets.likes_count and tweets.score
+
+Revision ID: b5a8e1f3c2d7
+Revises: 7e4b2d6c9f10
+Create Date: 2026-10-19 12:26:09.337105
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b5a8e1f3c2d7"
+down_revision: Union[str, None] = "7e4b2d6c9f10"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "tweets",
+        sa.Column(
+            "likes_count", sa.Integer(), server_default=sa.text("0"), nullable=False
+        ),
+    )
+    op.add_column(
+        "tweets",
+        sa.Column("score", sa.Float(), server_default=sa.text("0"), nullable=False),
+    )
+    # the default gravity, the scores are refreshed by the app anyway
+    op.execute(
+        "UPDATE tweets SET likes_count = counts.n,"
+        " score = counts.n / power("
+        "extract(epoch FROM now() - tweets.created_at) / 3600 + 2, 1.8)"
+        " FROM (SELECT tweet_id, count(*) AS n FROM likes GROUP BY tweet_id) counts"
+        " WHERE tweets.id = counts.tweet_id"
+    )
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_tweets_score",
+            "tweets",
+            [sa.text("score DESC"), sa.text("id DESC")],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_tweets_score",
+            table_name="tweets",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+    op.drop_column("tweets", "score")
+    op.drop_column("tweets", "likes_count")
@@ -0,0 +1,39 @@
+"""add tweets.search_vector with the GIN index
+
+Revision ID: c4f8a2e6d1b3
+Revises: e2c7a9d4b6f1
+Create Date: 2026-10-19 17:40:12.218734
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c4f8a2e6d1b3"
+down_revision: Union[str, None] = "e2c7a9d4b6f1"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # the generated column is not in the models, see models.SEARCH_DDL.
+    # Adding it rewrites the table
+    op.execute(
+        "ALTER TABLE tweets ADD COLUMN IF NOT EXISTS search_vector tsvector"
+        " GENERATED ALWAYS AS (to_tsvector('english', tweet_data)) STORED"
+    )
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_tweets_search_vector"
+            " ON tweets USING gin (search_vector)"
+        )
+        # the statistics of the words choose between the index and the scan
+        op.execute("ANALYZE tweets (search_vector)")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_tweets_search_vector")
+    op.execute("ALTER TABLE tweets DROP COLUMN IF EXISTS search_vector")
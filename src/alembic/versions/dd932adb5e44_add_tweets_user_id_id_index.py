@@ -0,0 +1,42 @@
+"""add tweets (user_id, id) index instead of the user_id index
+
+Revision ID: dd932adb5e44
+Revises: d903713c4006
+Create Date: 2026-10-19 11:32:26.211888
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "dd932adb5e44"
+down_revision: Union[str, None] = "d903713c4006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # the pages of the tweets of the user are read by the new index,
+    # which serves the lookups by user_id too
+    with op.get_context().autocommit_block():
+        op.create_index(
+            op.f("ix_tweets_user_id_id"),
+            "tweets",
+            ["user_id", "id"],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.drop_index(
+            op.f("ix_tweets_user_id"),
+            table_name="tweets",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+
+
+def downgrade() -> None:
+    op.create_index(op.f("ix_tweets_user_id"), "tweets", ["user_id"], unique=False)
+    op.drop_index(op.f("ix_tweets_user_id_id"), table_name="tweets")
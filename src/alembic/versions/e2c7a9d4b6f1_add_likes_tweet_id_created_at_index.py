@@ -0,0 +1,56 @@
+"""add likes (tweet_id, created_at, user_id) index
+
+Revision ID: e2c7a9d4b6f1
+Revises: b5a8e1f3c2d7
+Create Date: 2026-10-19 14:02:55.481263
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e2c7a9d4b6f1"
+down_revision: Union[str, None] = "b5a8e1f3c2d7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # the new index starts with tweet_id, so it replaces the foreign key index
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_likes_tweet_id_created_at",
+            "likes",
+            ["tweet_id", sa.text("created_at DESC"), sa.text("user_id DESC")],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.drop_index(
+            "ix_likes_tweet_id",
+            table_name="likes",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_likes_tweet_id",
+            "likes",
+            ["tweet_id"],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.drop_index(
+            "ix_likes_tweet_id_created_at",
+            table_name="likes",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
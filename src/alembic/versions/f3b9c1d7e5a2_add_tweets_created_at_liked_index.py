@@ -0,0 +1,41 @@
+"""add partial index of the created_at of the liked tweets
+
+Revision ID: f3b9c1d7e5a2
+Revises: dd932adb5e44
+Create Date: 2026-10-19 15:04:12.518203
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "f3b9c1d7e5a2"
+down_revision: Union[str, None] = "dd932adb5e44"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # the periodic refresh of the scores reads only the recent liked tweets
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_tweets_created_at_liked",
+            "tweets",
+            ["created_at"],
+            unique=False,
+            postgresql_where=sa.text("likes_count > 0"),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_tweets_created_at_liked",
+        table_name="tweets",
+        postgresql_where=sa.text("likes_count > 0"),
+    )
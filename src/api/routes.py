@@ -1,16 +1,28 @@
 from logging import getLogger
-from logging.config import dictConfig
+from typing import Optional, Type
 
-from fastapi import Depends, FastAPI, HTTPException
+from fastapi import Depends, FastAPI, Response
+from fastapi.exceptions import RequestValidationError
+from starlette.exceptions import HTTPException as StarletteHTTPException
 
 from src.api.medias_router import medias_router
 from src.api.tweets_router import tweets_router
 from src.api.users_router import users_router
-from src.config.log_config import dict_config
-from src.service.exceptions import http_exception_handler
-from src.service.web import get_session, lifespan
+from src.config.config import Config, get_config
+from src.config.log_config import setup_logging
+from src.database.engine import Database
+from src.service.exceptions import http_exception_handler, validation_exception_handler
+from src.service.metrics import (
+    MetricsMiddleware,
+    bind_pools,
+    bind_routes,
+    metrics_endpoint,
+)
+from src.service.profiling import ProfilingMiddleware
+from src.service.responses import FastJSONResponse
+from src.service.timing import ServerTimingMiddleware
+from src.service.web import ReadYourWritesMiddleware, get_session, lifespan
 
-dictConfig(dict_config)
 logger = getLogger("routes_logger")
 
 tags_metadata = [
@@ -32,18 +44,49 @@ tags_metadata = [
 ]
 
 
-def create_app() -> FastAPI:
+def create_app(
+    config: Optional[Config] = None,
+    database: Optional[Database] = None,
+    default_response_class: Type[Response] = FastJSONResponse,
+) -> FastAPI:
+    """
+    The app factory. Importing the modules of the app has no side effects,
+    the config, the logging and the engines are set up here
+    :param config: config of the app, loaded from the environment by default
+    :param database: engines of the app, created from the config by default
+    :param default_response_class: response class of the endpoints
+    :return: the app
+    """
+    config = config or get_config()
+    setup_logging()
     # create app
     app = FastAPI(
         lifespan=lifespan,
         openapi_tags=tags_metadata,
         dependencies=[Depends(get_session)],
+        default_response_class=default_response_class,
     )
-    # register exception handler
-    app.exception_handler(HTTPException)(http_exception_handler)
+    app.state.config = config
+    app.state.database = database or Database.from_config(config.db)
+    # the cookie with the time of the user's mutation (see web.use_replica)
+    app.add_middleware(ReadYourWritesMiddleware, db=config.db)
+    # measure auth, db, serialization and total time of every request
+    app.add_middleware(ServerTimingMiddleware)
+    # register exception handlers, the errors of the routing too
+    app.exception_handler(StarletteHTTPException)(http_exception_handler)
+    app.exception_handler(RequestValidationError)(validation_exception_handler)
     # include routers
     app.include_router(tweets_router)
     app.include_router(medias_router)
     app.include_router(users_router)
+    # the metrics are scraped without the database session of the app
+    app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
+    app.add_middleware(MetricsMiddleware)
+    # the outermost, so the profile covers the whole request
+    app.add_middleware(
+        ProfilingMiddleware, profiling=config.profiling, debug=config.env == "debug"
+    )
+    bind_routes(app.routes)
+    bind_pools(app.state.database.engines)
 
     return app
@@ -1,16 +1,40 @@
-import asyncio
+from datetime import datetime
 from logging import getLogger
-from typing import Any, Dict, List, Optional
+from typing import Annotated, Dict, FrozenSet, List, Optional, Tuple
 
-from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Path,
+    Query,
+    Request,
+    Response,
+    status,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.database import models
 from src.database import queries as q
 from src.schemas import schemas
 from src.service.exceptions import ForbiddenError
-from src.service.images import delete_images_by_ids, validate_images_in_db
-from src.service.web import check_api_key, check_tweet_exists
+from src.service.feed import get_chronological_feed
+from src.service.images import (
+    delete_images_by_ids,
+    get_images_names,
+    validate_images_in_db,
+)
+from src.service.pagination import decode_cursor, encode_cursor
+from src.service.responses import MSGPACK_RESPONSE, negotiated_response
+from src.service.serializers import Likers, serialize_tweets
+from src.service.timing import measure
+from src.service.web import (
+    check_api_key,
+    check_tweet_exists,
+    check_users_exist,
+    get_config,
+    get_tweet_fields,
+)
 
 tweets_router: APIRouter = APIRouter(
     tags=["tweets"], dependencies=[Depends(check_api_key)]
@@ -18,6 +42,58 @@ tweets_router: APIRouter = APIRouter(
 
 logger = getLogger("routes_logger.tweets_router")
 
+FEED_PAGE_SIZE: int = 100
+FEED_MAX_PAGE_SIZE: int = 1000
+# number of likers shown with each tweet of the feed
+FEED_TOP_LIKERS: int = 3
+LIKES_PAGE_SIZE: int = 100
+LIKES_MAX_PAGE_SIZE: int = 1000
+SEARCH_PAGE_SIZE: int = 20
+SEARCH_MAX_PAGE_SIZE: int = 100
+SEARCH_QUERY_MAX_LENGTH: int = 256
+HASHTAG_MAX_LENGTH: int = 101
+
+
+async def tweets_response(
+    request: Request,
+    tweets: List[models.Tweet],
+    fields: FrozenSet[str],
+    **extra: Optional[str],
+) -> Response:
+    """
+    The function loads the likers and the images of the page of tweets
+    and renders the response in the format accepted by the client
+    :param request: the request
+    :param tweets: the page of tweets with the data of the fields
+    :param fields: the fields of the response
+    :param extra: other keys of the response, e.g. next_cursor
+    :return: the response
+    """
+    session: AsyncSession = request.state.session
+    user: models.User = request.state.current_user
+    likers: Likers = dict()
+    if "likes" in fields and tweets:
+        likers = await q.get_top_likers(
+            session, [tweet.id for tweet in tweets], user.id, FEED_TOP_LIKERS
+        )
+    images_names: Dict[int, str] = dict()
+    if "attachments" in fields:
+        images_names = await get_images_names(
+            image.id for tweet in tweets for image in tweet.images or ()
+        )
+    logger.debug("Serializing %d tweets", len(tweets))
+    # the serializer follows TweetOutSchema, so the validation is skipped
+    with measure("serialization"):
+        tweets_json = serialize_tweets(tweets, images_names, likers, fields)
+    return negotiated_response(
+        request, {"result": True, "tweets": tweets_json, **extra}
+    )
+
+
+def _next_tweets_cursor(tweets: List[models.Tweet], limit: int) -> Optional[str]:
+    """The cursor of the page after the full page of tweets, the newest first"""
+    return encode_cursor(tweets[-1].id) if len(tweets) == limit else None
+
 
 @tweets_router.post(
     "/api/tweets",
@@ -149,7 +225,7 @@ async def delete_tweet(request: Request, tweet_id: int):
     images_ids: Optional[List[int]] = await q.get_images_ids_by_tweet_id(
         session, tweet.id
     )
-    logger.debug("List of images ids: %s", str(images_ids))
+    logger.debug("List of images ids: %s", images_ids)
     # delete tweet and images from db
     await q.delete_tweet_by_id(session, tweet.id)
     logger.debug("Tweet and images were deleted from db")
@@ -222,9 +298,9 @@ async def like_tweet(request: Request, tweet_id: int):
 
     logger.debug("Tweet.id=%d, User.id=%d", tweet.id, user.id)
     try:
-        await q.like_tweet(session, tweet, user)
+        await q.like_tweet(session, tweet, user, get_config(request).ranking.gravity)
     except ValueError as exc:
-        logger.warning(str(exc))
+        logger.warning("%s", exc)
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
     logger.info("Successful like")
     return {"result": True}
@@ -289,9 +365,9 @@ async def unlike_tweet(request: Request, tweet_id: int):
 
     logger.debug("Tweet.id=%d, User.id=%d", tweet.id, user.id)
     try:
-        await q.unlike_tweet(session, tweet, user)
+        await q.unlike_tweet(session, tweet, user, get_config(request).ranking.gravity)
     except ValueError as exc:
-        logger.warning(str(exc))
+        logger.warning("%s", exc)
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
     logger.info("Successful unlike")
     return {"result": True}
@@ -302,6 +378,7 @@ async def unlike_tweet(request: Request, tweet_id: int):
     status_code=200,
     response_model=schemas.TweetOutSchema,
     responses={
+        200: MSGPACK_RESPONSE,
         401: {
             "description": "api_key not exists",
             "content": {
@@ -316,10 +393,19 @@ async def unlike_tweet(request: Request, tweet_id: int):
         },
     },
 )
-async def get_list_tweets(request: Request):
+async def get_list_tweets(
+    request: Request,
+    mode: schemas.FeedMode = schemas.FeedMode.popular,
+    limit: Annotated[int, Query(ge=1, le=FEED_MAX_PAGE_SIZE)] = FEED_PAGE_SIZE,
+    fields: FrozenSet[str] = Depends(get_tweet_fields),
+):
     """
     An endpoint for receiving a feed with tweets from users
-    whom he follows in descending order of popularity (by number of likes)
+    whom they follow in descending order of popularity
+    (by number of likes, decayed with the age of the tweet).
+    In the chronological mode the newest tweets go first.
+    The feed is returned in MessagePack if the client accepts it.
+    Only the requested fields are loaded from the database and serialized
     """
     logger.info("Getting tweet feed")
     # check api_key
@@ -327,27 +413,290 @@ async def get_list_tweets(request: Request):
     session: AsyncSession = request.state.session
     user: models.User = request.state.current_user
 
-    # create a list of tweets from authors that the user is subscribed to
-    following: Optional[List[models.User]] = user.authors
-    following_tweets: List[models.Tweet] = list()
+    tweets: List[models.Tweet]
+    if mode == schemas.FeedMode.chronological:
+        tweets = await get_chronological_feed(session, user.id, limit, fields)
+    else:
+        # the most popular tweets by the score,
+        # which decays with the age of the tweet
+        tweets = await q.get_popular_feed(session, user.id, limit, fields)
+
+    return await tweets_response(request, tweets, fields)
+
+
+@tweets_router.get(
+    "/api/tweets/search",
+    status_code=200,
+    response_model=schemas.TweetPageOutSchema,
+    responses={
+        200: MSGPACK_RESPONSE,
+        401: {
+            "description": "api_key not exists",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "result": False,
+                        "error_type": "IdentificationError",
+                        "error_message": "api_key {api_key} not exists",
+                    }
+                }
+            },
+        },
+    },
+)
+async def search_tweets(
+    request: Request,
+    query: Annotated[
+        str,
+        Query(
+            alias="q",
+            min_length=1,
+            max_length=SEARCH_QUERY_MAX_LENGTH,
+            description='The words to search: "quoted phrase", or, -excluded',
+        ),
+    ],
+    limit: Annotated[int, Query(ge=1, le=SEARCH_MAX_PAGE_SIZE)] = SEARCH_PAGE_SIZE,
+    cursor: Annotated[
+        Optional[str], Query(description="next_cursor of the previous page")
+    ] = None,
+    fields: FrozenSet[str] = Depends(get_tweet_fields),
+):
+    """
+    The endpoint for the full-text search of the tweets, the most relevant first.
+    The relevance is ranked in blocks of the matches: the newest block first,
+    then the next older one and so on, so common words are not ranked over
+    the whole table. The pages are linked by next_cursor and go through
+    all the matches
+    """
+    logger.info("Searching tweets")
+    session: AsyncSession = request.state.session
+
+    after: Optional[Tuple[float, int, int]] = None
+    if cursor is not None:
+        rank, tweet_id, max_id = decode_cursor(cursor, float, int, int)
+        after = (rank, tweet_id, max_id)
+    found = await q.search_tweets(session, query, limit, after, fields)
+    next_cursor: Optional[str] = None
+    if len(found) == limit:
+        last_tweet, last_rank, max_id = found[-1]
+        next_cursor = encode_cursor(last_rank, last_tweet.id, max_id)
+    return await tweets_response(
+        request, [tweet for tweet, _, _ in found], fields, next_cursor=next_cursor
+    )
+
 
-    if following is None:  # mypy
-        following = list()
-    authors_tweets: List[List[models.Tweet]] = await asyncio.gather(
-        *[q.get_user_tweets(session, author) for author in following]
+@tweets_router.get(
+    "/api/hashtags/{hashtag}/tweets",
+    status_code=200,
+    response_model=schemas.TweetPageOutSchema,
+    responses={
+        200: MSGPACK_RESPONSE,
+        401: {
+            "description": "api_key not exists",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "result": False,
+                        "error_type": "IdentificationError",
+                        "error_message": "api_key {api_key} not exists",
+                    }
+                }
+            },
+        },
+    },
+)
+async def get_hashtag_tweets(
+    request: Request,
+    hashtag: Annotated[str, Path(max_length=HASHTAG_MAX_LENGTH)],
+    limit: Annotated[int, Query(ge=1, le=FEED_MAX_PAGE_SIZE)] = FEED_PAGE_SIZE,
+    cursor: Annotated[
+        Optional[str], Query(description="next_cursor of the previous page")
+    ] = None,
+    fields: FrozenSet[str] = Depends(get_tweet_fields),
+):
+    """
+    The endpoint for the tweets with the hashtag (case-insensitive,
+    with or without #), the newest first. The pages are linked by next_cursor
+    """
+    logger.info("Getting tweets of the hashtag")
+    session: AsyncSession = request.state.session
+    before: Optional[int] = None
+    if cursor is not None:
+        (before,) = decode_cursor(cursor, int)
+    tweets: List[models.Tweet] = await q.get_hashtag_tweets(
+        session, hashtag.removeprefix("#").lower(), limit, before, fields
     )
-    for author_tweets in authors_tweets:
-        following_tweets.extend(author_tweets)
-    # sort the list by popularity (by the number of likes)
-    following_tweets.sort(
-        key=lambda tweet: len(tweet.users_like) if tweet.users_like else 0, reverse=True
-    )  # mypy
-
-    result: Dict[str, Any] = {
+    return await tweets_response(
+        request, tweets, fields, next_cursor=_next_tweets_cursor(tweets, limit)
+    )
+
+
+@tweets_router.get(
+    "/api/users/me/mentions",
+    status_code=200,
+    response_model=schemas.TweetPageOutSchema,
+    responses={
+        200: MSGPACK_RESPONSE,
+        401: {
+            "description": "api_key not exists",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "result": False,
+                        "error_type": "IdentificationError",
+                        "error_message": "api_key {api_key} not exists",
+                    }
+                }
+            },
+        },
+    },
+)
+async def get_mentions(
+    request: Request,
+    limit: Annotated[int, Query(ge=1, le=FEED_MAX_PAGE_SIZE)] = FEED_PAGE_SIZE,
+    cursor: Annotated[
+        Optional[str], Query(description="next_cursor of the previous page")
+    ] = None,
+    fields: FrozenSet[str] = Depends(get_tweet_fields),
+):
+    """
+    The endpoint for the tweets mentioning the current user (@name),
+    the newest first. The pages are linked by next_cursor
+    """
+    logger.info("Getting mentions of the user")
+    session: AsyncSession = request.state.session
+    user: models.User = request.state.current_user
+    before: Optional[int] = None
+    if cursor is not None:
+        (before,) = decode_cursor(cursor, int)
+    tweets: List[models.Tweet] = await q.get_mentions(
+        session, user.id, limit, before, fields
+    )
+    return await tweets_response(
+        request, tweets, fields, next_cursor=_next_tweets_cursor(tweets, limit)
+    )
+
+
+@tweets_router.get(
+    "/api/users/{user_id}/tweets",
+    status_code=200,
+    response_model=schemas.TweetPageOutSchema,
+    responses={
+        200: MSGPACK_RESPONSE,
+        401: {
+            "description": "api_key not exists",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "result": False,
+                        "error_type": "IdentificationError",
+                        "error_message": "api_key {api_key} not exists",
+                    }
+                }
+            },
+        },
+        404: {
+            "description": "User not found",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "result": False,
+                        "error_type": "NotFoundError",
+                        "error_message": "user_id {user_id} not exists",
+                    }
+                }
+            },
+        },
+    },
+)
+async def get_user_tweets(
+    request: Request,
+    user_id: int,
+    limit: Annotated[int, Query(ge=1, le=FEED_MAX_PAGE_SIZE)] = FEED_PAGE_SIZE,
+    cursor: Annotated[
+        Optional[str], Query(description="next_cursor of the previous page")
+    ] = None,
+    fields: FrozenSet[str] = Depends(get_tweet_fields),
+):
+    """
+    The endpoint for the tweets of the user, the newest first.
+    The pages are linked by next_cursor
+    """
+    logger.info("Getting tweets of the user")
+    session: AsyncSession = request.state.session
+    before: Optional[int] = None
+    if cursor is not None:
+        (before,) = decode_cursor(cursor, int)
+    tweets: List[models.Tweet] = await q.get_user_tweets(
+        session, user_id, limit, before, fields
+    )
+    if not tweets:
+        # the user is checked only for the empty page
+        await check_users_exist(user_id, session, fields=())
+    return await tweets_response(
+        request, tweets, fields, next_cursor=_next_tweets_cursor(tweets, limit)
+    )
+
+
+@tweets_router.get(
+    "/api/tweets/{tweet_id}/likes",
+    status_code=200,
+    response_model=schemas.LikesOutSchema,
+    responses={
+        401: {
+            "description": "api_key not exists",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "result": False,
+                        "error_type": "IdentificationError",
+                        "error_message": "api_key {api_key} not exists",
+                    }
+                }
+            },
+        },
+        404: {
+            "description": "Tweet not found",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "result": False,
+                        "error_type": "NotFoundError",
+                        "error_message": "tweet_id {tweet_id} not found",
+                    }
+                }
+            },
+        },
+    },
+)
+async def get_tweet_likes(
+    request: Request,
+    tweet_id: int,
+    limit: Annotated[int, Query(ge=1, le=LIKES_MAX_PAGE_SIZE)] = LIKES_PAGE_SIZE,
+    cursor: Annotated[
+        Optional[str], Query(description="next_cursor of the previous page")
+    ] = None,
+):
+    """
+    The endpoint for listing the users who liked the tweet, the latest first.
+    The pages are linked by next_cursor
+    """
+    logger.info("Getting likes of the tweet")
+    session: AsyncSession = request.state.session
+    await check_tweet_exists(tweet_id, session)
+
+    after: Optional[Tuple[datetime, int]] = None
+    if cursor is not None:
+        created_at, user_id = decode_cursor(cursor, datetime.fromisoformat, int)
+        after = (created_at, user_id)
+    likers = await q.get_tweet_likers(session, tweet_id, limit, after)
+
+    next_cursor: Optional[str] = None
+    if len(likers) == limit:
+        last_user_id, _, last_created_at = likers[-1]
+        next_cursor = encode_cursor(last_created_at, last_user_id)
+    return {
         "result": True,
-        "tweets": [await tweet.to_json() for tweet in following_tweets],
+        "likes": [{"user_id": user_id, "name": name} for user_id, name, _ in likers],
+        "next_cursor": next_cursor,
     }
-    logger.debug("Tweet feed: %s", str(result))
-    logger.info("Done")
-    # assemble result
-    return result
@@ -1,5 +1,5 @@
 import logging
-from typing import Any, Dict
+from typing import Any, Dict, FrozenSet
 
 from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -7,7 +7,10 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from src.database import models
 from src.database import queries as q
 from src.schemas import schemas
-from src.service.web import check_api_key, check_users_exist
+from src.service.responses import MSGPACK_RESPONSE, negotiated_response
+from src.service.serializers import serialize_user
+from src.service.timing import measure
+from src.service.web import check_api_key, check_users_exist, get_user_fields
 
 users_router = APIRouter(tags=["users"])
 
@@ -95,7 +98,7 @@ async def follow_user(request: Request, user_id: int):
     try:
         await q.follow_author(session, follower, author)
     except ValueError as exc:
-        logger.warning(str(exc))
+        logger.warning("%s", exc)
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
     logger.info("Successful following")
 
@@ -187,23 +190,18 @@ async def unfollow_user(
     try:
         await q.unfollow_author(session, follower, author)
     except ValueError as exc:
-        logger.warning(str(exc))
+        logger.warning("%s", exc)
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
     logger.info("Successful unfollowing")
 
     return {"result": True}
 
 
-def _get_user_info(user: models.User) -> Dict[str, Any]:
+def _get_user_info(user: models.User, fields: FrozenSet[str]) -> Dict[str, Any]:
     logger.info("Start getting user info")
-    logger.debug("User followers: %s", str(user.followers))
-    logger.debug("The user is subscribed to the authors: %s", str(user.authors))
-
-    result: Dict[str, Any] = dict()
-    result["result"] = True
-    result["user"] = user.full_json()
-
-    return result
+    # the serializer follows FullUserSchema, so the validation is skipped
+    with measure("serialization"):
+        return {"result": True, "user": serialize_user(user, fields)}
 
 
 @users_router.get(
@@ -212,6 +210,7 @@ def _get_user_info(user: models.User) -> Dict[str, Any]:
     response_model=schemas.UserOutSchema,
     dependencies=[Depends(check_api_key)],
     responses={
+        200: MSGPACK_RESPONSE,
         401: {
             "description": "api_key not exists",
             "content": {
@@ -228,15 +227,19 @@ def _get_user_info(user: models.User) -> Dict[str, Any]:
 )
 async def get_current_user_info(
     request: Request,
+    fields: FrozenSet[str] = Depends(get_user_fields),
 ):
     """
     The endpoint for getting info about a current user
     """
     logger.info("Getting info about current user")
-    # check api-key from headers
-    user: models.User = request.state.current_user
-
-    return _get_user_info(user)
+    # the authentication loads the user without the followers and the authors,
+    # only the requested ones are loaded
+    current_user: models.User = request.state.current_user
+    user: models.User = await check_users_exist(
+        current_user.id, request.state.session, fields
+    )
+    return negotiated_response(request, _get_user_info(user, fields))
 
 
 @users_router.get(
@@ -244,6 +247,7 @@ async def get_current_user_info(
     status_code=200,
     response_model=schemas.UserOutSchema,
     responses={
+        200: MSGPACK_RESPONSE,
         404: {
             "description": "User not found",
             "content": {
@@ -258,10 +262,15 @@ async def get_current_user_info(
         },
     },
 )
-async def get_user_info(user_id: int, request: Request):
+async def get_user_info(
+    user_id: int,
+    request: Request,
+    fields: FrozenSet[str] = Depends(get_user_fields),
+):
     """
-    The endpoint for getting info about user
+    The endpoint for getting info about user.
+    Only the requested fields are loaded from the database and returned
     """
     session = request.state.session
-    user: models.User = await check_users_exist(user_id, session)
-    return _get_user_info(user)
+    user: models.User = await check_users_exist(user_id, session, fields)
+    return negotiated_response(request, _get_user_info(user, fields))
@@ -1,5 +1,6 @@
-from dataclasses import dataclass
-from typing import Union
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Optional, Union
 
 from environs import Env
 
@@ -7,12 +8,77 @@ from environs import Env
 @dataclass
 class DB:
     url: str
+    replica_url: Optional[str] = None
+    read_your_writes_window: float = 5.0
+    # the key of the signature of the last write cookie, the url by default
+    read_your_writes_secret: Optional[str] = None
+
+
+@dataclass
+class Ranking:
+    """Popularity ranking of the feed: score = likes / (age_hours + 2) ^ gravity"""
+
+    gravity: float = 1.8
+    refresh_interval: float = 60.0
+    # hours: older tweets keep their last scores, which hardly change any more
+    refresh_max_age: float = 168.0
+
+
+@dataclass
+class Profiling:
+    """
+    Sampling profiler of the requests.
+    A request is profiled on demand with ?profile=html|speedscope
+    (or the X-Profile header) in the debug mode or with the X-Profile-Token
+    header equal to token. Besides, every sample_every-th request is profiled
+    into directory, which keeps the last max_files profiles
+    """
+
+    token: Optional[str] = None
+    sample_every: int = 0
+    directory: str = "profiles"
+    max_files: int = 100
+    interval: float = 0.001
+
+
+@dataclass
+class Metrics:
+    """
+    The Prometheus metrics at /metrics. They are scraped in the debug mode
+    or with the Authorization: Bearer header equal to token
+    """
+
+    token: Optional[str] = None
+
+
+@dataclass
+class Server:
+    """
+    The production server: gunicorn with uvicorn workers.
+    workers=0 means one worker per available CPU. A worker is restarted after
+    max_requests (+ random jitter, so they do not restart at once) requests.
+    On shutdown the workers finish the requests in flight
+    during graceful_timeout seconds
+    """
+
+    host: str = "0.0.0.0"
+    port: int = 5000
+    workers: int = 0
+    max_requests: int = 10000
+    max_requests_jitter: int = 1000
+    graceful_timeout: int = 30
+    keepalive: int = 5
+    preload: bool = True
 
 
 @dataclass
 class Config:
     db: DB
     env: str
+    ranking: Ranking = field(default_factory=Ranking)
+    profiling: Profiling = field(default_factory=Profiling)
+    metrics: Metrics = field(default_factory=Metrics)
+    server: Server = field(default_factory=Server)
 
 
 def _get_db_url(env: Env):
@@ -27,10 +93,62 @@ def _get_db_url(env: Env):
         return env("DB_URL")
 
 
+def _get_replica_url(env: Env) -> Optional[str]:
+    """The function returns the url of the read replica for the current ENV.
+    The replica is optional, so None is returned if it is not configured"""
+    mode: str = env("ENV")
+    if mode == "debug":
+        url = env("DB_REPLICA_URL_DEBUG", None)
+    elif mode == "test":
+        url = env("DB_REPLICA_URL_TEST", None)
+    else:
+        url = env("DB_REPLICA_URL", None)
+    # an empty variable in .env means that there is no replica
+    return url or None
+
+
 def load_config(path: Union[str, None] = None) -> Config:
+    """The function reads the config from the environment and the .env file"""
     env = Env()
     env.read_env(path)
     return Config(
-        db=DB(url=_get_db_url(env)),
+        db=DB(
+            url=_get_db_url(env),
+            replica_url=_get_replica_url(env),
+            read_your_writes_window=env.float("DB_READ_YOUR_WRITES_WINDOW", 5.0),
+            read_your_writes_secret=env("DB_READ_YOUR_WRITES_SECRET", None) or None,
+        ),
         env=env("ENV"),
+        ranking=Ranking(
+            gravity=env.float("RANKING_GRAVITY", 1.8),
+            refresh_interval=env.float("RANKING_REFRESH_INTERVAL", 60.0),
+            refresh_max_age=env.float("RANKING_REFRESH_MAX_AGE", 168.0),
+        ),
+        profiling=Profiling(
+            token=env("PROFILING_TOKEN", None) or None,
+            sample_every=env.int("PROFILING_SAMPLE_EVERY", 0),
+            directory=env("PROFILING_DIR", "profiles"),
+            max_files=env.int("PROFILING_MAX_FILES", 100),
+            interval=env.float("PROFILING_INTERVAL", 0.001),
+        ),
+        metrics=Metrics(token=env("METRICS_TOKEN", None) or None),
+        server=Server(
+            host=env("SERVER_HOST", "0.0.0.0"),
+            port=env.int("SERVER_PORT", 5000),
+            workers=env.int("SERVER_WORKERS", 0),
+            max_requests=env.int("SERVER_MAX_REQUESTS", 10000),
+            max_requests_jitter=env.int("SERVER_MAX_REQUESTS_JITTER", 1000),
+            graceful_timeout=env.int("SERVER_GRACEFUL_TIMEOUT", 30),
+            keepalive=env.int("SERVER_KEEPALIVE", 5),
+            preload=env.bool("SERVER_PRELOAD", True),
+        ),
     )
+
+
+@lru_cache(maxsize=None)
+def get_config() -> Config:
+    """
+    The function loads the config on the first call and returns the same config
+    afterwards, so importing the modules of the app does not read the environment
+    """
+    return load_config()
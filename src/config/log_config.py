@@ -1,22 +1,142 @@
+"""
+The module configures logging of the app.
+The loggers put the records into a queue and return immediately,
+the records are formatted into JSON lines and written by a listener thread,
+so logging never blocks the event loop
+"""
+
+import atexit
+import logging
+import os
+from datetime import datetime, timezone
+from itertools import count
+from logging.config import dictConfig
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
+from typing import Any, Dict, Iterator, Optional
+
+import orjson
+
+# the attributes of every LogRecord, the others are passed with extra=
+_RECORD_ATTRS = frozenset(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+log_queue: "SimpleQueue[logging.LogRecord]" = SimpleQueue()
+_listener: Optional[QueueListener] = None
+# the process, which runs the listener thread
+_listener_pid: Optional[int] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """The formatter writes the record and its extra fields as a JSON line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        result: Dict[str, Any] = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "module": record.module,
+            "func": record.funcName,
+            "line": record.lineno,
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                result[key] = value
+        if record.exc_info:
+            result["exc_info"] = self.formatException(record.exc_info)
+        return orjson.dumps(result, default=str).decode()
+
+
+class LazyQueueHandler(QueueHandler):
+    """
+    The handler puts the record into the queue as is.
+    QueueHandler formats the message before putting it,
+    here it is done by the listener thread. The arguments of the log calls
+    must not be mutated afterwards
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class SamplingFilter(logging.Filter):
+    """
+    The filter keeps only every n-th DEBUG and INFO record of a logger.
+    Warnings and errors are never dropped
+    :param every: logger name -> n. The children of the logger are sampled
+    separately with the same n
+    """
+
+    def __init__(self, every: Optional[Dict[str, int]] = None) -> None:
+        super().__init__()
+        self.every: Dict[str, int] = every or dict()
+        self._counters: Dict[str, Iterator[int]] = dict()
+
+    def _get_every(self, name: str) -> int:
+        while name:
+            if name in self.every:
+                return self.every[name]
+            name = name.rpartition(".")[0]
+        return 1
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        every: int = self._get_every(record.name)
+        if every <= 1:
+            return True
+        counter = self._counters.setdefault(record.name, count())
+        return next(counter) % every == 0
+
+
 dict_config: dict = {
     "version": 1,
     "disable_existing_loggers": False,
     "formatters": {
-        "base": {
-            "format": "%(filename)s | %(funcName)s |"
-            " %(name)s | %(levelname)s | %(message)s"
-        }
+        "json": {"()": JsonFormatter},
+    },
+    "filters": {
+        # logger name -> keep 1 of n DEBUG and INFO records
+        "sampling": {"()": SamplingFilter, "every": {"query_logger": 10}},
     },
     "handlers": {
-        "console": {
-            "class": "logging.StreamHandler",
+        "queue": {
+            "()": LazyQueueHandler,
+            "queue": log_queue,
             "level": "DEBUG",
-            "formatter": "base",
-        }
+            "filters": ["sampling"],
+        },
     },
     "loggers": {
-        "routes_logger": {"level": "INFO", "handlers": ["console"], "propagate": True},
-        "query_logger": {"level": "INFO", "handlers": ["console"], "propagate": True},
-        "image_logger": {"level": "INFO", "handlers": ["console"], "propagate": True},
+        "routes_logger": {"level": "INFO", "handlers": ["queue"], "propagate": True},
+        "query_logger": {"level": "INFO", "handlers": ["queue"], "propagate": True},
+        "image_logger": {"level": "INFO", "handlers": ["queue"], "propagate": True},
     },
 }
+
+
+def _stop_listener() -> None:
+    if _listener is not None and _listener_pid == os.getpid():
+        _listener.stop()
+
+
+def setup_logging(config: Optional[dict] = None) -> QueueListener:
+    """
+    The function configures the loggers and starts the listener thread,
+    which writes the records to stderr. The listener is started once
+    per process (the thread does not survive fork, e.g. of a preloaded app)
+    and is stopped (with the rest of the queue written) at exit
+    :param config: dict config of the loggers, dict_config by default
+    :return: the listener
+    """
+    global _listener, _listener_pid
+    dictConfig(config or dict_config)
+    if _listener is None:
+        atexit.register(_stop_listener)
+    if _listener is None or _listener_pid != os.getpid():
+        console = logging.StreamHandler()
+        console.setFormatter(JsonFormatter())
+        _listener = QueueListener(log_queue, console, respect_handler_level=True)
+        _listener.start()
+        _listener_pid = os.getpid()
+    return _listener
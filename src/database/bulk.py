@@ -0,0 +1,56 @@
+"""The module is responsible for the bulk writes of the rows (COPY)"""
+
+from typing import Any, Iterable, Iterator, List, Sequence, Tuple
+
+from asyncpg.exceptions import PostgresError
+from sqlalchemy import Table
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+Row = Tuple[Any, ...]
+
+
+def batches(rows: Iterable[Row], size: int) -> Iterator[List[Row]]:
+    """The function splits the rows into the lists of the size"""
+    batch: List[Row] = list()
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = list()
+    if batch:
+        yield batch
+
+
+async def copy_rows(
+    conn: AsyncConnection,
+    table: Table,
+    columns: Sequence[str],
+    rows: Iterable[Row],
+    batch_size: int,
+) -> int:
+    """
+    The function writes the rows with COPY (asyncpg),
+    or with executemany for the other drivers
+    :raise DBAPIError: if the database rejects the rows, for both ways
+    :return: number of the rows
+    """
+    raw = await conn.get_raw_connection()
+    driver: Any = raw.driver_connection
+    use_copy: bool = hasattr(driver, "copy_records_to_table")
+    num: int = 0
+    for batch in batches(rows, batch_size):
+        if use_copy:
+            try:
+                await driver.copy_records_to_table(
+                    table.name, records=batch, columns=list(columns)
+                )
+            except PostgresError as exc:
+                # the error of the server, as executemany would raise it
+                raise DBAPIError(f"COPY {table.name}", None, exc) from exc
+        else:
+            await conn.execute(
+                table.insert(), [dict(zip(columns, row)) for row in batch]
+            )
+        num += len(batch)
+    return num
@@ -0,0 +1,64 @@
+"""
+The module creates the engines and the session factories of the database.
+Nothing is created at import: the app factory creates the Database once
+and keeps it in the state of the app
+"""
+
+from typing import Dict, Optional
+
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+
+from src.config.config import DB
+from src.database.query_counter import instrument_engine
+
+
+class Database:
+    """
+    The engines of the primary and the read replica, and their session factories.
+    The read replica is optional. Without it, read-only sessions use the primary
+    :param engine: engine of the primary
+    :param replica_engine: engine of the read replica
+    """
+
+    def __init__(
+        self, engine: AsyncEngine, replica_engine: Optional[AsyncEngine] = None
+    ) -> None:
+        self.engine: AsyncEngine = engine
+        self.replica_engine: AsyncEngine = replica_engine or engine
+        self.Session = async_sessionmaker(
+            self.engine, expire_on_commit=False, class_=AsyncSession
+        )
+        self.ReplicaSession = async_sessionmaker(
+            self.replica_engine, expire_on_commit=False, class_=AsyncSession
+        )
+        # count the queries of every request (see query_counter)
+        instrument_engine(self.engine)
+        instrument_engine(self.replica_engine)
+
+    @classmethod
+    def from_config(cls, db: DB) -> "Database":
+        """
+        The method creates the engines. They connect on the first query
+        :param db: database config
+        """
+        engine: AsyncEngine = create_async_engine(db.url)
+        return cls(
+            engine, create_async_engine(db.replica_url) if db.replica_url else None
+        )
+
+    @property
+    def engines(self) -> Dict[str, AsyncEngine]:
+        """The engines by the name of the pool"""
+        if self.replica_engine is self.engine:
+            return {"primary": self.engine}
+        return {"primary": self.engine, "replica": self.replica_engine}
+
+    async def dispose(self) -> None:
+        """The method closes the connections of the pools"""
+        for engine in self.engines.values():
+            await engine.dispose()
@@ -1,43 +1,53 @@
 """The module is responsible for the database models (tables)"""
 
-import os
-from typing import Any, Dict, List, Optional
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
 
-from sqlalchemy import ForeignKey, Integer, String, Text, UniqueConstraint
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy import (
+    DDL,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+    UniqueConstraint,
+    event,
+    func,
+    text,
+)
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
-from src.config.config import Config, load_config
-from src.service.func import get_image_name_by_id
-
-config: Config = load_config()
-DB_URL: str = config.db.url
-engine = create_async_engine(DB_URL)
-Session = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
-
 
 class Base(DeclarativeBase):
     pass
 
 
+# Relationships are never loaded implicitly (lazy="raise"),
+# every query in queries.py states the loading strategy it needs
+
+
 class User(Base):
     __tablename__ = "users"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    name: Mapped[str] = mapped_column(String)
+    # the mentions (@name) are resolved by the name
+    name: Mapped[str] = mapped_column(String, index=True)
     api_key: Mapped[str] = mapped_column(String, unique=True, index=True)
     tweets: Mapped[List["Tweet"]] = relationship(
         "Tweet",
         back_populates="user",
-        lazy="joined",
+        lazy="raise",
         cascade="all, delete, delete-orphan",
     )
+    # many-to-many relationships do not cascade deletes: removing a like
+    # or a subscription must not remove the users and tweets themselves
     likes_tweets: Mapped[Optional[List["Tweet"]]] = relationship(
         "Tweet",
         secondary="likes",
         back_populates="users_like",
-        cascade="all, delete",
-        lazy="joined",
+        lazy="raise",
     )
     authors: Mapped[Optional[List["User"]]] = relationship(
         "User",
@@ -45,8 +55,7 @@ class User(Base):
         primaryjoin="User.id==Following.follower_id",
         secondaryjoin="User.id==Following.author_id",
         back_populates="followers",
-        cascade="all, delete",
-        lazy="joined",
+        lazy="raise",
     )
     followers: Mapped[Optional[List["User"]]] = relationship(
         "User",
@@ -54,8 +63,7 @@ class User(Base):
         primaryjoin="User.id==Following.author_id",
         secondaryjoin="User.id==Following.follower_id",
         back_populates="authors",
-        cascade="all, delete",
-        lazy="joined",
+        lazy="raise",
     )
 
     def brief_json(self) -> dict[str, Any]:
@@ -77,51 +85,86 @@ class Tweet(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     tweet_data: Mapped[str] = mapped_column(Text, nullable=False)
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"))
-    user: Mapped["User"] = relationship("User", back_populates="tweets")
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+    # denormalized number of likes and the popularity score,
+    # which is refreshed periodically (see queries.refresh_scores)
+    likes_count: Mapped[int] = mapped_column(
+        Integer, default=0, server_default=text("0"), nullable=False
+    )
+    score: Mapped[float] = mapped_column(
+        Float, default=0.0, server_default=text("0"), nullable=False
+    )
+    user: Mapped["User"] = relationship("User", back_populates="tweets", lazy="raise")
     images: Mapped[Optional[List["Image"]]] = relationship(
-        "Image", lazy="joined", cascade="all, delete, delete-orphan"
+        "Image", lazy="raise", cascade="all, delete, delete-orphan"
     )
     users_like: Mapped[Optional[List["User"]]] = relationship(
         "User",
         secondary="likes",
         back_populates="likes_tweets",
-        cascade="all, delete",
-        lazy="joined",
+        lazy="raise",
+    )
+
+    __table_args__ = (
+        # the pages of the tweets of the user (see queries.get_user_tweets)
+        Index("ix_tweets_user_id_id", "user_id", "id"),
+        Index("ix_tweets_user_id_created_at", "user_id", text("created_at DESC")),
+        Index("ix_tweets_score", text("score DESC"), text("id DESC")),
+        # the recent liked tweets, whose scores are refreshed (queries.refresh_scores)
+        Index(
+            "ix_tweets_created_at_liked",
+            "created_at",
+            postgresql_where=text("likes_count > 0"),
+        ),
     )
 
-    async def to_json(self):
-        tweet_json: Dict[str, Any] = dict()
-        tweet_json["id"] = self.id
-        tweet_json["content"] = self.tweet_data
 
-        # add attachments
-        cur_dir_path: str = os.path.dirname(__file__)
-        images_dir: str = os.path.join(
-            cur_dir_path, "..", "..", "client", "static", "images"
+# Full-text search of the tweets (see queries.search_tweets).
+# The search data is created by DDL and is never loaded by the ORM
+SEARCH_CONFIG: str = "english"
+SEARCH_VECTOR_COLUMN: str = "search_vector"
+SEARCH_VECTOR_INDEX: str = "ix_tweets_search_vector"
+SEARCH_FTS_TABLE: str = "tweets_fts"
+# dialect -> DDL after the creation of the tweets table
+SEARCH_DDL: Dict[str, Tuple[str, ...]] = {
+    # the generated tsvector column with the GIN index
+    "postgresql": (
+        f"ALTER TABLE tweets ADD COLUMN {SEARCH_VECTOR_COLUMN} tsvector"
+        f" GENERATED ALWAYS AS (to_tsvector('{SEARCH_CONFIG}', tweet_data)) STORED",
+        f"CREATE INDEX {SEARCH_VECTOR_INDEX} ON tweets"
+        f" USING gin ({SEARCH_VECTOR_COLUMN})",
+    ),
+    # the local backend: the external content FTS5 table,
+    # which the triggers keep in sync with the tweets
+    "sqlite": (
+        f"CREATE VIRTUAL TABLE {SEARCH_FTS_TABLE} USING fts5("
+        "tweet_data, content='tweets', content_rowid='id')",
+        f"CREATE TRIGGER {SEARCH_FTS_TABLE}_insert AFTER INSERT ON tweets BEGIN"
+        f" INSERT INTO {SEARCH_FTS_TABLE}(rowid, tweet_data)"
+        " VALUES (new.id, new.tweet_data); END",
+        f"CREATE TRIGGER {SEARCH_FTS_TABLE}_delete AFTER DELETE ON tweets BEGIN"
+        f" INSERT INTO {SEARCH_FTS_TABLE}({SEARCH_FTS_TABLE}, rowid, tweet_data)"
+        " VALUES ('delete', old.id, old.tweet_data); END",
+        f"CREATE TRIGGER {SEARCH_FTS_TABLE}_update AFTER UPDATE OF tweet_data"
+        " ON tweets BEGIN"
+        f" INSERT INTO {SEARCH_FTS_TABLE}({SEARCH_FTS_TABLE}, rowid, tweet_data)"
+        " VALUES ('delete', old.id, old.tweet_data);"
+        f" INSERT INTO {SEARCH_FTS_TABLE}(rowid, tweet_data)"
+        " VALUES (new.id, new.tweet_data); END",
+    ),
+}
+for dialect, statements in SEARCH_DDL.items():
+    for statement in statements:
+        event.listen(
+            Tweet.__table__, "after_create", DDL(statement).execute_if(dialect=dialect)
         )
-        tweet_json["attachments"] = list()
-        if self.images is not None:  # mypy
-            for image in self.images:
-                image_name: Optional[str] = await get_image_name_by_id(
-                    image_id=image.id, images_path=images_dir
-                )
-                if image_name is None:
-                    image_name = ""
-                tweet_json["attachments"].append(
-                    os.path.join("client", "static", "images", image_name)
-                )
-
-        tweet_json["author"] = self.user.brief_json()
-
-        # add likes
-        if self.users_like is not None:  # mypy
-            tweet_json["likes"] = [
-                {"user_id": user.id, "name": user.name} for user in self.users_like
-            ]
-        else:
-            tweet_json["likes"] = list()
-
-        return tweet_json
+event.listen(
+    Tweet.__table__,
+    "before_drop",
+    DDL(f"DROP TABLE IF EXISTS {SEARCH_FTS_TABLE}").execute_if(dialect="sqlite"),
+)
 
 
 class Image(Base):
@@ -129,7 +172,7 @@ class Image(Base):
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     tweet_id: Mapped[Optional[int]] = mapped_column(
-        Integer, ForeignKey("tweets.id"), nullable=True
+        Integer, ForeignKey("tweets.id"), nullable=True, index=True
     )
 
 
@@ -143,8 +186,88 @@ class Like(Base):
     tweet_id: Mapped[int] = mapped_column(
         Integer, ForeignKey("tweets.id"), nullable=False
     )
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
 
-    __table_args__ = (UniqueConstraint("user_id", "tweet_id", name="unq_likes"),)
+    __table_args__ = (
+        UniqueConstraint("user_id", "tweet_id", name="unq_likes"),
+        Index("ix_likes_user_id_created_at", "user_id", text("created_at DESC")),
+        # the latest likers of a tweet; also serves the foreign key
+        Index(
+            "ix_likes_tweet_id_created_at",
+            "tweet_id",
+            text("created_at DESC"),
+            text("user_id DESC"),
+        ),
+    )
+
+
+# The inverted index of the hashtags (#tag) and the mentions (@name)
+# of the tweets (see queries.add_tweets_entities). The primary keys start with
+# the hashtag and the user, so their tweets are read by the index, newest first
+
+
+class Hashtag(Base):
+    __tablename__ = "hashtags"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    # lowercase, without #
+    name: Mapped[str] = mapped_column(String, nullable=False, unique=True)
+
+
+class TweetHashtag(Base):
+    __tablename__ = "tweet_hashtags"
+
+    hashtag_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("hashtags.id"), primary_key=True
+    )
+    tweet_id: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey("tweets.id", ondelete="CASCADE"),
+        primary_key=True,
+        index=True,
+    )
+
+
+class Mention(Base):
+    __tablename__ = "mentions"
+
+    user_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("users.id"), primary_key=True
+    )
+    tweet_id: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey("tweets.id", ondelete="CASCADE"),
+        primary_key=True,
+        index=True,
+    )
+
+
+class BackfillProgress(Base):
+    """The last processed id of a resumable batched job (see service.backfill)"""
+
+    __tablename__ = "backfill_progress"
+
+    job: Mapped[str] = mapped_column(String, primary_key=True)
+    last_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+
+
+class ScoreRefresh(Base):
+    """The last refresh of the popularity scores (see queries.refresh_scores).
+    The table has a single row"""
+
+    __tablename__ = "score_refresh"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    refreshed_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+    # the number of the tweets, whose scores were refreshed
+    refreshed_tweets: Mapped[int] = mapped_column(Integer, nullable=False)
 
 
 class Following(Base):
@@ -155,9 +278,17 @@ class Following(Base):
         Integer, ForeignKey("users.id"), nullable=False
     )
     follower_id: Mapped[int] = mapped_column(
-        Integer, ForeignKey("users.id"), nullable=False
+        Integer, ForeignKey("users.id"), nullable=False, index=True
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
     )
 
     __table_args__ = (
         UniqueConstraint("author_id", "follower_id", name="unq_following"),
+        Index(
+            "ix_following_follower_id_created_at",
+            "follower_id",
+            text("created_at DESC"),
+        ),
     )
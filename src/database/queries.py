@@ -1,16 +1,131 @@
 """The module is responsible for database queries"""
 
-from logging import Logger
-from typing import Dict, List, Optional, Sequence
-
-from sqlalchemy import and_, func, select
+import re
+from datetime import datetime, timedelta
+from logging import getLogger
+from typing import Collection, Dict, List, Optional, Sequence, Set, Tuple, Union
+
+from sqlalchemy import (
+    ColumnElement,
+    Float,
+    Integer,
+    and_,
+    column,
+    func,
+    literal,
+    literal_column,
+    or_,
+    select,
+    table,
+    true,
+    tuple_,
+    union_all,
+    update,
+)
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import InstrumentedAttribute, load_only, selectinload
+from sqlalchemy.orm.interfaces import ORMOption
+
+from src.config.config import Ranking
+
+from .models import (
+    SEARCH_CONFIG,
+    SEARCH_FTS_TABLE,
+    SEARCH_VECTOR_COLUMN,
+    BackfillProgress,
+    Following,
+    Hashtag,
+    Image,
+    Like,
+    Mention,
+    ScoreRefresh,
+    Tweet,
+    TweetHashtag,
+    User,
+)
+
+logger = getLogger("query_logger")
+
+DEFAULT_GRAVITY: float = Ranking.gravity
+# the number of the matches of the search, which are ranked together:
+# the newest ones first, then the next older ones (see search_tweets)
+SEARCH_CANDIDATES: int = 1000
+# the hashtags (#tag) and the mentions (@name) of the tweets: the word after
+# # or @, which is not a part of another word (e.g. of an e-mail)
+ENTITY_PATTERN = re.compile(r"(?<![\w#@])([#@])(\w{1,100})")
+# max rows of one INSERT of the entities
+ENTITIES_CHUNK: int = 5000
+# advisory lock, which allows only one worker to refresh the scores at a time
+REFRESH_SCORES_LOCK: int = 302
+# the id of the single row of score_refresh, the time of the last refresh
+SCORE_REFRESH_ID: int = 1
+
+# field of the tweet response -> the columns and the relationships, which it needs.
+# The related users are loaded without the columns, which are never serialized
+_TWEET_FIELDS_COLUMNS: Dict[str, Tuple[InstrumentedAttribute, ...]] = {
+    "content": (Tweet.tweet_data,),
+    "author": (Tweet.user_id,),
+    "likes_count": (Tweet.likes_count,),
+}
+# the likes of the tweets are loaded by get_top_likers
+_TWEET_FIELDS_RELATIONSHIPS: Dict[str, ORMOption] = {
+    "attachments": selectinload(Tweet.images).load_only(Image.id),
+    "author": selectinload(Tweet.user).load_only(User.id, User.name),
+}
+# field of the user response -> the relationship, which it needs
+_USER_FIELDS_RELATIONSHIPS: Dict[str, ORMOption] = {
+    "followers": selectinload(User.followers).load_only(User.id, User.name),
+    "following": selectinload(User.authors).load_only(User.id, User.name),
+}
+
+
+def tweet_fields_options(fields: Optional[Collection[str]] = None) -> List[ORMOption]:
+    """
+    Function returns the loader options of the tweets,
+    which load only the data of the requested response fields
+    :param fields: the fields of the response, all of them if None
+    :return: list of loader options
+    """
+    if fields is None:
+        fields = {*_TWEET_FIELDS_COLUMNS, *_TWEET_FIELDS_RELATIONSHIPS}
+    columns: List[InstrumentedAttribute] = [Tweet.id]
+    for field in fields:
+        columns.extend(_TWEET_FIELDS_COLUMNS.get(field, ()))
+    return [load_only(*columns)] + [
+        option
+        for field, option in _TWEET_FIELDS_RELATIONSHIPS.items()
+        if field in fields
+    ]
+
+
+def user_fields_options(fields: Optional[Collection[str]] = None) -> List[ORMOption]:
+    """
+    Function returns the loader options of the user,
+    which load only the relationships of the requested response fields
+    :param fields: the fields of the response, all of them if None
+    :return: list of loader options
+    """
+    return [
+        option
+        for field, option in _USER_FIELDS_RELATIONSHIPS.items()
+        if fields is None or field in fields
+    ]
 
-from .models import Following, Image, Like, Tweet, User
 
-logger = Logger("query_logger")
-logger.setLevel("DEBUG")
+def score_expression(
+    likes_count: Union[ColumnElement, InstrumentedAttribute],
+    gravity: float = DEFAULT_GRAVITY,
+) -> ColumnElement:
+    """
+    Function returns the SQL expression of the popularity score of a tweet:
+    likes / (age_hours + 2) ^ gravity. Old tweets sink even if they have many likes
+    :param likes_count: expression with the number of likes
+    :param gravity: how fast the score decays with the age of the tweet
+    :return: SQL expression
+    """
+    age_hours = func.extract("epoch", func.now() - Tweet.created_at) / 3600
+    return likes_count / func.power(age_hours + 2, gravity)
 
 
 async def count_users(session: AsyncSession) -> Optional[int]:
@@ -46,16 +161,11 @@ async def get_user_by_api_key(session: AsyncSession, api_key: str) -> Optional[U
     :param session: session object
     :param api_key: user's api_key
     :type api_key: str
-    :return: user_id, if such api_key exists, else None
-    :rtype: Optional[int]
+    :return: user without the relationships, if such api_key exists, else None
+    :rtype: Optional[User]
     """
-    user = await session.execute(
-        select(User)
-        .where(User.api_key == api_key)
-        .options(selectinload(User.followers))
-        .options(selectinload(User.authors))
-        .options(selectinload(User.tweets))
-    )
+    # every request is authenticated, so no collections are loaded here
+    user = await session.execute(select(User).where(User.api_key == api_key))
     return user.scalars().first()
 
 
@@ -71,7 +181,6 @@ async def create_tweet(session: AsyncSession, user_id: int, tweet_data: Dict) ->
     :rtype: int
     """
     logger.info("Start creating tweet")
-    print("Start creating tweet")
     tweet_data["user_id"] = user_id
     images_ids: Optional[List[int]] = tweet_data.pop("tweet_media_ids")
 
@@ -83,11 +192,110 @@ async def create_tweet(session: AsyncSession, user_id: int, tweet_data: Dict) ->
     tweet = Tweet(**tweet_data)
     tweet.images = list(images)
     session.add(tweet)
+    await session.flush()
+    # the hashtags and the mentions are committed with the tweet
+    await add_tweets_entities(session, [(tweet.id, tweet.tweet_data)])
     await session.commit()
 
     return tweet.id
 
 
+def extract_entities(tweet_data: str) -> Tuple[List[str], List[str]]:
+    """
+    Function parses the text of the tweet
+    :param tweet_data: the text of the tweet
+    :return: the hashtags (lowercase, without #) and the mentioned names
+    (without @), without duplicates, in the order of the text
+    """
+    hashtags: Dict[str, None] = dict()
+    names: Dict[str, None] = dict()
+    for sign, word in ENTITY_PATTERN.findall(tweet_data):
+        if sign == "#":
+            hashtags[word.lower()] = None
+        else:
+            names[word] = None
+    return list(hashtags), list(names)
+
+
+def _insert(session: AsyncSession, model: type) -> postgresql.Insert:
+    """INSERT of the dialect of the session, which supports ON CONFLICT"""
+    dialect = sqlite if session.get_bind().dialect.name == "sqlite" else postgresql
+    return dialect.insert(model)
+
+
+async def add_tweets_entities(
+    session: AsyncSession, tweets: Sequence[Tuple[int, str]]
+) -> None:
+    """
+    Function adds the hashtags and the mentions of the tweets into the index
+    (tweet_hashtags and mentions), without a commit. The new hashtags are created,
+    the mentions of unknown and ambiguous names are skipped. The existing rows are kept,
+    so the tweets can be added again
+    :param session: session object
+    :param tweets: list of (tweet_id, tweet_data)
+    :return: None
+    """
+    tweets_hashtags: List[Tuple[int, List[str]]] = list()
+    tweets_names: List[Tuple[int, List[str]]] = list()
+    for tweet_id, tweet_data in tweets:
+        hashtags, names = extract_entities(tweet_data)
+        if hashtags:
+            tweets_hashtags.append((tweet_id, hashtags))
+        if names:
+            tweets_names.append((tweet_id, names))
+
+    rows: List[Dict] = list()
+    if tweets_hashtags:
+        all_hashtags: Set[str] = {tag for _, tags in tweets_hashtags for tag in tags}
+        # sorted, so the concurrent inserts lock the names in the same order
+        new_rows: List[Dict] = [{"name": tag} for tag in sorted(all_hashtags)]
+        for start in range(0, len(new_rows), ENTITIES_CHUNK):
+            await session.execute(
+                _insert(session, Hashtag)
+                .values(new_rows[start : start + ENTITIES_CHUNK])
+                .on_conflict_do_nothing()
+            )
+        hashtags_q = await session.execute(
+            select(Hashtag.name, Hashtag.id).where(Hashtag.name.in_(all_hashtags))
+        )
+        hashtags_ids: Dict[str, int] = {row[0]: row[1] for row in hashtags_q.all()}
+        rows = [
+            {"hashtag_id": hashtags_ids[tag], "tweet_id": tweet_id}
+            for tweet_id, tags in tweets_hashtags
+            for tag in tags
+        ]
+        for start in range(0, len(rows), ENTITIES_CHUNK):
+            await session.execute(
+                _insert(session, TweetHashtag)
+                .values(rows[start : start + ENTITIES_CHUNK])
+                .on_conflict_do_nothing()
+            )
+
+    if tweets_names:
+        all_names: Set[str] = {name for _, names in tweets_names for name in names}
+        # the names are not unique: a name of several users is ambiguous
+        # and is not a mention of any of them
+        users_q = await session.execute(
+            select(User.name, func.min(User.id))
+            .where(User.name.in_(all_names))
+            .group_by(User.name)
+            .having(func.count() == 1)
+        )
+        users_ids: Dict[str, int] = {row[0]: row[1] for row in users_q.all()}
+        rows = [
+            {"user_id": users_ids[name], "tweet_id": tweet_id}
+            for tweet_id, names in tweets_names
+            for name in names
+            if name in users_ids
+        ]
+        for start in range(0, len(rows), ENTITIES_CHUNK):
+            await session.execute(
+                _insert(session, Mention)
+                .values(rows[start : start + ENTITIES_CHUNK])
+                .on_conflict_do_nothing()
+            )
+
+
 async def add_image(session: AsyncSession) -> int:
     """
     Function for adding information about an image.
@@ -118,6 +326,41 @@ async def get_images_by_ids(
     return images_q.scalars().all()
 
 
+async def lock_free_images(
+    session: AsyncSession, images_ids: Collection[int]
+) -> Set[int]:
+    """
+    Function locks the images, which are not attached to tweets,
+    until the end of the transaction
+    :param session: session object
+    :param images_ids: ids of the images
+    :return: ids of the existing images without tweets
+    """
+    images_q = await session.execute(
+        select(Image.id)
+        .where(Image.id.in_(images_ids), Image.tweet_id.is_(None))
+        .order_by(Image.id)
+        .with_for_update()
+    )
+    return {row[0] for row in images_q.all()}
+
+
+async def attach_images(session: AsyncSession, tweets_ids: Dict[int, int]) -> None:
+    """
+    Function attaches the images to the tweets, without a commit
+    :param session: session object
+    :param tweets_ids: image id -> tweet id
+    :return: None
+    """
+    await session.execute(
+        update(Image),
+        [
+            {"id": image_id, "tweet_id": tweet_id}
+            for image_id, tweet_id in tweets_ids.items()
+        ],
+    )
+
+
 async def get_all_images_ids(session: AsyncSession) -> List[int]:
     """Function returns all images ids"""
     images_q = await session.execute(select(Image.id))
@@ -125,9 +368,9 @@ async def get_all_images_ids(session: AsyncSession) -> List[int]:
 
 
 async def get_tweet_by_id(session: AsyncSession, tweet_id: int) -> Optional[Tweet]:
-    """Function returns tweet by id"""
+    """Function returns tweet by id. Relationships of the tweet are not loaded"""
     get_tweet_q = await session.execute(select(Tweet).where(Tweet.id == tweet_id))
-    return get_tweet_q.unique().scalar_one_or_none()
+    return get_tweet_q.scalar_one_or_none()
 
 
 async def get_images_ids_by_tweet_id(
@@ -143,13 +386,38 @@ async def get_images_ids_by_tweet_id(
 async def delete_tweet_by_id(session: AsyncSession, tweet_id: int) -> None:
     """Function delete the tweet from db by id.
     Returns list of images ids, which relate to this tweet or None"""
-    tweet: Optional[Tweet] = await get_tweet_by_id(session, tweet_id)
+    # the cascades need the images and the likes of the tweet
+    get_tweet_q = await session.execute(
+        select(Tweet)
+        .where(Tweet.id == tweet_id)
+        .options(selectinload(Tweet.images))
+        .options(selectinload(Tweet.users_like))
+    )
+    tweet: Optional[Tweet] = get_tweet_q.scalar_one_or_none()
     if tweet:
         await session.delete(tweet)
         await session.commit()
 
 
-async def like_tweet(session: AsyncSession, tweet: Tweet, user: User) -> None:
+async def _update_likes_count(
+    session: AsyncSession, tweet: Tweet, delta: int, gravity: float
+) -> None:
+    """Function changes the number of likes of the tweet and rescores it"""
+    await session.execute(
+        update(Tweet)
+        .where(Tweet.id == tweet.id)
+        .values(
+            likes_count=Tweet.likes_count + delta,
+            score=score_expression(Tweet.likes_count + delta, gravity),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    session.expire(tweet, ["likes_count", "score"])
+
+
+async def like_tweet(
+    session: AsyncSession, tweet: Tweet, user: User, gravity: float = DEFAULT_GRAVITY
+) -> None:
     q = await session.execute(
         select(Like).where(and_(Like.user_id == user.id, Like.tweet_id == tweet.id))
     )
@@ -161,12 +429,16 @@ async def like_tweet(session: AsyncSession, tweet: Tweet, user: User) -> None:
 
     new_like = Like(user_id=user.id, tweet_id=tweet.id)
     session.add(new_like)
-    await session.refresh(user)
-    await session.refresh(tweet)
+    await _update_likes_count(session, tweet, 1, gravity)
+    # the collections are reloaded by the next query which needs them
+    session.expire(user, ["likes_tweets"])
+    session.expire(tweet, ["users_like"])
     await session.commit()
 
 
-async def unlike_tweet(session: AsyncSession, tweet: Tweet, user: User) -> None:
+async def unlike_tweet(
+    session: AsyncSession, tweet: Tweet, user: User, gravity: float = DEFAULT_GRAVITY
+) -> None:
     q = await session.execute(
         select(Like).where(and_(Like.user_id == user.id, Like.tweet_id == tweet.id))
     )
@@ -175,18 +447,34 @@ async def unlike_tweet(session: AsyncSession, tweet: Tweet, user: User) -> None:
         raise ValueError(f"The tweet {tweet.id} already has not a user {user.id} like.")
 
     await session.delete(like)
-    await session.refresh(user)
-    await session.refresh(tweet)
+    await _update_likes_count(session, tweet, -1, gravity)
+    # the collections are reloaded by the next query which needs them
+    session.expire(user, ["likes_tweets"])
+    session.expire(tweet, ["users_like"])
     await session.commit()
 
 
-async def get_user_by_id(session: AsyncSession, user_id: int) -> Optional[User]:
-    """Function returns user by id"""
+async def get_users_ids_by_api_keys(
+    session: AsyncSession, api_keys: Collection[str]
+) -> Dict[str, int]:
+    """
+    Function resolves the api keys of the users
+    :param session: session object
+    :param api_keys: api keys of the users
+    :return: api_key -> user id of the existing users
+    """
+    users_q = await session.execute(
+        select(User.api_key, User.id).where(User.api_key.in_(api_keys))
+    )
+    return {row[0]: row[1] for row in users_q.all()}
+
+
+async def get_user_by_id(
+    session: AsyncSession, user_id: int, fields: Optional[Collection[str]] = None
+) -> Optional[User]:
+    """Function returns user by id with the relationships of the response fields"""
     get_user_q = await session.execute(
-        select(User)
-        .where(User.id == user_id)
-        .options(selectinload(User.followers))
-        .options(selectinload(User.authors))
+        select(User).where(User.id == user_id).options(*user_fields_options(fields))
     )
     return get_user_q.scalars().first()
 
@@ -207,8 +495,9 @@ async def follow_author(session: AsyncSession, follower: User, author: User) ->
         )
     new_following = Following(follower_id=follower.id, author_id=author.id)
     session.add(new_following)
-    await session.refresh(author)
-    await session.refresh(follower)
+    # the collections are reloaded by the next query which needs them
+    session.expire(author, ["followers"])
+    session.expire(follower, ["authors"])
     await session.commit()
 
 
@@ -228,14 +517,503 @@ async def unfollow_author(session: AsyncSession, follower: User, author: User) -
             f" unsubscribed from the author {author.id}"
         )
     await session.delete(pair)
-    await session.refresh(author)
-    await session.refresh(follower)
+    # the collections are reloaded by the next query which needs them
+    session.expire(author, ["followers"])
+    session.expire(follower, ["authors"])
     await session.commit()
 
 
-async def get_user_tweets(session: AsyncSession, user: User) -> List[Tweet]:
-    """Function returns list of tweets by user"""
-    get_user_tweet_q = await session.execute(
-        select(Tweet).where(Tweet.user_id == user.id).options(selectinload(Tweet.user))
+async def get_user_tweets(
+    session: AsyncSession,
+    user_id: int,
+    limit: int,
+    before: Optional[int] = None,
+    fields: Optional[Collection[str]] = None,
+) -> List[Tweet]:
+    """
+    Function returns the tweets of the user, the newest first.
+    The tweets are read in the order of the index on (user_id, id)
+    :param session: session object
+    :param user_id: the author id
+    :param limit: page size
+    :param before: the id of the last tweet of the previous page
+    :param fields: the fields of the response, all of them if None
+    :return: list of tweets with the data of the fields
+    """
+    get_tweets_q = select(Tweet).where(Tweet.user_id == user_id)
+    if before is not None:
+        get_tweets_q = get_tweets_q.where(Tweet.id < before)
+    tweets_q = await session.execute(
+        get_tweets_q.order_by(Tweet.id.desc())
+        .limit(limit)
+        .options(*tweet_fields_options(fields))
     )
-    return list(get_user_tweet_q.unique().scalars().all())
+    return list(tweets_q.scalars().all())
+
+
+async def get_feed_streams(
+    session: AsyncSession, follower_id: int, limit: int
+) -> List[Tuple[int, int, datetime]]:
+    """
+    Function returns the latest tweets of every author followed by the user.
+    Each author contributes at most limit tweets,
+    which are taken from the index (user_id, created_at DESC)
+    :param session: session object
+    :param follower_id: the follower id
+    :param limit: max number of tweets of one author
+    :return: list of rows (author_id, tweet_id, created_at)
+    """
+    latest_tweets = (
+        select(Tweet.id, Tweet.created_at)
+        .where(Tweet.user_id == Following.author_id)
+        .order_by(Tweet.created_at.desc(), Tweet.id.desc())
+        .limit(limit)
+        .lateral("latest_tweets")
+    )
+    streams_q = await session.execute(
+        select(Following.author_id, latest_tweets.c.id, latest_tweets.c.created_at)
+        .join(latest_tweets, true())
+        .where(Following.follower_id == follower_id)
+    )
+    return [(row[0], row[1], row[2]) for row in streams_q.all()]
+
+
+async def get_top_likers(
+    session: AsyncSession, tweets_ids: List[int], viewer_id: int, limit: int
+) -> Dict[int, List[Tuple[int, str]]]:
+    """
+    Function returns at most limit users who liked each of the tweets.
+    The users followed by the viewer go first, then the latest likers.
+    For every tweet at most 2 * limit likes are read:
+    the followed likers through the follower's index and the unique (user, tweet),
+    the latest likers through the index (tweet_id, created_at DESC)
+    :param session: session object
+    :param tweets_ids: the page of tweets
+    :param viewer_id: the id of the user who reads the feed
+    :param limit: max number of likers of one tweet
+    :return: tweet id -> list of (user_id, name) of the likers
+    """
+    followed_likers = (
+        select(Like.user_id, Like.created_at, literal(0, Integer).label("priority"))
+        .join(
+            Following,
+            and_(
+                Following.author_id == Like.user_id,
+                Following.follower_id == viewer_id,
+            ),
+        )
+        .where(Like.tweet_id == Tweet.id)
+        .order_by(Like.created_at.desc())
+        .limit(limit)
+        .correlate(Tweet)
+    )
+    latest_likers = (
+        select(Like.user_id, Like.created_at, literal(1, Integer).label("priority"))
+        .where(Like.tweet_id == Tweet.id)
+        .order_by(Like.created_at.desc(), Like.user_id.desc())
+        .limit(limit)
+        .correlate(Tweet)
+    )
+    candidates = union_all(followed_likers, latest_likers).subquery("candidates")
+    # a followed user can be one of the latest likers too
+    unique_likers = (
+        select(candidates)
+        .distinct(candidates.c.user_id)
+        .order_by(candidates.c.user_id, candidates.c.priority)
+        .subquery("unique_likers")
+    )
+    top_likers = (
+        select(unique_likers)
+        .order_by(unique_likers.c.priority, unique_likers.c.created_at.desc())
+        .limit(limit)
+        .lateral("top_likers")
+    )
+    likers_q = await session.execute(
+        select(Tweet.id, User.id, User.name)
+        .select_from(Tweet)
+        .join(top_likers, true())
+        .join(User, User.id == top_likers.c.user_id)
+        .where(Tweet.id.in_(tweets_ids))
+        .order_by(top_likers.c.priority, top_likers.c.created_at.desc())
+    )
+    likers: Dict[int, List[Tuple[int, str]]] = {
+        tweet_id: list() for tweet_id in tweets_ids
+    }
+    for tweet_id, user_id, name in likers_q.all():
+        likers[tweet_id].append((user_id, name))
+    return likers
+
+
+async def get_tweet_likers(
+    session: AsyncSession,
+    tweet_id: int,
+    limit: int,
+    after: Optional[Tuple[datetime, int]] = None,
+) -> List[Tuple[int, str, datetime]]:
+    """
+    Function returns the page of the users who liked the tweet, the latest first.
+    The pages are read by the index (tweet_id, created_at DESC, user_id DESC)
+    :param session: session object
+    :param tweet_id: the tweet id
+    :param limit: page size
+    :param after: (created_at, user_id) of the last like of the previous page
+    :return: list of rows (user_id, name, created_at)
+    """
+    get_likers_q = (
+        select(User.id, User.name, Like.created_at)
+        .join(User, User.id == Like.user_id)
+        .where(Like.tweet_id == tweet_id)
+        .order_by(Like.created_at.desc(), Like.user_id.desc())
+        .limit(limit)
+    )
+    if after is not None:
+        created_at, user_id = after
+        get_likers_q = get_likers_q.where(
+            or_(
+                Like.created_at < created_at,
+                and_(Like.created_at == created_at, Like.user_id < user_id),
+            )
+        )
+    likers_q = await session.execute(get_likers_q)
+    return [(row[0], row[1], row[2]) for row in likers_q.all()]
+
+
+async def get_tweets_by_ids(
+    session: AsyncSession,
+    tweets_ids: List[int],
+    fields: Optional[Collection[str]] = None,
+) -> List[Tweet]:
+    """Function returns tweets with the data of the response fields
+    (by default with their authors, images and likes).
+    The tweets are in the same order as tweets_ids"""
+    get_tweets_q = await session.execute(
+        select(Tweet)
+        .where(Tweet.id.in_(tweets_ids))
+        .options(*tweet_fields_options(fields))
+    )
+    tweets: Dict[int, Tweet] = {tweet.id: tweet for tweet in get_tweets_q.scalars()}
+    return [tweets[tweet_id] for tweet_id in tweets_ids if tweet_id in tweets]
+
+
+async def get_popular_feed(
+    session: AsyncSession,
+    follower_id: int,
+    limit: int,
+    fields: Optional[Collection[str]] = None,
+) -> List[Tweet]:
+    """
+    Function returns the most popular tweets from the authors followed by the user.
+    The tweets are read in the order of the index on the score
+    :param session: session object
+    :param follower_id: the follower id
+    :param limit: page size
+    :param fields: the fields of the response, all of them if None
+    :return: list of tweets with the data of the fields
+    """
+    get_tweets_q = await session.execute(
+        select(Tweet)
+        .join(Following, Following.author_id == Tweet.user_id)
+        .where(Following.follower_id == follower_id)
+        .order_by(Tweet.score.desc(), Tweet.id.desc())
+        .limit(limit)
+        .options(*tweet_fields_options(fields))
+    )
+    return list(get_tweets_q.scalars().all())
+
+
+async def get_hashtag_tweets(
+    session: AsyncSession,
+    hashtag: str,
+    limit: int,
+    before: Optional[int] = None,
+    fields: Optional[Collection[str]] = None,
+) -> List[Tweet]:
+    """
+    Function returns the tweets with the hashtag, the newest first.
+    The tweets are read in the order of the primary key of tweet_hashtags
+    :param session: session object
+    :param hashtag: the hashtag, lowercase, without #
+    :param limit: page size
+    :param before: the id of the last tweet of the previous page
+    :param fields: the fields of the response, all of them if None
+    :return: list of tweets with the data of the fields
+    """
+    hashtag_id = select(Hashtag.id).where(Hashtag.name == hashtag).scalar_subquery()
+    get_tweets_q = (
+        select(Tweet)
+        .join(TweetHashtag, TweetHashtag.tweet_id == Tweet.id)
+        .where(TweetHashtag.hashtag_id == hashtag_id)
+    )
+    if before is not None:
+        get_tweets_q = get_tweets_q.where(TweetHashtag.tweet_id < before)
+    tweets_q = await session.execute(
+        get_tweets_q.order_by(TweetHashtag.tweet_id.desc())
+        .limit(limit)
+        .options(*tweet_fields_options(fields))
+    )
+    return list(tweets_q.scalars().all())
+
+
+async def get_mentions(
+    session: AsyncSession,
+    user_id: int,
+    limit: int,
+    before: Optional[int] = None,
+    fields: Optional[Collection[str]] = None,
+) -> List[Tweet]:
+    """
+    Function returns the tweets mentioning the user, the newest first.
+    The tweets are read in the order of the primary key of mentions
+    :param session: session object
+    :param user_id: the mentioned user id
+    :param limit: page size
+    :param before: the id of the last tweet of the previous page
+    :param fields: the fields of the response, all of them if None
+    :return: list of tweets with the data of the fields
+    """
+    get_tweets_q = (
+        select(Tweet)
+        .join(Mention, Mention.tweet_id == Tweet.id)
+        .where(Mention.user_id == user_id)
+    )
+    if before is not None:
+        get_tweets_q = get_tweets_q.where(Mention.tweet_id < before)
+    tweets_q = await session.execute(
+        get_tweets_q.order_by(Mention.tweet_id.desc())
+        .limit(limit)
+        .options(*tweet_fields_options(fields))
+    )
+    return list(tweets_q.scalars().all())
+
+
+async def allocate_tweets_ids(session: AsyncSession, num: int) -> List[int]:
+    """
+    Function takes the next ids of the tweets from the sequence (Postgres),
+    so the rows written by COPY can be referenced before they are written
+    :param session: session object
+    :param num: number of the ids
+    :return: list of the ids
+    """
+    ids_q = await session.execute(
+        select(func.nextval(func.pg_get_serial_sequence("tweets", "id"))).select_from(
+            func.generate_series(1, num)
+        )
+    )
+    return [row[0] for row in ids_q.all()]
+
+
+async def get_tweets_texts(
+    session: AsyncSession, after: int, limit: int
+) -> List[Tuple[int, str]]:
+    """
+    Function returns the next batch of the tweets in the order of the ids
+    :param session: session object
+    :param after: the last id of the previous batch
+    :param limit: batch size
+    :return: list of (tweet_id, tweet_data)
+    """
+    texts_q = await session.execute(
+        select(Tweet.id, Tweet.tweet_data)
+        .where(Tweet.id > after)
+        .order_by(Tweet.id)
+        .limit(limit)
+    )
+    return [(row[0], row[1]) for row in texts_q.all()]
+
+
+async def get_backfill_progress(session: AsyncSession, job: str) -> Optional[int]:
+    """Function returns the last processed id of the job, None if it has not run"""
+    return await session.scalar(
+        select(BackfillProgress.last_id).where(BackfillProgress.job == job)
+    )
+
+
+async def save_backfill_progress(session: AsyncSession, job: str, last_id: int) -> None:
+    """Function saves the last processed id of the job, without a commit"""
+    insert_q = _insert(session, BackfillProgress).values(job=job, last_id=last_id)
+    await session.execute(
+        insert_q.on_conflict_do_update(
+            index_elements=[BackfillProgress.job],
+            set_={"last_id": insert_q.excluded.last_id, "updated_at": func.now()},
+        )
+    )
+
+
+def fts5_query(query: str) -> str:
+    """
+    Function converts the search words into the FTS5 query, which matches
+    the rows with all the words. The words are quoted,
+    so the FTS5 syntax in them is not interpreted
+    """
+    return " ".join('"{}"'.format(word.replace('"', '""')) for word in query.split())
+
+
+async def search_tweets(
+    session: AsyncSession,
+    query: str,
+    limit: int,
+    after: Optional[Tuple[float, int, int]] = None,
+    fields: Optional[Collection[str]] = None,
+    candidates: int = SEARCH_CANDIDATES,
+) -> List[Tuple[Tweet, float, int]]:
+    """
+    Function returns the page of the tweets, which match the search query,
+    the most relevant first. Postgres finds them by the GIN index
+    of the tsvector column, SQLite by the FTS5 table (see models.SEARCH_DDL).
+    The matches are ranked in blocks of the newest ones, so the common words
+    do not rank the whole table: the pages go through the block of the newest
+    candidates matches, the most relevant first, then through the next older
+    block, until all the matches are returned. The next pages rank the same
+    blocks: they are bounded by the newest match of the block, the new tweets
+    do not shift them.
+    The bm25 of FTS5 depends on the statistics of the whole table,
+    so on SQLite the pages may shift, when the tweets change
+    :param session: session object
+    :param query: the words to search (Postgres supports the web search syntax:
+    "quoted phrases", or, -excluded)
+    :param limit: page size
+    :param after: (rank, id, max_id) of the last tweet of the previous page
+    :param fields: the fields of the response, all of them if None
+    :param candidates: the number of the matches in a block, which are ranked
+    :return: list of (tweet, rank, max_id), max_id is the newest match of its block
+    """
+    candidates_q = select(Tweet.id)
+    rank: ColumnElement[float]
+    if session.get_bind().dialect.name == "sqlite":
+        if not query.split():
+            return list()
+        fts = table(SEARCH_FTS_TABLE, column("rowid"))
+        # bm25 is lower for the better matches
+        rank = -func.bm25(literal_column(SEARCH_FTS_TABLE), type_=Float)
+        candidates_q = candidates_q.join(fts, fts.c.rowid == Tweet.id).where(
+            literal_column(SEARCH_FTS_TABLE).op("MATCH")(fts5_query(query))
+        )
+    else:
+        ts_query = func.websearch_to_tsquery(
+            literal_column(f"'{SEARCH_CONFIG}'"), query
+        )
+        search_vector: ColumnElement = literal_column(f"tweets.{SEARCH_VECTOR_COLUMN}")
+        rank = func.ts_rank(search_vector, ts_query, type_=Float)
+        candidates_q = candidates_q.where(search_vector.op("@@")(ts_query))
+
+    found: List[Tuple[Tweet, float, int]] = list()
+    max_id: Optional[int] = None
+    after_key: Optional[Tuple[float, int]] = None
+    if after is not None:
+        after_key, max_id = (after[0], after[1]), after[2]
+    while len(found) < limit:
+        block_q = candidates_q
+        if max_id is not None:
+            block_q = block_q.where(Tweet.id <= max_id)
+        block = (
+            block_q.add_columns(rank.label("rank"))
+            .order_by(Tweet.id.desc())
+            .limit(candidates)
+            .subquery("block")
+        )
+        # the bounds of the block are taken before the previous pages are skipped
+        ranked = select(
+            block.c.id,
+            block.c.rank,
+            func.max(block.c.id).over().label("max_id"),
+            func.min(block.c.id).over().label("min_id"),
+            func.count().over().label("matches"),
+        ).subquery("ranked")
+        page_q = select(ranked)
+        if after_key is not None:
+            after_rank, after_id = after_key
+            after_tuple = tuple_(literal(after_rank, Float), literal(after_id))
+            page_q = page_q.where(tuple_(ranked.c.rank, ranked.c.id) < after_tuple)
+        page = (
+            page_q.order_by(ranked.c.rank.desc(), ranked.c.id.desc())
+            .limit(limit - len(found))
+            .subquery("page")
+        )
+        # only the tweets of the page are loaded
+        search_q = await session.execute(
+            select(Tweet, page.c.rank, page.c.max_id, page.c.min_id, page.c.matches)
+            .join(page, page.c.id == Tweet.id)
+            .order_by(page.c.rank.desc(), page.c.id.desc())
+            .options(*tweet_fields_options(fields))
+        )
+        rows = search_q.all()
+        found.extend((row[0], row[1], row[2]) for row in rows)
+        if len(found) == limit:
+            break
+        if rows:
+            min_id, matches = rows[0][3], rows[0][4]
+        else:
+            # the previous page has ended with the block
+            bounds_q = await session.execute(
+                select(func.min(block.c.id), func.count()).select_from(block)
+            )
+            min_id, matches = bounds_q.one()
+        if matches < candidates:
+            # the block has all the older matches
+            break
+        max_id, after_key = min_id - 1, None
+    return found
+
+
+async def refresh_scores(
+    session: AsyncSession,
+    gravity: float = DEFAULT_GRAVITY,
+    min_interval: float = 0.0,
+    max_age: Optional[float] = None,
+) -> int:
+    """
+    Function recalculates the popularity scores of the tweets, which decay with age.
+    Tweets without likes always have zero score and are skipped.
+    Tweets older than max_age keep their last scores, which hardly change any more,
+    a new like updates the score anyway.
+    If another worker is refreshing the scores right now or has refreshed them
+    less than min_interval seconds ago, nothing is done
+    :param session: session object
+    :param gravity: how fast the score decays with the age of the tweet
+    :param min_interval: seconds since the last refresh, before which it is skipped
+    :param max_age: hours, None - all the tweets are refreshed
+    :return: number of updated tweets
+    """
+    lock_q = await session.execute(
+        select(func.pg_try_advisory_xact_lock(REFRESH_SCORES_LOCK))
+    )
+    if not lock_q.scalar():
+        logger.info("The scores are being refreshed by another worker")
+        await session.rollback()
+        return 0
+    # the lock is held, so the time of the last refresh is not changed meanwhile
+    refreshed_q = await session.execute(
+        select(ScoreRefresh.id).where(
+            ScoreRefresh.id == SCORE_REFRESH_ID,
+            ScoreRefresh.refreshed_at > func.now() - timedelta(seconds=min_interval),
+        )
+    )
+    if refreshed_q.first() is not None:
+        logger.debug("The scores were refreshed by another worker recently")
+        await session.rollback()
+        return 0
+
+    refresh_q = update(Tweet).where(Tweet.likes_count > 0)
+    if max_age is not None:
+        refresh_q = refresh_q.where(
+            Tweet.created_at > func.now() - timedelta(hours=max_age)
+        )
+    refreshed = await session.execute(
+        refresh_q.values(
+            score=score_expression(Tweet.likes_count, gravity)
+        ).execution_options(synchronize_session=False)
+    )
+    insert_q = _insert(session, ScoreRefresh).values(
+        id=SCORE_REFRESH_ID, refreshed_tweets=refreshed.rowcount
+    )
+    await session.execute(
+        insert_q.on_conflict_do_update(
+            index_elements=[ScoreRefresh.id],
+            set_={
+                "refreshed_at": func.now(),
+                "refreshed_tweets": insert_q.excluded.refreshed_tweets,
+            },
+        )
+    )
+    await session.commit()
+    return refreshed.rowcount
@@ -0,0 +1,113 @@
+"""
+The module counts the statements, rows and time of the database queries
+made inside a block (e.g. one request), and detects N+1 queries
+"""
+
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional, Tuple, Union
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+@dataclass
+class QueryStats:
+    """The statistics of the queries made inside count_queries"""
+
+    statements: int = 0
+    rows: int = 0
+    seconds: float = 0.0
+    # statement -> number of executions
+    executions: Counter = field(default_factory=Counter)
+
+    def repeated(self, max_repeats: int) -> List[str]:
+        """The method returns the statements executed more than max_repeats times"""
+        return [
+            statement for statement, num in self.executions.items() if num > max_repeats
+        ]
+
+
+# SAVEPOINT, RELEASE SAVEPOINT, ROLLBACK TO SAVEPOINT: the nested transactions
+# (e.g. of the test isolation) are not the queries of the block
+SAVEPOINT_PREFIXES: Tuple[str, ...] = ("SAVEPOINT", "RELEASE", "ROLLBACK TO")
+
+# the statistics of the nested count_queries blocks
+_stats: ContextVar[Tuple[QueryStats, ...]] = ContextVar("query_stats", default=())
+
+
+@contextmanager
+def count_queries() -> Iterator[QueryStats]:
+    """
+    The context manager counts the queries of the instrumented engines,
+    which are made in its block (in the same task or thread).
+    The blocks can be nested, e.g. a test around a request
+    """
+    stats = QueryStats()
+    token = _stats.set(_stats.get() + (stats,))
+    try:
+        yield stats
+    finally:
+        _stats.reset(token)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, many):
+    # the start is kept by the execution, so a failed statement,
+    # which has no after_cursor_execute, leaves nothing on the connection
+    if context is not None:
+        context._query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, many):
+    start: Optional[float] = getattr(context, "_query_start", None)
+    seconds: float = time.perf_counter() - start if start is not None else 0.0
+    if statement.startswith(SAVEPOINT_PREFIXES):
+        return
+    for stats in _stats.get():
+        stats.statements += 1
+        # rowcount is -1 when it is unknown, e.g. for executemany
+        stats.rows += max(cursor.rowcount, 0)
+        stats.seconds += seconds
+        stats.executions[statement] += 1
+
+
+def instrument_engine(engine: Union[AsyncEngine, Engine]) -> None:
+    """
+    The function counts the queries of the engine.
+    The async engines run the statements in the caller's task,
+    so the queries are counted by the caller's count_queries
+    """
+    sync_engine: Engine = (
+        engine.sync_engine if isinstance(engine, AsyncEngine) else engine
+    )
+    if not event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+@contextmanager
+def assert_max_queries(
+    max_queries: int, max_repeats: Optional[int] = None
+) -> Iterator[QueryStats]:
+    """
+    The context manager for tests. It fails if the block makes
+    more than max_queries queries, or executes one statement more than
+    max_repeats times (N+1 queries: a query per item of a page)
+    :param max_queries: max number of the queries
+    :param max_repeats: max number of executions of one statement
+    """
+    with count_queries() as stats:
+        yield stats
+    statements: str = "\n".join(
+        f"{num} x {statement}" for statement, num in stats.executions.items()
+    )
+    assert (
+        stats.statements <= max_queries
+    ), f"{stats.statements} queries, expected at most {max_queries}:\n{statements}"
+    if max_repeats is not None:
+        repeated: List[str] = stats.repeated(max_repeats)
+        assert not repeated, "N+1 queries:\n" + "\n".join(repeated)
@@ -1,3 +1,5 @@
 from src.api import routes
 
+# the entry point of the server: the app is created when the module is imported.
+# The other modules of the app can be imported without side effects
 app = routes.create_app()
@@ -1,8 +1,14 @@
+from enum import Enum
 from typing import List, Optional
 
 from pydantic import BaseModel, Field
 
 
+class FeedMode(str, Enum):
+    popular = "popular"
+    chronological = "chronological"
+
+
 class TweetInSchema(BaseModel):
     tweet_data: str = Field(
         default=...,
@@ -54,8 +60,12 @@ class FullTweetSchema(BaseModel):
         description="A list of links to images attached to a tweet",
     )
     author: UserSchema = Field(default=..., description="Brief info about author")
+    likes_count: int = Field(default=0, description="Number of likes")
     likes: List[LikeSchema] = Field(
-        default_factory=list, description="List with info about users like tweet"
+        default_factory=list,
+        description="A few users who liked the tweet, the ones followed"
+        " by the current user go first. All of them are listed by"
+        " GET /api/tweets/{tweet_id}/likes",
     )
 
 
@@ -69,6 +79,22 @@ class TweetOutSchema(BaseModel):
         orm_mod = True
 
 
+class TweetPageOutSchema(TweetOutSchema):
+    next_cursor: Optional[str] = Field(
+        default=None, description="The cursor of the next page, None on the last page"
+    )
+
+
+class LikesOutSchema(BaseModel):
+    result: bool = True
+    likes: List[LikeSchema] = Field(
+        default_factory=list, description="The page of users who liked the tweet"
+    )
+    next_cursor: Optional[str] = Field(
+        default=None, description="The cursor of the next page, None on the last page"
+    )
+
+
 class ErrorSchema(BaseModel):
     result: bool = False
     error_type: str = Field(default=..., description="Type of exception")
@@ -0,0 +1,114 @@
+"""
+The production entry point of the server: python -m src.server
+Gunicorn manages the uvicorn workers (uvloop and httptools, when installed):
+restarts them after max_requests requests and on failures, and on SIGTERM
+lets them finish the requests in flight. Each worker closes its database
+pool on shutdown (see lifespan). The settings are in Config.server
+"""
+
+import os
+from typing import Any, Dict, Optional
+
+from fastapi import FastAPI
+from gunicorn.app.base import BaseApplication
+
+from src.api.routes import create_app
+from src.config.config import Config, Server, get_config
+from src.config.log_config import setup_logging
+from src.service.metrics import mark_worker_dead, reset_multiproc_dir
+
+WORKER_CLASS: str = "uvicorn_worker.UvicornWorker"
+
+
+def cpu_count() -> int:
+    """The function returns the number of CPUs available to the process"""
+    try:
+        # the CPUs of the container or the taskset, not of the host
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def worker_count(server: Server) -> int:
+    """
+    The function returns the number of the workers.
+    The workers are async, so one worker per CPU is enough
+    :param server: server config
+    """
+    return server.workers if server.workers > 0 else cpu_count()
+
+
+def gunicorn_options(server: Server) -> Dict[str, Any]:
+    """
+    The function converts the server config into the gunicorn settings
+    :param server: server config
+    """
+    return {
+        "bind": f"{server.host}:{server.port}",
+        "workers": worker_count(server),
+        "worker_class": WORKER_CLASS,
+        "max_requests": server.max_requests,
+        "max_requests_jitter": server.max_requests_jitter,
+        "graceful_timeout": server.graceful_timeout,
+        "keepalive": server.keepalive,
+        "preload_app": server.preload,
+    }
+
+
+class ServerApplication(BaseApplication):
+    """
+    The gunicorn application of the app.
+    With preload the app is created once in the master process
+    and the workers are forked from it, so they start faster
+    :param config: config of the app
+    """
+
+    def __init__(self, config: Config) -> None:
+        self.config = config
+        self.app: Optional[FastAPI] = None
+        super().__init__()
+
+    def load_config(self) -> None:
+        for key, value in gunicorn_options(self.config.server).items():
+            self.cfg.set(key, value)
+        self.cfg.set("post_fork", self.post_fork)
+        self.cfg.set("on_starting", self.on_starting)
+        self.cfg.set("child_exit", self.child_exit)
+
+    def load(self) -> FastAPI:
+        self.app = create_app(self.config)
+        return self.app
+
+    def on_starting(self, arbiter: Any) -> None:
+        """
+        The hook runs in the master before the workers are started.
+        The metrics files of the previous run are removed
+        """
+        reset_multiproc_dir()
+
+    def child_exit(self, arbiter: Any, worker: Any) -> None:
+        """
+        The hook runs in the master after a worker exits, e.g. when it is
+        restarted after max_requests. Its gauges are not reported any more
+        """
+        mark_worker_dead(worker.pid)
+
+    def post_fork(self, arbiter: Any, worker: Any) -> None:
+        """
+        The hook runs in the worker after fork. The threads of the master
+        are not forked, so the logging listener is started again.
+        The engines of the preloaded app have no connections yet,
+        but the pools are replaced, so the worker never shares them
+        """
+        setup_logging()
+        if self.app is not None:
+            for engine in self.app.state.database.engines.values():
+                engine.sync_engine.dispose(close=False)
+
+
+def main() -> None:
+    ServerApplication(get_config()).run()
+
+
+if __name__ == "__main__":
+    main()
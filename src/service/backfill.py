@@ -0,0 +1,111 @@
+"""
+The resumable batched job, which adds the hashtags and the mentions
+of the existing tweets into the index (see queries.add_tweets_entities).
+The tweets are read in the order of the ids, every batch is committed
+with the last id of the batch, so a stopped job continues from that id:
+python -m src.service.backfill --batch-size 5000
+The new tweets are indexed by queries.create_tweet, the tweets created
+during the job are indexed twice, which keeps the index unchanged
+"""
+
+import argparse
+import asyncio
+import time
+from logging import getLogger
+from typing import List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.config.config import get_config
+from src.config.log_config import setup_logging
+from src.database import queries as q
+from src.database.engine import Database
+
+logger = getLogger("routes_logger.backfill")
+
+ENTITIES_JOB: str = "tweets_entities"
+BATCH_SIZE: int = 5000
+
+
+async def backfill_entities(
+    session_maker: async_sessionmaker[AsyncSession],
+    batch_size: int = BATCH_SIZE,
+    max_batches: Optional[int] = None,
+    pause: float = 0.0,
+    restart: bool = False,
+) -> int:
+    """
+    The job indexes the tweets after the saved progress
+    :param session_maker: factory of sessions to the primary database
+    :param batch_size: tweets per transaction
+    :param max_batches: the job stops after this number of batches, None - at the end
+    :param pause: seconds between the batches, which limits the load of the database
+    :param restart: ignore the saved progress and start from the first tweet
+    :return: number of indexed tweets
+    """
+    async with session_maker() as session:
+        saved: Optional[int] = await q.get_backfill_progress(session, ENTITIES_JOB)
+    last_id: int = 0 if restart or saved is None else saved
+    logger.info("Indexing the entities of the tweets after id %d", last_id)
+
+    indexed: int = 0
+    batches: int = 0
+    start: float = time.perf_counter()
+    while max_batches is None or batches < max_batches:
+        async with session_maker() as session:
+            tweets: List[Tuple[int, str]] = await q.get_tweets_texts(
+                session, last_id, batch_size
+            )
+            if not tweets:
+                break
+            await q.add_tweets_entities(session, tweets)
+            last_id = tweets[-1][0]
+            await q.save_backfill_progress(session, ENTITIES_JOB, last_id)
+            await session.commit()
+        indexed += len(tweets)
+        batches += 1
+        logger.info(
+            "%d tweets indexed, last id %d, %.0f tweets/s",
+            indexed,
+            last_id,
+            indexed / (time.perf_counter() - start),
+        )
+        if pause > 0:
+            await asyncio.sleep(pause)
+    return indexed
+
+
+async def run(args: argparse.Namespace) -> None:
+    database = Database.from_config(get_config().db)
+    try:
+        await backfill_entities(
+            database.Session,
+            args.batch_size,
+            args.max_batches,
+            args.pause,
+            args.restart,
+        )
+    finally:
+        await database.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument(
+        "--max-batches", type=int, help="stop after the batches, resume later"
+    )
+    parser.add_argument(
+        "--pause", type=float, default=0.0, help="seconds between the batches"
+    )
+    parser.add_argument(
+        "--restart", action="store_true", help="ignore the saved progress"
+    )
+    setup_logging()
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+"""
+The import of the tweets from a JSONL file, e.g. migrated from another system.
+Every line is a JSON object with the fields of TweetInSchema, the api key
+of the author and optionally the time of the tweet:
+{"api_key": "test", "tweet_data": "hi #import", "tweet_media_ids": [1],
+"created_at": "2024-01-01T12:00:00+00:00"}
+The file is read line by line, the valid tweets are written by COPY in batches.
+If the database rejects a batch, its tweets are written one by one
+and the rejected ones are skipped.
+Every batch is committed with the number of its last line, so a stopped import
+continues after that line (Postgres only):
+python -m src.service.bulk_import tweets.jsonl --rejects rejects.jsonl
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from logging import getLogger
+from typing import Dict, Iterator, List, Optional, Set, TextIO, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.config.config import get_config
+from src.config.log_config import setup_logging
+from src.database import queries as q
+from src.database.bulk import Row, copy_rows
+from src.database.engine import Database
+from src.database.models import Base, Tweet
+from src.schemas.schemas import TweetInSchema
+
+logger = getLogger("routes_logger.bulk_import")
+
+BATCH_SIZE: int = 5000
+TWEETS_COLUMNS: Tuple[str, ...] = ("id", "tweet_data", "user_id", "created_at")
+# the reason of the tweets, which are valid, but the database rejects them
+# (e.g. a NUL character in the text)
+REJECTED_BY_DATABASE: str = "rejected_by_database"
+
+
+class ImportTweetSchema(TweetInSchema):
+    """A line of the imported file"""
+
+    api_key: str
+    created_at: Optional[datetime] = None
+
+
+@dataclass
+class ImportStats:
+    """The progress of the import"""
+
+    lines: int = 0
+    imported: int = 0
+    # reason -> number of the rejected lines
+    rejected: Counter = field(default_factory=Counter)
+    seconds: float = 0.0
+
+    @property
+    def lines_per_second(self) -> float:
+        return self.lines / self.seconds if self.seconds else 0.0
+
+    @property
+    def tweets_per_second(self) -> float:
+        return self.imported / self.seconds if self.seconds else 0.0
+
+
+def import_job(path: str) -> str:
+    """The name of the job in backfill_progress, which keeps the last line"""
+    return f"import:{os.path.abspath(path)}"
+
+
+def read_lines(file: TextIO, after: int) -> Iterator[Tuple[int, str]]:
+    """
+    The function yields the non-empty lines of the file
+    :param file: the open file
+    :param after: number of the processed lines, which are skipped
+    :return: iterator of (line number, line)
+    """
+    for number, line in enumerate(file, start=1):
+        if number > after and line.strip():
+            yield number, line
+
+
+def parse_line(line: str) -> ImportTweetSchema:
+    """
+    The function validates a line of the file
+    :raise ValidationError: if the line is not a valid tweet
+    """
+    return ImportTweetSchema.model_validate_json(line)
+
+
+async def import_batch(
+    session: AsyncSession,
+    tweets: List[Tuple[int, ImportTweetSchema]],
+    rejects: List[Tuple[int, str]],
+) -> int:
+    """
+    The function writes the valid tweets of the batch, without a commit.
+    The authors and the images are resolved by one query each,
+    the tweets are written by COPY, their hashtags and mentions are indexed
+    :param session: session object
+    :param tweets: list of (line number, tweet)
+    :param rejects: the rejected lines are added as (line number, reason)
+    :return: number of the written tweets
+    """
+    users_ids: Dict[str, int] = await q.get_users_ids_by_api_keys(
+        session, {tweet.api_key for _, tweet in tweets}
+    )
+    free_images: Set[int] = await q.lock_free_images(
+        session,
+        {image_id for _, tweet in tweets for image_id in tweet.tweet_media_ids or ()},
+    )
+
+    valid: List[Tuple[int, ImportTweetSchema]] = list()
+    for number, tweet in tweets:
+        images: Set[int] = set(tweet.tweet_media_ids or ())
+        if tweet.api_key not in users_ids:
+            rejects.append((number, "unknown_user"))
+        elif not images <= free_images:
+            # as for POST /api/tweets, the images must exist and be free
+            rejects.append((number, "invalid_media"))
+        else:
+            free_images -= images
+            valid.append((number, tweet))
+    if not valid:
+        return 0
+
+    tweets_ids: List[int] = await q.allocate_tweets_ids(session, len(valid))
+    now: datetime = datetime.now(timezone.utc)
+    rows: List[Row] = list()
+    images_tweets: Dict[int, int] = dict()
+    for tweet_id, (_, tweet) in zip(tweets_ids, valid):
+        rows.append(
+            (
+                tweet_id,
+                tweet.tweet_data,
+                users_ids[tweet.api_key],
+                tweet.created_at or now,
+            )
+        )
+        for image_id in tweet.tweet_media_ids or ():
+            images_tweets[image_id] = tweet_id
+
+    conn = await session.connection()
+    tweets_table = Base.metadata.tables[Tweet.__tablename__]
+    await copy_rows(conn, tweets_table, TWEETS_COLUMNS, rows, len(rows))
+    if images_tweets:
+        await q.attach_images(session, images_tweets)
+    await q.add_tweets_entities(session, [(row[0], row[1]) for row in rows])
+    return len(rows)
+
+
+async def import_rows(
+    session: AsyncSession,
+    tweets: List[Tuple[int, ImportTweetSchema]],
+    rejects: List[Tuple[int, str]],
+) -> int:
+    """
+    The function writes the tweets of the batch one by one, each in its savepoint,
+    after the database has rejected the whole batch. Without a commit
+    :param session: session object
+    :param tweets: list of (line number, tweet)
+    :param rejects: the rejected lines are added as (line number, reason)
+    :return: number of the written tweets
+    """
+    imported: int = 0
+    for number, tweet in tweets:
+        try:
+            async with session.begin_nested():
+                imported += await import_batch(session, [(number, tweet)], rejects)
+        except DBAPIError as exc:
+            logger.warning("Line %d is rejected by the database: %s", number, exc.orig)
+            rejects.append((number, REJECTED_BY_DATABASE))
+    return imported
+
+
+async def import_tweets(
+    session_maker: async_sessionmaker[AsyncSession],
+    path: str,
+    batch_size: int = BATCH_SIZE,
+    restart: bool = False,
+    rejects_file: Optional[TextIO] = None,
+) -> ImportStats:
+    """
+    The function imports the tweets of the file after the saved progress
+    :param session_maker: factory of sessions to the primary database
+    :param path: path of the JSONL file
+    :param batch_size: lines per transaction
+    :param restart: ignore the saved progress and start from the first line
+    :param rejects_file: the rejected lines are written there as JSON
+    :return: statistics of the import
+    """
+    job: str = import_job(path)
+    async with session_maker() as session:
+        saved: Optional[int] = await q.get_backfill_progress(session, job)
+    after: int = 0 if restart or saved is None else saved
+    logger.info("Importing the tweets of %s after line %d", path, after)
+
+    stats = ImportStats()
+    start: float = time.perf_counter()
+    with open(path, encoding="utf-8") as file:
+        lines: Iterator[Tuple[int, str]] = read_lines(file, after)
+        while True:
+            tweets: List[Tuple[int, ImportTweetSchema]] = list()
+            rejects: List[Tuple[int, str]] = list()
+            last_number: Optional[int] = None
+            for number, line in lines:
+                last_number = number
+                try:
+                    tweets.append((number, parse_line(line)))
+                except ValidationError:
+                    rejects.append((number, "invalid"))
+                if len(tweets) + len(rejects) >= batch_size:
+                    break
+            if last_number is None:
+                break
+
+            batch_lines: int = len(tweets) + len(rejects)
+            invalid: int = len(rejects)
+            async with session_maker() as session:
+                imported: int = 0
+                if tweets:
+                    try:
+                        imported = await import_batch(session, tweets, rejects)
+                    except DBAPIError:
+                        logger.warning(
+                            "The batch up to line %d is rejected by the database,"
+                            " its tweets are imported one by one",
+                            last_number,
+                        )
+                        await session.rollback()
+                        del rejects[invalid:]
+                        imported = await import_rows(session, tweets, rejects)
+                await q.save_backfill_progress(session, job, last_number)
+                await session.commit()
+
+            stats.lines += batch_lines
+            stats.imported += imported
+            stats.rejected.update(reason for _, reason in rejects)
+            stats.seconds = time.perf_counter() - start
+            if rejects_file is not None:
+                for number, reason in sorted(rejects):
+                    rejects_file.write(
+                        json.dumps({"line": number, "reason": reason}) + "\n"
+                    )
+            logger.info(
+                "Line %d: %d tweets imported, %d rejected, %.0f tweets/s",
+                last_number,
+                stats.imported,
+                sum(stats.rejected.values()),
+                stats.tweets_per_second,
+            )
+    stats.seconds = time.perf_counter() - start
+    return stats
+
+
+async def run(args: argparse.Namespace) -> None:
+    database = Database.from_config(get_config().db)
+    rejects_file: Optional[TextIO] = None
+    try:
+        if args.rejects:
+            rejects_file = open(args.rejects, "a", encoding="utf-8")
+        stats: ImportStats = await import_tweets(
+            database.Session, args.path, args.batch_size, args.restart, rejects_file
+        )
+    finally:
+        if rejects_file is not None:
+            rejects_file.close()
+        await database.dispose()
+    print(
+        f"{stats.lines} lines in {stats.seconds:.1f} s"
+        f" ({stats.lines_per_second:.0f} lines/s): {stats.imported} tweets imported"
+        f" ({stats.tweets_per_second:.0f} tweets/s),"
+        f" rejected: {dict(stats.rejected) or 0}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("path", help="JSONL file of the tweets")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument(
+        "--restart", action="store_true", help="ignore the saved progress"
+    )
+    parser.add_argument("--rejects", help="JSONL file of the rejected line numbers")
+    setup_logging()
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,29 @@
 from typing import Any, Dict, Optional
 
 from fastapi import HTTPException, Request, Response, status
-from fastapi.responses import JSONResponse
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
+from starlette.exceptions import HTTPException as StarletteHTTPException
 
 from src.schemas.schemas import ErrorSchema
+from src.service.responses import negotiated_response
 
 
-def http_exception_handler(request: Request, exc: HTTPException) -> Response:
-    content = ErrorSchema(
-        error_type=type(exc).__name__, error_message=exc.detail
-    ).model_dump(mode="json")
-    return JSONResponse(content, status_code=exc.status_code)
+def http_exception_handler(request: Request, exc: StarletteHTTPException) -> Response:
+    """The error in the format, which the client accepts (see negotiated_response)"""
+    content = ErrorSchema(error_type=type(exc).__name__, error_message=exc.detail)
+    return negotiated_response(request, content, exc.status_code, exc.headers)
+
+
+def validation_exception_handler(
+    request: Request, exc: RequestValidationError
+) -> Response:
+    """The validation errors of FastAPI in the format, which the client accepts"""
+    return negotiated_response(
+        request,
+        {"detail": jsonable_encoder(exc.errors())},
+        status.HTTP_422_UNPROCESSABLE_ENTITY,
+    )
 
 
 class IdentificationError(HTTPException):
@@ -0,0 +1,59 @@
+import heapq
+from collections import defaultdict
+from datetime import datetime
+from itertools import islice
+from logging import getLogger
+from typing import Collection, Dict, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database import queries as q
+from src.database.models import Tweet
+
+logger = getLogger("routes_logger.feed")
+
+
+def merge_streams(
+    streams: List[List[Tuple[datetime, int]]], limit: int
+) -> List[Tuple[datetime, int]]:
+    """
+    Function merges the streams of (created_at, tweet_id) sorted
+    in descending order into one stream (k-way merge).
+    The merge stops after limit items, the rest of the streams is not touched
+    :param streams: list of sorted streams, one for each author
+    :param limit: page size
+    :return: the first limit items of the merged stream
+    """
+    return list(islice(heapq.merge(*streams, reverse=True), limit))
+
+
+async def get_chronological_feed(
+    session: AsyncSession,
+    user_id: int,
+    limit: int,
+    fields: Optional[Collection[str]] = None,
+) -> List[Tweet]:
+    """
+    Function returns the latest tweets from the authors followed by the user,
+    newest first
+    :param session: session object
+    :param user_id: the follower id
+    :param limit: page size
+    :param fields: the fields of the response, all of them if None
+    :return: list of tweets
+    """
+    streams: Dict[int, List[Tuple[datetime, int]]] = defaultdict(list)
+    for author_id, tweet_id, created_at in await q.get_feed_streams(
+        session, user_id, limit
+    ):
+        streams[author_id].append((created_at, tweet_id))
+    # Postgres does not guarantee the order of the rows of a lateral join.
+    # The streams are almost always sorted already, so this is linear
+    for stream in streams.values():
+        stream.sort(reverse=True)
+    logger.debug("Merging %d streams", len(streams))
+
+    page: List[Tuple[datetime, int]] = merge_streams(list(streams.values()), limit)
+    return await q.get_tweets_by_ids(
+        session, [tweet_id for _, tweet_id in page], fields
+    )
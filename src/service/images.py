@@ -1,8 +1,9 @@
 import asyncio
 import os
 import re
+from collections import OrderedDict
 from logging import getLogger
-from typing import Awaitable, List, Optional
+from typing import Awaitable, Dict, Iterable, List, Optional, Tuple
 
 import aiofiles
 import aiofiles.os
@@ -10,10 +11,28 @@ from fastapi import UploadFile
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.database.queries import add_image, get_images_by_ids
-from src.service.func import get_image_name_by_id
+from src.service.metrics import (
+    DELETED_IMAGES,
+    IMAGE_NAMES_CACHE_HITS,
+    IMAGE_NAMES_CACHE_MISSES,
+    UPLOADED_BYTES,
+)
 
 image_logger = getLogger("image_logger")
 
+# the directory with uploaded images, which is served by nginx
+IMAGES_DIR: str = os.path.join(
+    os.path.dirname(__file__), "..", "..", "client", "static", "images"
+)
+# the extensions of the uploaded images, see validate_image
+IMAGE_EXTENSIONS: Tuple[str, ...] = ("jpeg", "jpg", "png", "gif")
+# max cached names per worker, the least recently used ones are evicted
+IMAGES_NAMES_CACHE_SIZE: int = 100_000
+# image id -> file name, None if the image has no file. It is filled on upload
+# and by looking up the file of the id on a miss. The file is written before
+# the id is returned to the client, so a missing file never appears later
+_images_names: "OrderedDict[int, Optional[str]]" = OrderedDict()
+
 
 def _file_extension(filename: Optional[str]) -> Optional[str]:
     """
@@ -41,19 +60,17 @@ async def upload_image(image_file: UploadFile, session: AsyncSession) -> int:
     """
     img_extension: Optional[str] = _file_extension(image_file.filename)
     image_id: int = await add_image(session)
-    cur_dir_path: str = os.path.dirname(__file__)
-    images_path: str = os.path.join(
-        cur_dir_path, "..", "..", "client", "static", "images"
-    )
 
     if not img_extension:
-        out_file_path = f"{images_path}/{image_id}"
+        image_name = f"{image_id}"
     else:
-        out_file_path = f"{images_path}/{image_id}.{img_extension}"
+        image_name = f"{image_id}.{img_extension}"
 
-    async with aiofiles.open(out_file_path, "wb") as out_file:
+    async with aiofiles.open(os.path.join(IMAGES_DIR, image_name), "wb") as out_file:
         content = await image_file.read()
         await out_file.write(content)
+    UPLOADED_BYTES.inc(len(content))
+    _cache_image_name(image_id, image_name)
     return image_id
 
 
@@ -76,7 +93,7 @@ def validate_image(image_file: UploadFile) -> None:
             )
         )
     extension = _file_extension(image_file.filename)
-    if extension not in ("jpeg", "jpg", "png", "gif"):
+    if extension not in IMAGE_EXTENSIONS:
         raise TypeError(
             f"Image must have extensions .jpg, .png, .jpeg, .gif;"
             f" image extension is {extension}"
@@ -105,26 +122,81 @@ async def validate_images_in_db(session: AsyncSession, images_ids: List[int]) ->
             )
 
 
-async def delete_images_by_ids(images_ids: List[int]) -> None:
-    """Function deletes images from disk by ids"""
-    # get current dir
-    cur_dir_path: str = os.path.dirname(__file__)
-    # get path to all images
-    images_dir: str = os.path.join(
-        cur_dir_path, "..", "..", "client", "static", "images"
+def _cache_image_name(image_id: int, image_name: Optional[str]) -> None:
+    """Function caches the file name of the image, evicting the oldest names"""
+    _images_names[image_id] = image_name
+    _images_names.move_to_end(image_id)
+    if len(_images_names) > IMAGES_NAMES_CACHE_SIZE:
+        _images_names.popitem(last=False)
+
+
+async def _find_image_name(image_id: int) -> Optional[str]:
+    """
+    Function looks for the file of the image by its possible names,
+    without listing the whole directory
+    :param image_id: id of the image
+    :return: file name, None if there is no file
+    """
+    for extension in IMAGE_EXTENSIONS:
+        image_name = f"{image_id}.{extension}"
+        if await aiofiles.os.path.exists(os.path.join(IMAGES_DIR, image_name)):
+            return image_name
+    image_logger.warning("No file of the image with id %d", image_id)
+    return None
+
+
+async def get_images_names(images_ids: Iterable[int]) -> Dict[int, str]:
+    """
+    Function returns the names of the image files by their ids.
+    The files of the ids, which are not cached, are looked up one by one,
+    the ids without files are cached too
+    :param images_ids: ids of images
+    :return: image id -> file name, for the existing images only
+    """
+    images_ids = list(images_ids)
+    missed: List[int] = list(
+        dict.fromkeys(
+            image_id for image_id in images_ids if image_id not in _images_names
+        )
     )
-    # get images names
-    images_names = await asyncio.gather(
-        *[get_image_name_by_id(image_id, images_dir) for image_id in images_ids]
+    misses: int = sum(image_id not in _images_names for image_id in images_ids)
+    IMAGE_NAMES_CACHE_HITS.inc(len(images_ids) - misses)
+    IMAGE_NAMES_CACHE_MISSES.inc(misses)
+    found: List[Optional[str]] = await asyncio.gather(
+        *[_find_image_name(image_id) for image_id in missed]
     )
-    images_paths: List[str] = [
-        os.path.join(images_dir, image_name)
-        for image_name in images_names
-        if image_name is not None
-    ]
+    for image_id, image_name in zip(missed, found):
+        _cache_image_name(image_id, image_name)
+
+    images_names: Dict[int, str] = dict()
+    for image_id in images_ids:
+        cached: Optional[str] = _images_names.get(image_id)
+        if cached is not None:
+            _images_names.move_to_end(image_id)
+            images_names[image_id] = cached
+    return images_names
+
+
+async def _remove_file(path: str) -> bool:
+    """Function removes the file, if it still exists. Returns True if removed"""
+    try:
+        await aiofiles.os.remove(path)
+    except FileNotFoundError:
+        image_logger.warning("The file %s was already removed", path)
+        return False
+    return True
+
+
+async def delete_images_by_ids(images_ids: List[int]) -> None:
+    """Function deletes images from disk by ids"""
+    images_names: Dict[int, str] = await get_images_names(images_ids)
+    for image_id in images_names:
+        _cache_image_name(image_id, None)
 
     # delete images
-    delete_images_c: List[Awaitable] = [
-        aiofiles.os.remove(path) for path in images_paths
+    delete_images_c: List[Awaitable[bool]] = [
+        _remove_file(os.path.join(IMAGES_DIR, image_name))
+        for image_name in images_names.values()
     ]
-    await asyncio.gather(*delete_images_c)
+    removed: List[bool] = await asyncio.gather(*delete_images_c)
+    DELETED_IMAGES.inc(sum(removed))
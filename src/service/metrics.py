@@ -0,0 +1,236 @@
+"""
+The module collects the metrics of the app
+and exposes them in the Prometheus text format at /metrics.
+The labelled children are bound in advance, so the hot path
+only looks them up and updates them.
+With PROMETHEUS_MULTIPROC_DIR in the environment every worker writes
+its metrics into the files of the directory, and /metrics merges them
+"""
+
+import hmac
+import os
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, FrozenSet, Iterable, Optional, Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import Pool
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import BaseRoute, Route
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from src.config.config import Config
+from src.service.exceptions import IdentificationError
+
+# prometheus_client chooses the mode by this variable, when it is imported
+MULTIPROC_DIR: Optional[str] = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+if MULTIPROC_DIR is not None:
+    # the files of the metrics are opened, when the metrics are created below
+    os.makedirs(MULTIPROC_DIR, exist_ok=True)
+
+# the own registry does not collect the metrics of the process and the libraries
+REGISTRY = CollectorRegistry()
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Latency of the requests by route template",
+    ["method", "route"],
+    registry=REGISTRY,
+)
+# the gauges of the workers are summed, the dead workers are not counted
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "Requests being processed",
+    registry=REGISTRY,
+    multiprocess_mode="livesum",
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out_connections",
+    "Connections checked out from the pool",
+    ["pool"],
+    registry=REGISTRY,
+    multiprocess_mode="livesum",
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow_connections",
+    "Connections opened over the pool size",
+    ["pool"],
+    registry=REGISTRY,
+    multiprocess_mode="livesum",
+)
+_IMAGE_NAMES_CACHE = Counter(
+    "image_names_cache_lookups",
+    "Lookups of the image file names. Hit ratio: hit / (hit + miss)",
+    ["result"],
+    registry=REGISTRY,
+)
+IMAGE_NAMES_CACHE_HITS = _IMAGE_NAMES_CACHE.labels("hit")
+IMAGE_NAMES_CACHE_MISSES = _IMAGE_NAMES_CACHE.labels("miss")
+UPLOADED_BYTES = Counter(
+    "image_upload_bytes", "Bytes of the uploaded images", registry=REGISTRY
+)
+DELETED_IMAGES = Counter(
+    "images_deleted", "Image files deleted from disk", registry=REGISTRY
+)
+
+# requests, which do not match any route
+UNMATCHED_ROUTE: str = "unmatched"
+# any other method is labelled OTHER_METHOD, so the clients cannot add labels
+KNOWN_METHODS: FrozenSet[str] = frozenset(
+    ("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS")
+)
+OTHER_METHOD: str = "other"
+BEARER_PREFIX: str = "Bearer "
+# route template -> method -> the bound histogram
+_latency: Dict[str, Dict[str, Histogram]] = dict()
+# endpoint -> route template, for the routes which are not FastAPI routes
+_endpoint_paths: Dict[Callable, str] = dict()
+# name of the pool -> the pool with its bound gauges: checked out and overflow
+_pools: Dict[str, Tuple[Pool, Gauge, Gauge]] = dict()
+
+
+def bind_routes(routes: Iterable[BaseRoute]) -> None:
+    """
+    The function binds the latency histograms of the routes in advance
+    :param routes: the routes of the app
+    """
+    for route in routes:
+        if isinstance(route, Route):
+            _endpoint_paths[route.endpoint] = route.path
+            for method in route.methods or ():
+                _latency.setdefault(route.path, dict())[method] = (
+                    REQUEST_LATENCY.labels(method, route.path)
+                )
+
+
+def bind_pools(engines: Dict[str, AsyncEngine]) -> None:
+    """
+    The function reports the state of the connection pools.
+    The pools are read after every request and when the metrics are scraped,
+    since the workers do not share the functions of the gauges
+    :param engines: name of the pool -> engine
+    """
+    for name, engine in engines.items():
+        _pools[name] = (
+            engine.sync_engine.pool,
+            DB_POOL_CHECKED_OUT.labels(name),
+            DB_POOL_OVERFLOW.labels(name),
+        )
+    report_pools()
+
+
+def report_pools() -> None:
+    """The function sets the gauges of the pools to their current state"""
+    for pool, checked_out, overflow in _pools.values():
+        checked_out.set(getattr(pool, "checkedout", lambda: 0)())
+        overflow.set(getattr(pool, "overflow", lambda: 0)())
+
+
+def _get_latency(method: str, route: str) -> Histogram:
+    try:
+        return _latency[route][method]
+    except KeyError:
+        # e.g. HEAD or a route, which was added after bind_routes
+        child = REQUEST_LATENCY.labels(method, route)
+        _latency.setdefault(route, dict())[method] = child
+        return child
+
+
+class MetricsMiddleware:
+    """The middleware measures the latency and the number of the requests"""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        REQUESTS_IN_FLIGHT.inc()
+        start: float = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            # the router puts the matched route or its endpoint into the scope
+            route: Any = scope.get("route")
+            endpoint: Any = scope.get("endpoint")
+            path: str = (
+                route.path
+                if route is not None
+                else _endpoint_paths.get(endpoint, UNMATCHED_ROUTE)
+            )
+            method: str = scope["method"]
+            if method not in KNOWN_METHODS:
+                method = OTHER_METHOD
+            _get_latency(method, path).observe(time.perf_counter() - start)
+            report_pools()
+
+
+def collect_metrics() -> bytes:
+    """
+    The function returns the metrics in the Prometheus text format.
+    In the multiprocess mode the metrics of all the workers are merged
+    """
+    if MULTIPROC_DIR is None:
+        return generate_latest(REGISTRY)
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry)
+
+
+def reset_multiproc_dir() -> None:
+    """
+    The function removes the metrics of the previous run of the server,
+    it runs in the master before the workers are started
+    """
+    if MULTIPROC_DIR is None:
+        return
+    for path in Path(MULTIPROC_DIR).glob("*.db"):
+        path.unlink()
+
+
+def mark_worker_dead(pid: int) -> None:
+    """
+    The function drops the live gauges of the exited worker,
+    its counters and histograms are still summed
+    """
+    if MULTIPROC_DIR is not None:
+        multiprocess.mark_process_dead(pid, MULTIPROC_DIR)
+
+
+def _is_scrape_allowed(request: Request, config: Config) -> bool:
+    if config.env == "debug":
+        return True
+    authorization: str = request.headers.get("authorization", "")
+    if config.metrics.token is None or not authorization.startswith(BEARER_PREFIX):
+        return False
+    return hmac.compare_digest(
+        authorization[len(BEARER_PREFIX) :], config.metrics.token
+    )
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    """
+    The endpoint returns the metrics in the Prometheus text format.
+    It is allowed in the debug mode or with the configured bearer token
+    :raise IdentificationError: if the token is missing or wrong
+    """
+    if not _is_scrape_allowed(request, request.app.state.config):
+        raise IdentificationError(
+            "Bearer token of the metrics is required",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    report_pools()
+    return Response(collect_metrics(), media_type=CONTENT_TYPE_LATEST)
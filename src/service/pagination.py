@@ -0,0 +1,39 @@
+"""The module encodes and decodes the cursors of the keyset pagination"""
+
+import base64
+from typing import Any, Callable, List
+
+import orjson
+from fastapi import HTTPException, status
+
+
+def encode_cursor(*values: Any) -> str:
+    """
+    The function encodes the sort key of the last item of the page
+    into an opaque cursor
+    :param values: the values of the sort key (numbers, strings, datetimes)
+    :return: url-safe cursor
+    """
+    return base64.urlsafe_b64encode(orjson.dumps(values)).decode()
+
+
+def decode_cursor(cursor: str, *types: Callable[[Any], Any]) -> List[Any]:
+    """
+    The function decodes the cursor into the sort key
+    :param cursor: the cursor from encode_cursor
+    :param types: the functions, which convert the values of the sort key,
+    e.g. datetime.fromisoformat
+    :raise HTTPException: if the cursor is invalid
+    :return: the values of the sort key
+    """
+    try:
+        values = orjson.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError("Wrong number of values")
+        return [convert(value) for convert, value in zip(types, values)]
+    # binascii.Error is a ValueError
+    except (TypeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Invalid cursor {cursor}",
+        )
@@ -0,0 +1,178 @@
+"""
+The module profiles the requests with the sampling profiler (pyinstrument).
+A single request is profiled on demand and its profile is returned
+instead of the response. Besides, every n-th request can be profiled
+into a directory, which keeps only the last profiles
+"""
+
+import asyncio
+import hmac
+import os
+import re
+import time
+from itertools import count
+from logging import getLogger
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from urllib.parse import parse_qs
+
+from pyinstrument import Profiler
+from pyinstrument.renderers import HTMLRenderer, Renderer, SpeedscopeRenderer
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.config.config import Profiling
+
+logger = getLogger("routes_logger.profiling")
+
+PROFILE_QUERY_PARAM: str = "profile"
+PROFILE_HEADER: bytes = b"x-profile"
+PROFILE_TOKEN_HEADER: bytes = b"x-profile-token"
+SAMPLED_SUFFIX: str = ".speedscope.json"
+
+# format of the profile -> renderer and media type of the response
+FORMATS: Dict[str, Callable[[], Renderer]] = {
+    "html": HTMLRenderer,
+    "speedscope": SpeedscopeRenderer,
+}
+MEDIA_TYPES: Dict[str, str] = {
+    "html": "text/html",
+    "speedscope": "application/json",
+}
+
+
+def _get_header(scope: Scope, name: bytes) -> Optional[str]:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def requested_format(scope: Scope) -> Optional[str]:
+    """
+    The function returns the format of the profile, which is requested
+    with ?profile= or the X-Profile header. An unknown format means html
+    :param scope: scope of the request
+    :return: html, speedscope or None if the profile is not requested
+    """
+    values: List[str] = parse_qs(scope.get("query_string", b"").decode("latin-1")).get(
+        PROFILE_QUERY_PARAM, list()
+    )
+    value: Optional[str] = values[-1] if values else _get_header(scope, PROFILE_HEADER)
+    if value is None:
+        return None
+    return value if value in FORMATS else "html"
+
+
+def _route_slug(scope: Scope) -> str:
+    route: Any = scope.get("route")
+    path: str = getattr(route, "path", None) or scope["path"]
+    return re.sub(r"\W+", "_", path).strip("_") or "root"
+
+
+def _write_profile(
+    profiler: Profiler, directory: Path, name: str, max_files: int
+) -> None:
+    """
+    The function writes the profile in the speedscope format
+    and removes the oldest profiles beyond max_files
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    (directory / name).write_text(profiler.output(renderer=SpeedscopeRenderer()))
+    # the names start with the time, so they are sorted from the oldest
+    profiles: List[str] = sorted(
+        entry.name
+        for entry in os.scandir(directory)
+        if entry.name.endswith(SAMPLED_SUFFIX)
+    )
+    for old in profiles[: max(len(profiles) - max_files, 0)]:
+        try:
+            os.remove(directory / old)
+        except FileNotFoundError:
+            # removed by another worker
+            pass
+
+
+class ProfilingMiddleware:
+    """
+    The middleware profiles the requests.
+    On demand the profile of the request is returned instead of its response.
+    It is allowed in the debug mode or with the X-Profile-Token header
+    equal to the configured token, otherwise the flag is ignored.
+    Every sample_every-th request is profiled into the directory
+    :param profiling: profiling config
+    :param debug: the app runs in the debug mode
+    """
+
+    def __init__(self, app: ASGIApp, profiling: Profiling, debug: bool = False) -> None:
+        self.app = app
+        self.profiling = profiling
+        self.debug = debug
+        self._requests: Iterator[int] = count(1)
+
+    def _is_allowed(self, scope: Scope) -> bool:
+        if self.debug:
+            return True
+        token: Optional[str] = _get_header(scope, PROFILE_TOKEN_HEADER)
+        if self.profiling.token is None or token is None:
+            return False
+        return hmac.compare_digest(token, self.profiling.token)
+
+    def _is_sampled(self) -> bool:
+        every: int = self.profiling.sample_every
+        return every > 0 and next(self._requests) % every == 0
+
+    def _profiler(self) -> Profiler:
+        return Profiler(interval=self.profiling.interval, async_mode="enabled")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile_format: Optional[str] = requested_format(scope)
+        if profile_format is not None and self._is_allowed(scope):
+            await self._profile_request(scope, receive, send, profile_format)
+        elif self._is_sampled():
+            await self._sample_request(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
+
+    async def _profile_request(
+        self, scope: Scope, receive: Receive, send: Send, profile_format: str
+    ) -> None:
+        async def discard(message: Message) -> None:
+            pass
+
+        profiler: Profiler = self._profiler()
+        profiler.start()
+        try:
+            await self.app(scope, receive, discard)
+        finally:
+            profiler.stop()
+        response = Response(
+            profiler.output(renderer=FORMATS[profile_format]()),
+            media_type=MEDIA_TYPES[profile_format],
+        )
+        await response(scope, receive, send)
+
+    async def _sample_request(self, scope: Scope, receive: Receive, send: Send) -> None:
+        profiler: Profiler = self._profiler()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            profiler.stop()
+        name: str = f"{time.time_ns()}_{scope['method']}_{_route_slug(scope)}"
+        try:
+            # rendering and writing the profile do not block the event loop
+            await asyncio.get_running_loop().run_in_executor(
+                None,
+                _write_profile,
+                profiler,
+                Path(self.profiling.directory),
+                name + SAMPLED_SUFFIX,
+                self.profiling.max_files,
+            )
+        except OSError as exc:
+            logger.warning("Cannot write the profile %s: %s", name, exc)
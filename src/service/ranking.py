@@ -0,0 +1,36 @@
+import asyncio
+from logging import getLogger
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.config.config import Ranking
+from src.database import queries as q
+
+logger = getLogger("routes_logger.ranking")
+
+
+async def refresh_scores_periodically(
+    session_maker: async_sessionmaker[AsyncSession], ranking: Ranking
+) -> None:
+    """
+    The background job, which refreshes the popularity scores of the recent tweets
+    every ranking.refresh_interval seconds, so that old tweets sink in the feed.
+    Every worker runs the job, but the refresh is skipped, if another worker
+    has done it during the interval. Errors are logged, and the job continues
+    :param session_maker: factory of sessions to the primary database
+    :param ranking: ranking config
+    :return: None
+    """
+    while True:
+        await asyncio.sleep(ranking.refresh_interval)
+        try:
+            async with session_maker() as session:
+                num_tweets: int = await q.refresh_scores(
+                    session,
+                    ranking.gravity,
+                    ranking.refresh_interval,
+                    ranking.refresh_max_age,
+                )
+            logger.debug("Scores of %d tweets were refreshed", num_tweets)
+        except Exception as exc:
+            logger.exception("Failed to refresh the scores", exc_info=exc)
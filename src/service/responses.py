@@ -0,0 +1,85 @@
+"""The module contains the response classes of the app"""
+
+from typing import Any, Dict, Mapping, Optional
+
+import msgpack
+import orjson
+from fastapi import Request, Response
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+from src.service.timing import measure
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+# the same body is returned in different formats, so caches must know about it
+VARY_HEADERS: Dict[str, str] = {"Vary": "Accept"}
+# for the OpenAPI schema of the endpoints, which support MessagePack
+MSGPACK_RESPONSE: Dict[str, Any] = {"content": {MSGPACK_MEDIA_TYPE: {}}}
+
+
+class FastJSONResponse(ORJSONResponse):
+    """
+    JSON response, which is rendered by orjson.
+    Pydantic models are serialized straight to bytes by pydantic-core,
+    without converting them to dicts first
+    """
+
+    def render(self, content: Any) -> bytes:
+        with measure("serialization"):
+            if isinstance(content, BaseModel):
+                return content.__pydantic_serializer__.to_json(content)
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+class MsgPackResponse(Response):
+    """MessagePack response. It is smaller and faster to parse than JSON"""
+
+    media_type = MSGPACK_MEDIA_TYPE
+
+    def render(self, content: Any) -> bytes:
+        with measure("serialization"):
+            if isinstance(content, BaseModel):
+                content = content.model_dump()
+            return msgpack.packb(content)
+
+
+def accepts_msgpack(request: Request) -> bool:
+    """
+    The function checks whether the client asked for MessagePack
+    :param request: request object
+    :return: True if the Accept header lists MessagePack
+    """
+    for media_range in request.headers.get("accept", "").split(","):
+        media_type, *params = (part.strip() for part in media_range.split(";"))
+        if media_type != MSGPACK_MEDIA_TYPE:
+            continue
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    return float(value) > 0
+                except ValueError:
+                    return False
+        return True
+    return False
+
+
+def negotiated_response(
+    request: Request,
+    content: Any,
+    status_code: int = 200,
+    headers: Optional[Mapping[str, str]] = None,
+) -> Response:
+    """
+    The function renders the content in the format, which the client accepts.
+    JSON is the default
+    :param request: request object
+    :param content: pydantic model or data of the response
+    :param status_code: status code of the response
+    :param headers: additional headers of the response
+    :return: MessagePack or JSON response
+    """
+    response_class = MsgPackResponse if accepts_msgpack(request) else FastJSONResponse
+    return response_class(
+        content, status_code=status_code, headers={**VARY_HEADERS, **(headers or {})}
+    )
@@ -0,0 +1,74 @@
+"""The module serializes pages of ORM objects into response dicts in one pass"""
+
+from typing import Any, Callable, Collection, Dict, Iterable, List, Tuple
+
+from src.database.models import Tweet, User
+
+# attachments are served by nginx from this path
+ATTACHMENTS_URL: str = "client/static/images/"
+
+# tweet id -> (user_id, name) of the likers, see queries.get_top_likers
+Likers = Dict[int, List[Tuple[int, str]]]
+
+# field of FullTweetSchema -> the function, which serializes it
+_TWEET_FIELDS: Dict[str, Callable[[Tweet, Dict[int, str], Likers], Any]] = {
+    "id": lambda tweet, *_: tweet.id,
+    "content": lambda tweet, *_: tweet.tweet_data,
+    "attachments": lambda tweet, images_names, _: [
+        ATTACHMENTS_URL + images_names.get(image.id, "") for image in tweet.images or ()
+    ],
+    "author": lambda tweet, *_: {"id": tweet.user.id, "name": tweet.user.name},
+    "likes_count": lambda tweet, *_: tweet.likes_count,
+    "likes": lambda tweet, _, likers: [
+        {"user_id": user_id, "name": name} for user_id, name in likers.get(tweet.id, ())
+    ],
+}
+# field of FullUserSchema -> the function, which serializes it
+_USER_FIELDS: Dict[str, Callable[[User], Any]] = {
+    "id": lambda user: user.id,
+    "name": lambda user: user.name,
+    "followers": lambda user: [
+        {"id": follower.id, "name": follower.name} for follower in user.followers or ()
+    ],
+    "following": lambda user: [
+        {"id": author.id, "name": author.name} for author in user.authors or ()
+    ],
+}
+TWEET_FIELDS: Tuple[str, ...] = tuple(_TWEET_FIELDS)
+USER_FIELDS: Tuple[str, ...] = tuple(_USER_FIELDS)
+
+
+def serialize_tweets(
+    tweets: Iterable[Tweet],
+    images_names: Dict[int, str],
+    likers: Likers,
+    fields: Collection[str] = TWEET_FIELDS,
+) -> List[Dict[str, Any]]:
+    """
+    Function serializes the page of tweets according to FullTweetSchema.
+    The tweets must be loaded with the relationships of the requested fields
+    (see queries.tweet_fields_options).
+    The output contains only the fields of the schema,
+    so it does not need to be validated again
+    :param tweets: the page of tweets
+    :param images_names: image id -> file name, see images.get_images_names
+    :param likers: tweet id -> the likers shown with the tweet
+    :param fields: the fields of the output, all of them by default
+    :return: list of tweets dicts
+    """
+    getters = [(name, get) for name, get in _TWEET_FIELDS.items() if name in fields]
+    return [
+        {name: get(tweet, images_names, likers) for name, get in getters}
+        for tweet in tweets
+    ]
+
+
+def serialize_user(user: User, fields: Collection[str] = USER_FIELDS) -> Dict[str, Any]:
+    """
+    Function serializes the user according to FullUserSchema.
+    The api_key of the user and of their followers is never serialized
+    :param user: the user with the relationships of the requested fields
+    :param fields: the fields of the output, all of them by default
+    :return: user dict
+    """
+    return {name: get(user) for name, get in _USER_FIELDS.items() if name in fields}
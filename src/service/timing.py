@@ -0,0 +1,115 @@
+"""
+The module measures where the time of a request goes:
+auth, database, serialization and total.
+The timings are returned in the Server-Timing header and logged
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging import getLogger
+from typing import Any, Dict, Iterator, Optional
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.database.query_counter import QueryStats, count_queries
+
+logger = getLogger("routes_logger.timing")
+
+# name of the timing -> seconds, for the current request
+_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("timings", default=None)
+
+
+def add_timing(name: str, seconds: float) -> None:
+    """
+    The function adds the time to the timing of the current request.
+    Outside a request it does nothing
+    :param name: name of the timing
+    :param seconds: the measured time
+    """
+    timings: Optional[Dict[str, float]] = _timings.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+@contextmanager
+def measure(name: str) -> Iterator[None]:
+    """The context manager adds the time of its block to the timing"""
+    start: float = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_timing(name, time.perf_counter() - start)
+
+
+def format_server_timing(timings: Dict[str, float]) -> str:
+    """
+    The function formats the timings as the value of the Server-Timing header
+    :param timings: name -> seconds
+    :return: e.g. "db;dur=1.25, total;dur=3.5"
+    """
+    return ", ".join(
+        f"{name};dur={seconds * 1000:.2f}" for name, seconds in timings.items()
+    )
+
+
+class ServerTimingMiddleware:
+    """
+    The middleware collects the timings of the request,
+    returns them in the Server-Timing header and logs them.
+    The db timing and the numbers of statements and rows are counted
+    by the instrumented engines (see database.query_counter).
+    The total in the header is the time until the response starts,
+    the total in the log includes sending the body
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings: Dict[str, float] = dict()
+        token = _timings.set(timings)
+        start: float = time.perf_counter()
+        status_code: int = 500
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                timings["db"] = stats.seconds
+                timings["total"] = time.perf_counter() - start
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", format_server_timing(timings))
+            await send(message)
+
+        stats: QueryStats
+        try:
+            with count_queries() as stats:
+                await self.app(scope, receive, send_with_timing)
+        finally:
+            _timings.reset(token)
+            timings["db"] = stats.seconds
+            timings["total"] = time.perf_counter() - start
+            route: Any = scope.get("route")
+            logger.info(
+                "%s %s %d",
+                scope["method"],
+                scope["path"],
+                status_code,
+                extra={
+                    "method": scope["method"],
+                    "route": getattr(route, "path", None),
+                    "status": status_code,
+                    "db_statements": stats.statements,
+                    "db_rows": stats.rows,
+                    **{
+                        f"{name}_ms": seconds * 1000
+                        for name, seconds in timings.items()
+                    },
+                },
+            )
@@ -1,46 +1,170 @@
+import asyncio
+import hashlib
+import hmac
 import re
+import time
 from contextlib import asynccontextmanager
 from logging import getLogger
-from typing import Optional
+from typing import Annotated, Collection, FrozenSet, Optional, Sequence, Tuple
 
-from fastapi import Depends, FastAPI, Header, HTTPException, Request
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-from src.config.config import Config, load_config
+from src.config.config import DB, Config
 from src.database import queries as q
-from src.database.models import Base, Session, Tweet, User, engine
+from src.database.engine import Database
+from src.database.models import Tweet, User
 from src.service.exceptions import ForbiddenError, IdentificationError, NotFoundError
+from src.service.ranking import refresh_scores_periodically
+from src.service.serializers import TWEET_FIELDS, USER_FIELDS
+from src.service.timing import measure
 
 logger = getLogger("routes_logger")
 
-config: Config = load_config()
+# Read-only endpoints, which can be served by the read replica
+READ_ONLY_PATH = re.compile(r"/api/(tweets|users/me|users/\d+)")
+SAFE_METHODS: Tuple[str, ...] = ("GET", "HEAD", "OPTIONS")
+# The signed time of the user's last mutation. The client carries the cookie
+# to every worker and host, so any of them sends the user's reads to the primary
+LAST_WRITE_COOKIE: str = "last_write"
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
-    The function creates a database connection session.
-    If the DROP_ALL environment variable is equal 1,
-    then the entire database will be dropped before creation (only during development)
+    The function starts the background jobs and closes the database connections
+    on shutdown. The schema is managed by the Alembic migrations
+    (alembic upgrade head), so the workers do not run DDL on startup
     """
     # Startup
     logger.info("Startup")
-    async with engine.begin() as conn:
-        if config.env == "debug" or config.env == "test":
-            logger.debug("drop all")
-            await conn.run_sync(Base.metadata.drop_all)
-        await conn.run_sync(Base.metadata.create_all)
+    config: Config = app.state.config
+    database: Database = app.state.database
+    refresh_scores_task = asyncio.create_task(
+        refresh_scores_periodically(database.Session, config.ranking)
+    )
     logger.debug("Before yield")
     yield
     logger.debug("After yield")
     # Shutdown
     logger.info("Shutdown")
-    await engine.dispose()
+    refresh_scores_task.cancel()
+    await database.dispose()
+
+
+def get_config(request: Request) -> Config:
+    """The function returns the config of the app, which serves the request"""
+    return request.app.state.config
+
+
+def get_database(request: Request) -> Database:
+    """The function returns the database of the app, which serves the request"""
+    return request.app.state.database
+
+
+def _signing_key(db: DB) -> bytes:
+    """The key of the cookie: the configured secret or the url of the primary,
+    which is the same in all the workers and is never sent to the clients"""
+    return (db.read_your_writes_secret or db.url).encode()
+
+
+def _sign_write(db: DB, api_key: str, write_time: str) -> str:
+    message: bytes = f"{api_key}:{write_time}".encode()
+    return hmac.new(_signing_key(db), message, hashlib.sha256).hexdigest()
+
+
+def last_write_cookie(db: DB, api_key: str, write_time: float) -> str:
+    """
+    The function returns the value of the cookie with the time of the mutation
+    :param db: database config with the key of the signature
+    :param api_key: api key of the user, who made the mutation
+    :param write_time: unix time of the mutation
+    :return: the time and the signature
+    """
+    time_str: str = f"{write_time:.3f}"
+    return f"{time_str}.{_sign_write(db, api_key, time_str)}"
+
+
+def last_write_time(request: Request, db: DB) -> Optional[float]:
+    """
+    The function returns the time of the user's last mutation from the cookie
+    :param request: Request object
+    :param db: database config with the key of the signature
+    :return: unix time, None if there is no cookie or its signature is invalid
+    """
+    cookie: Optional[str] = request.cookies.get(LAST_WRITE_COOKIE)
+    if not cookie:
+        return None
+    time_str, _, signature = cookie.rpartition(".")
+    expected: str = _sign_write(db, request.headers.get("api-key", ""), time_str)
+    if not hmac.compare_digest(signature, expected):
+        return None
+    try:
+        return float(time_str)
+    except ValueError:
+        return None
+
+
+def use_replica(request: Request, db: DB) -> bool:
+    """
+    The function decides whether the request can be served by the read replica.
+    Only read-only endpoints go to the replica, and only if the current user
+    has not made any mutations within the read-your-writes window
+    (the time of the last mutation comes with the request, see LAST_WRITE_COOKIE)
+    :param request: Request object
+    :param db: database config with the read-your-writes window
+    :return: True, if the replica session should be used
+    """
+    if request.method != "GET" or not READ_ONLY_PATH.fullmatch(request.url.path):
+        return False
+    last_write: Optional[float] = last_write_time(request, db)
+    if last_write is None:
+        return True
+    return time.time() - last_write > db.read_your_writes_window
+
+
+class ReadYourWritesMiddleware:
+    """
+    The middleware sets the cookie with the signed time of the user's
+    successful mutation. The time is taken when the response starts,
+    i.e. after the commit, so the window starts after the end of the mutation
+    """
+
+    def __init__(self, app: ASGIApp, db: DB) -> None:
+        self.app = app
+        self.db = db
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+        api_key: Optional[str] = Headers(scope=scope).get("api-key")
+        if not api_key:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                max_age: int = int(self.db.read_your_writes_window) + 1
+                value: str = last_write_cookie(self.db, api_key, time.time())
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Set-Cookie",
+                    f"{LAST_WRITE_COOKIE}={value}; Max-Age={max_age}; Path=/api;"
+                    " HttpOnly; SameSite=Lax",
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
 
 
 async def get_session(request: Request):
-    logger.info("Getting session")
-    session: AsyncSession = Session()
+    logger.debug("Getting session")
+    config: Config = get_config(request)
+    database: Database = get_database(request)
+    session: AsyncSession = database.Session()
 
     if config.env == "debug":
         # Check count users in db
@@ -72,6 +196,13 @@ async def get_session(request: Request):
             )
             logger.debug("Add user with id %d and api_key %s", new_user.id, "test2")
 
+    if use_replica(request, config.db):
+        # users are created above only on the primary,
+        # so the session is switched after that
+        logger.debug("Use the read replica")
+        await session.close()
+        session = database.ReplicaSession()
+
     try:
         logger.debug("Before yield session")
         request.state.session = session
@@ -92,32 +223,36 @@ async def check_api_key(request: Request, api_key: str = Header()) -> None:
     if request.url.path.startswith("/api") and not re.search(
         r"/api/users/\d+$", request.url.path
     ):
-        logger.info("Start checking api_key")
+        logger.debug("Start checking api_key")
         session: AsyncSession = request.state.session
         if not api_key:
             raise HTTPException(status_code=400, detail="api_key is None")
-        user: Optional[User] = await q.get_user_by_api_key(session, api_key)
+        with measure("auth"):
+            user: Optional[User] = await q.get_user_by_api_key(session, api_key)
 
         if not user:
             logger.warning("api_key not exists")
             raise IdentificationError("api_key not exists")
 
-        logger.info("Identification is successful")
+        logger.debug("Identification is successful")
 
         request.state.current_user = user
 
 
-async def check_users_exist(user_id: int, session: AsyncSession) -> User:
+async def check_users_exist(
+    user_id: int, session: AsyncSession, fields: Optional[Collection[str]] = None
+) -> User:
     """
     The function checks that user with user_id exists.
     :param user_id: the user ID
     :param session: async session object
+    :param fields: the fields of the response, for which the user is loaded
     :raise HTTPException: if user_id is not in database
     :return: user if user_id is in the database
     :rtype: User
     """
-    logger.info("Start checking user_id")
-    user: Optional[User] = await q.get_user_by_id(session, user_id)
+    logger.debug("Start checking user_id")
+    user: Optional[User] = await q.get_user_by_id(session, user_id, fields)
 
     if not user:
         logger.warning("user_id %d not exists", user_id)
@@ -143,3 +278,52 @@ async def check_tweet_relates_user(
         raise ForbiddenError(
             f"The tweet {tweet.user_id} does not belong to user {user_id}"
         )
+
+
+def _parse_fields(fields: Optional[str], allowed: Sequence[str]) -> FrozenSet[str]:
+    """
+    The function parses the comma-separated list of the response fields
+    :param fields: the value of the fields query parameter
+    :param allowed: the fields of the response
+    :raise HTTPException: if there is an unknown field
+    :return: the requested fields, all of them if the parameter is not given
+    """
+    if fields is None:
+        return frozenset(allowed)
+    result: FrozenSet[str] = frozenset(
+        field.strip() for field in fields.split(",") if field.strip()
+    )
+    unknown: FrozenSet[str] = result.difference(allowed)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Unknown fields {', '.join(sorted(unknown))}."
+            f" Allowed fields: {', '.join(allowed)}",
+        )
+    return result
+
+
+def get_tweet_fields(
+    fields: Annotated[
+        Optional[str],
+        Query(
+            description="Comma-separated fields of the tweets. All fields by default",
+            examples=["id,content,author,likes_count"],
+        ),
+    ] = None,
+) -> FrozenSet[str]:
+    """The dependency returns the fields of the tweets, requested by the client"""
+    return _parse_fields(fields, TWEET_FIELDS)
+
+
+def get_user_fields(
+    fields: Annotated[
+        Optional[str],
+        Query(
+            description="Comma-separated fields of the user. All fields by default",
+            examples=["id,name,following"],
+        ),
+    ] = None,
+) -> FrozenSet[str]:
+    """The dependency returns the fields of the user, requested by the client"""
+    return _parse_fields(fields, USER_FIELDS)
@@ -1,44 +1,159 @@
 import os
-from typing import AsyncGenerator, Callable, Dict, Generator, List, Tuple
+from typing import AsyncGenerator, Callable, Dict, Generator, List, Optional, Tuple
 
 import pytest
 import pytest_asyncio
 from fastapi import FastAPI, Request
 from httpx import ASGITransport, AsyncClient
+from pytest_asyncio import is_async_test
+from sqlalchemy import URL, event, make_url, text
 from sqlalchemy.ext.asyncio import (
+    AsyncConnection,
     AsyncEngine,
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
+from sqlalchemy.orm import ORMExecuteState
+from sqlalchemy.orm import Session as SyncSession
 
 import src.database.queries as q
 from src.api.routes import create_app
 from src.config.config import load_config
+from src.database.engine import Database
 from src.database.models import Base
+from src.database.query_counter import instrument_engine
+from src.service import images
 from src.service.images import delete_images_by_ids
 from src.service.web import get_session
 
 db_config = load_config()
 DB_URL: str = db_config.db.url
 
-
-@pytest_asyncio.fixture(scope="function", autouse=True)
-async def engine():
-    engine = create_async_engine(DB_URL)
+# sequences are not transactional, so they are reset before every test
+RESET_SEQUENCES: str = "SELECT setval(oid, 1, false) FROM pg_class WHERE relkind = 'S'"
+TRUNCATE_TABLES: str = "TRUNCATE {tables} RESTART IDENTITY CASCADE"
+# the name of the pytest-xdist worker (gw0, gw1, ...), None without xdist
+XDIST_WORKER: Optional[str] = os.environ.get("PYTEST_XDIST_WORKER")
+
+
+def pytest_collection_modifyitems(items: List[pytest.Item]) -> None:
+    """The tests run in the event loop of the session, like the session engine"""
+    marker = pytest.mark.asyncio(loop_scope="session")
+    for item in items:
+        if is_async_test(item):
+            item.add_marker(marker, append=False)
+
+
+async def _execute_autocommit(url: URL, sql: str) -> None:
+    admin_engine: AsyncEngine = create_async_engine(url, isolation_level="AUTOCOMMIT")
+    try:
+        async with admin_engine.connect() as conn:
+            await conn.execute(text(sql))
+    finally:
+        await admin_engine.dispose()
+
+
+@pytest_asyncio.fixture(scope="session")
+async def session_engine() -> AsyncGenerator[AsyncEngine, None]:
+    """
+    Fixture. The engine of the test database, the schema is created once
+    per session. With pytest-xdist (pytest -n auto) every worker creates
+    and drops its own database
+    """
+    url: URL = make_url(DB_URL)
+    if XDIST_WORKER:
+        database: str = f"{url.database or url.username}_{XDIST_WORKER}"
+        await _execute_autocommit(url, f'DROP DATABASE IF EXISTS "{database}"')
+        await _execute_autocommit(url, f'CREATE DATABASE "{database}"')
+        url, admin_url = url.set(database=database), url
+
+    engine = create_async_engine(url)
+    instrument_engine(engine)
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.drop_all)
         await conn.run_sync(Base.metadata.create_all)
 
     yield engine
     await engine.dispose()
+    if XDIST_WORKER:
+        await _execute_autocommit(admin_url, f'DROP DATABASE "{database}"')
+
+
+@pytest_asyncio.fixture(scope="function")
+async def connection(
+    session_engine: AsyncEngine,
+) -> AsyncGenerator[AsyncConnection, None]:
+    """
+    Fixture. A connection in a transaction, which is rolled back after the test.
+    The sessions of the test join it with savepoints
+    """
+    async with session_engine.connect() as conn:
+        transaction = await conn.begin()
+        await conn.execute(text(RESET_SEQUENCES))
+        yield conn
+        await transaction.rollback()
+
+
+@pytest.fixture(scope="function")
+def session_factory(connection: AsyncConnection) -> async_sessionmaker:
+    """
+    Fixture. Returns the factory of the sessions in the transaction of the test.
+    A commit of the session releases its savepoint, a rollback rolls back to it
+    """
+    return async_sessionmaker(
+        connection,
+        expire_on_commit=False,
+        class_=AsyncSession,
+        join_transaction_mode="create_savepoint",
+    )
 
 
 @pytest_asyncio.fixture(scope="function")
-async def db_session(engine: AsyncEngine) -> AsyncGenerator[Callable, None]:
+async def engine(session_engine: AsyncEngine) -> AsyncGenerator[AsyncEngine, None]:
+    """
+    Fixture. The engine for the tests, which commit through their own connections
+    (bulk loads, the app with its own sessions). The tables are truncated
+    after the test. The test must not use the connection fixture,
+    its transaction would block the truncation
+    """
+    yield session_engine
+    tables: str = ", ".join(table.name for table in Base.metadata.sorted_tables)
+    async with session_engine.begin() as conn:
+        await conn.execute(text("SET LOCAL lock_timeout = '5s'"))
+        await conn.execute(text(TRUNCATE_TABLES.format(tables=tables)))
+
+
+@pytest.fixture(scope="function", autouse=True)
+def no_lazy_loads() -> Generator[List[str], None, None]:
+    """
+    Fixture. Fails the test if any request triggers an implicit lazy load.
+    Relationships are lazy="raise" by default, so the fixture catches
+    relationships which were switched to a lazy strategy
+    """
+    lazy_loads: List[str] = list()
+
+    def on_execute(orm_execute_state: ORMExecuteState) -> None:
+        if not orm_execute_state.is_select:
+            return
+        instance_state = orm_execute_state.lazy_loaded_from
+        if instance_state is not None:
+            lazy_loads.append(
+                f"{instance_state.class_.__name__}: {orm_execute_state.statement}"
+            )
+
+    event.listen(SyncSession, "do_orm_execute", on_execute)
+    yield lazy_loads
+    event.remove(SyncSession, "do_orm_execute", on_execute)
+    assert not lazy_loads, "Implicit lazy loads:\n" + "\n".join(lazy_loads)
+
+
+@pytest_asyncio.fixture(scope="function")
+async def db_session(
+    session_factory: async_sessionmaker,
+) -> AsyncGenerator[Callable, None]:
     """Start a test database session"""
-    Session = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
-    session: AsyncSession = Session()
+    session: AsyncSession = session_factory()
 
     # add 2 users
     await q.create_user(session, {"api_key": "test_api_key", "name": "test"})
@@ -53,9 +168,9 @@ async def db_session(engine: AsyncEngine) -> AsyncGenerator[Callable, None]:
 
 
 @pytest.fixture(scope="function")
-def test_app(db_session) -> Generator[FastAPI, None, None]:
+def test_app(session_engine: AsyncEngine, db_session) -> Generator[FastAPI, None, None]:
     """Create a test_app with overridden dependencies"""
-    _app: FastAPI = create_app()
+    _app: FastAPI = create_app(db_config, Database(session_engine))
     _app.dependency_overrides[get_session] = db_session
     yield _app
     _app.dependency_overrides.clear()
@@ -98,10 +213,25 @@ async def tweet_id_without_img(
     yield response.json()["tweet_id"]
 
 
+@pytest.fixture(scope="session", autouse=True)
+def images_dir(tmp_path_factory: pytest.TempPathFactory) -> Generator[str, None, None]:
+    """
+    Fixture. Returns the directory of the uploaded images. The directory
+    of the app is a volume, which a checkout does not have, and the ids
+    of the images in the databases of the xdist workers overlap,
+    so every worker uploads the images into its own temporary directory
+    """
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(
+            images, "IMAGES_DIR", str(tmp_path_factory.mktemp("images"))
+        )
+        yield images.IMAGES_DIR
+
+
 @pytest.fixture(scope="function")
-def images_path() -> Generator[str, None, None]:
+def images_path(images_dir: str) -> Generator[str, None, None]:
     """Fixture. Returns path to images"""
-    yield os.path.join(os.path.abspath("."), "client", "static", "images")
+    yield images_dir
 
 
 @pytest_asyncio.fixture(scope="function")
@@ -111,7 +241,7 @@ async def image_id(client: AsyncClient, user_data) -> AsyncGenerator[int, None]:
     response = await client.post(
         "/api/medias",
         files={
-            "image": (
+            "file": (
                 "test.jpg",
                 open("tests/test_routes/images/test.jpg", "rb"),
                 "multipart/form-data",
@@ -139,7 +269,7 @@ async def images_ids(
         response = await client.post(
             "/api/medias",
             files={
-                "image": (
+                "file": (
                     "test.jpg",
                     open("tests/test_routes/images/test.jpg", "rb"),
                     "multipart/form-data",
@@ -0,0 +1,96 @@
+import random
+from collections import Counter
+from typing import Dict, List
+
+import pytest
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+import src.database.queries as q
+from benchmarks.dataset import DatasetConfig, DatasetGenerator, ZipfSampler, generate
+from src.database.models import Like, Mention, Tweet, TweetHashtag, User
+
+SMALL: DatasetConfig = DatasetConfig(users=200, tweets=1000, follows=5, likes=2000)
+
+
+def _rows(config: DatasetConfig) -> Dict[str, List[tuple]]:
+    generator = DatasetGenerator(config)
+    return {
+        name: list(getattr(generator, f"{name}_rows")())
+        for name in ("users", "following", "tweets", "images", "likes")
+    }
+
+
+def test_zipf_sampler() -> None:
+    """Testing that the ranks are permuted into all ids and the top rank is popular"""
+    sampler = ZipfSampler(1000, 1.1)
+    assert {sampler.id_of_rank(rank) for rank in range(1, 1001)} == set(range(1, 1001))
+
+    rng = random.Random(0)
+    ranks: Counter = Counter(sampler.rank(rng) for _ in range(10000))
+    assert min(ranks) >= 1 and max(ranks) <= 1000
+    assert ranks.most_common(1)[0][0] == 1
+    assert ranks[1] > ranks[10] > ranks[100]
+
+
+def test_generator_is_deterministic() -> None:
+    """Testing that the same seed gives the same rows"""
+    rows = _rows(SMALL)
+    assert rows == _rows(SMALL)
+    assert rows["likes"] != _rows(DatasetConfig(**{**vars(SMALL), "seed": 1}))["likes"]
+
+
+def test_generator_rows_are_valid() -> None:
+    """Testing the constraints of the generated rows"""
+    generator = DatasetGenerator(SMALL)
+    rows = _rows(SMALL)
+
+    following = [(follower, author) for follower, author, _ in rows["following"]]
+    assert len(following) == len(set(following))
+    assert all(follower != author for follower, author in following)
+
+    likes = [(user_id, tweet_id) for user_id, tweet_id, _ in rows["likes"]]
+    assert len(likes) == len(set(likes))
+    for _, tweet_id, created_at in rows["likes"]:
+        assert generator.tweet_created_at(tweet_id) <= created_at <= SMALL.end
+
+    # the followers follow a power law: the most popular users have many of them
+    followers: Counter = Counter(author for _, author in following)
+    assert followers.most_common(1)[0][1] > 10 * len(following) / SMALL.users
+
+
+@pytest.mark.asyncio
+async def test_generate_into_database(engine: AsyncEngine) -> None:
+    """Testing that the dataset is written with the counters, indexes and sequences"""
+    indexes_sql = text("SELECT count(*) FROM pg_indexes WHERE tablename = 'likes'")
+    async with engine.connect() as conn:
+        num_indexes: int = (await conn.execute(indexes_sql)).scalar_one()
+
+    counts: Dict[str, int] = await generate(engine, SMALL)
+    rows = _rows(SMALL)
+    assert counts == {name: len(table_rows) for name, table_rows in rows.items()}
+
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        assert await session.scalar(select(func.count()).select_from(Like)) == len(
+            rows["likes"]
+        )
+        assert await session.scalar(select(func.sum(Tweet.likes_count))) == len(
+            rows["likes"]
+        )
+        assert (await session.execute(indexes_sql)).scalar_one() == num_indexes
+        # the hashtags and the mentions are indexed, the users are named user_<id>
+        entities = [q.extract_entities(tweet[1]) for tweet in rows["tweets"]]
+        num_hashtags: int = sum(len(hashtags) for hashtags, _ in entities)
+        num_mentions: int = sum(len(names) for _, names in entities)
+        assert num_hashtags and num_mentions
+        hashtags_count = select(func.count()).select_from(TweetHashtag)
+        assert await session.scalar(hashtags_count) == num_hashtags
+        mentions_count = select(func.count()).select_from(Mention)
+        assert await session.scalar(mentions_count) == num_mentions
+        # the sequences continue after the generated ids
+        user: User = await q.create_user(session, {"api_key": "new", "name": "new"})
+        assert user.id == SMALL.users + 1
+
+    with pytest.raises(RuntimeError):
+        await generate(engine, SMALL)
+    assert await generate(engine, SMALL, truncate=True) == counts
@@ -0,0 +1,83 @@
+import os
+from typing import Any, Dict
+
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from benchmarks.dataset import DatasetConfig, generate
+from benchmarks.endpoints import SCENARIOS, compare, run_benchmarks, summarize
+from src.api.routes import create_app
+from src.config.config import load_config
+from src.database.engine import Database
+from src.database.models import Following, Image, Like, Tweet
+
+
+def _results(**metrics: float) -> Dict[str, Any]:
+    result: Dict[str, float] = {
+        "p50_ms": 10.0,
+        "p95_ms": 20.0,
+        "p99_ms": 30.0,
+        "throughput_rps": 100.0,
+    }
+    return {"results": {"feed": {**result, **metrics}}}
+
+
+def test_summarize() -> None:
+    """Testing the percentiles and the throughput"""
+    latencies = [num / 1000 for num in range(1, 101)]
+    result = summarize(latencies, errors=2, seconds=2.0)
+    assert result["requests"] == 100
+    assert result["errors"] == 2
+    assert result["p50_ms"] == pytest.approx(50.5)
+    assert result["p95_ms"] == pytest.approx(95.05)
+    assert result["p99_ms"] == pytest.approx(99.01)
+    assert result["throughput_rps"] == 50.0
+
+
+def test_compare() -> None:
+    """Testing that the slower latency and the lower throughput are regressions"""
+    baseline = _results()
+    _, regressions = compare(baseline, _results(p50_ms=10.5, throughput_rps=95.0))
+    assert regressions == []
+
+    _, regressions = compare(baseline, _results(p95_ms=25.0, throughput_rps=80.0))
+    assert len(regressions) == 2
+    assert "p95_ms" in regressions[0]
+    assert "throughput_rps" in regressions[1]
+    # faster is never a regression
+    _, regressions = compare(baseline, _results(p99_ms=1.0, throughput_rps=1000.0))
+    assert regressions == []
+
+
+async def _count(session: AsyncSession, model: Any) -> int:
+    return await session.scalar(select(func.count()).select_from(model)) or 0
+
+
+@pytest.mark.asyncio
+async def test_run_benchmarks(engine: AsyncEngine, images_path: str) -> None:
+    """Testing that all scenarios run without errors and the dataset stays the same"""
+    await generate(engine, DatasetConfig(users=100, tweets=500, follows=2, likes=100))
+    database = Database(engine)
+    app: FastAPI = create_app(load_config(), database)
+    images_files = set(os.listdir(images_path))
+    async with database.Session() as session:
+        counts = [
+            await _count(session, model) for model in (Tweet, Like, Following, Image)
+        ]
+
+    results = await run_benchmarks(
+        app, database, list(SCENARIOS), requests=5, warmup=1, concurrency=2
+    )
+
+    assert set(results["results"]) == set(SCENARIOS)
+    for name, result in results["results"].items():
+        assert result["requests"] == 5, name
+        assert result["errors"] == 0, name
+        assert result["p99_ms"] >= result["p50_ms"] > 0
+    async with database.Session() as session:
+        assert counts == [
+            await _count(session, model) for model in (Tweet, Like, Following, Image)
+        ]
+    assert set(os.listdir(images_path)) == images_files
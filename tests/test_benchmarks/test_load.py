@@ -0,0 +1,64 @@
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from benchmarks.dataset import DatasetConfig, generate
+from benchmarks.load import NO_RESPONSE, LoadConfig, Sample, report, run_stage
+from src.api.routes import create_app
+from src.config.config import load_config
+from src.database.engine import Database
+
+
+def test_report() -> None:
+    """Testing the timeline, the errors and the rejected requests"""
+    samples = [
+        Sample(0.1, "feed", 0.010, 200),
+        Sample(0.5, "like", 0.020, 400),
+        Sample(2.2, "feed", 0.030, 500),
+        Sample(2.4, "post", 0.040, NO_RESPONSE, "ReadTimeout"),
+    ]
+    lags = [(0.3, 0.001), (2.1, 0.005)]
+    result = report(samples, lags, LoadConfig(vus=2), interval=1.0, seconds=2.0)
+
+    assert result["summary"]["requests"] == 4
+    assert result["summary"]["errors"] == 2
+    assert result["summary"]["rejected"] == 1
+    assert result["summary"]["throughput_rps"] == 2.0
+    assert result["summary"]["error_rate"] == 0.5
+    assert result["error_types"] == {"500": 1, "ReadTimeout": 1}
+    assert set(result["actions"]) == {"feed", "like", "post"}
+    assert result["max_loop_lag_ms"] == pytest.approx(5.0)
+
+    timeline = result["timeline"]
+    assert [row["time"] for row in timeline] == [0.0, 1.0, 2.0]
+    assert [row["requests"] for row in timeline] == [2, 0, 2]
+    assert timeline[0]["throughput_rps"] == 2.0
+    assert timeline[0]["rejected"] == 1
+    assert timeline[2]["errors"] == 2
+    assert timeline[2]["loop_lag_ms"] == pytest.approx(5.0)
+
+
+@pytest.mark.asyncio
+async def test_run_stage(engine: AsyncEngine) -> None:
+    """Testing that the virtual users run the mix against the app without errors"""
+    await generate(engine, DatasetConfig(users=50, tweets=200, follows=2, likes=50))
+    app: FastAPI = create_app(load_config(), Database(engine))
+    config = LoadConfig(
+        vus=5, duration=2.0, ramp_up=0.2, think_time=0.01, users=50, tweets=200
+    )
+
+    result = await run_stage(
+        "http://test",
+        config,
+        mix={"feed": 1, "like": 1, "post": 1},
+        interval=0.5,
+        transport=httpx.ASGITransport(app=app),
+    )
+
+    assert result["vus"] == 5
+    # every VU made at least one request
+    assert result["summary"]["requests"] >= 5
+    assert result["summary"]["errors"] == 0, result["error_types"]
+    assert set(result["actions"]) <= {"feed", "like", "post"}
+    assert len(result["timeline"]) >= 2
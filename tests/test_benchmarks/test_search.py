@@ -0,0 +1,27 @@
+import pytest
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from benchmarks.dataset import DatasetConfig, generate
+from benchmarks.search import QUERIES, run_search_benchmark
+from src.database.engine import Database
+
+
+@pytest.mark.asyncio
+async def test_run_search_benchmark(engine: AsyncEngine) -> None:
+    """Testing that all queries are measured with the deep pages and the baseline"""
+    await generate(engine, DatasetConfig(users=50, tweets=2000, follows=2, likes=50))
+
+    results = await run_search_benchmark(
+        Database(engine), list(QUERIES), repeats=2, pages=2, limit=5, baseline=True
+    )
+
+    meta = results["meta"]
+    assert meta["tweets"] == 2000
+    assert meta["index_size_mb"] > 0
+    assert meta["matches"]["common_word"] > meta["matches"]["two_words"] > 0
+    assert meta["matches"]["no_match"] == 0
+    for name in QUERIES:
+        assert results["results"][name]["requests"] == 2
+        assert f"{name}_ilike" in results["results"]
+    assert "common_word_page_3" in results["results"]
+    assert "no_match_page_3" not in results["results"]
@@ -0,0 +1,23 @@
+from fastapi.encoders import jsonable_encoder
+
+from benchmarks.serializer import make_feed
+from src.api.tweets_router import FEED_TOP_LIKERS
+from src.schemas.schemas import TweetOutSchema
+from src.service.serializers import serialize_tweets
+
+
+def test_make_feed_is_valid() -> None:
+    """Testing that the feed of the benchmark passes the response model"""
+    tweets = make_feed(num_tweets=3, num_images=2, num_likes=20)
+    images_names = {
+        image.id: f"{image.id}.jpg" for tweet in tweets for image in tweet.images or ()
+    }
+    likers = {
+        tweet.id: [(user.id, user.name) for user in tweet.users_like or ()]
+        for tweet in tweets
+    }
+    page = {"result": True, "tweets": serialize_tweets(tweets, images_names, likers)}
+
+    result = jsonable_encoder(TweetOutSchema.model_validate(page))
+    assert [tweet["likes_count"] for tweet in result["tweets"]] == [20, 20, 20]
+    assert all(len(tweet["likes"]) == FEED_TOP_LIKERS for tweet in result["tweets"])
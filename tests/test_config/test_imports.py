@@ -0,0 +1,77 @@
+import os
+import subprocess
+import sys
+from typing import Dict, Tuple
+
+import pytest
+
+# the app module, which imports all the others
+APP_MODULE: str = "src.api.routes"
+# microseconds. The modules of the app, without the libraries
+APP_IMPORT_BUDGET: int = 300_000
+# microseconds. The app with the libraries (FastAPI, SQLAlchemy, pydantic, ...)
+TOTAL_IMPORT_BUDGET: int = 5_000_000
+
+CHECK_MODULES: str = (
+    "import sys; import {module};"
+    " print(','.join(name for name in sys.modules if name.startswith('asyncpg')))"
+)
+
+
+def _import(module: str) -> Tuple[str, Dict[str, Tuple[int, int]]]:
+    """
+    The function imports the module with -X importtime in a clean environment
+    (no ENV and DB_URL variables), so the import fails if it reads the config
+    :return: stdout, and module -> (self, cumulative) import time in microseconds
+    """
+    root: str = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHECK_MODULES.format(module=module)],
+        cwd=root,
+        env={"PATH": os.environ.get("PATH", ""), "PYTHONPATH": root},
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+
+    times: Dict[str, Tuple[int, int]] = dict()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_time, cumulative, name = line[len("import time:") :].split("|")
+        if self_time.strip().isdigit():
+            times[name.strip()] = (int(self_time), int(cumulative))
+    return result.stdout.strip(), times
+
+
+def test_import_has_no_side_effects() -> None:
+    """
+    Testing that the app is imported without the config,
+    and no database driver is loaded, i.e. no engine is created
+    """
+    loaded_drivers, times = _import(APP_MODULE)
+    assert APP_MODULE in times
+    assert loaded_drivers == ""
+
+
+@pytest.mark.skipif(
+    bool(os.environ.get("PYTEST_XDIST_WORKER")),
+    reason="the parallel workers compete for the CPU",
+)
+def test_import_time_budget() -> None:
+    """Testing that importing the app fits the import-time budget"""
+    _, times = _import(APP_MODULE)
+    app_modules: Dict[str, int] = {
+        name: self_time
+        for name, (self_time, _) in times.items()
+        if name.startswith("src.")
+    }
+    slowest: str = ", ".join(
+        f"{name}: {self_time} us"
+        for name, self_time in sorted(app_modules.items(), key=lambda item: -item[1])[
+            :5
+        ]
+    )
+    assert sum(app_modules.values()) <= APP_IMPORT_BUDGET, slowest
+    assert times[APP_MODULE][1] <= TOTAL_IMPORT_BUDGET
@@ -0,0 +1,52 @@
+import json
+import logging
+from queue import SimpleQueue
+
+from src.config.log_config import JsonFormatter, LazyQueueHandler, SamplingFilter
+
+
+def _record(name: str, level: int, msg: str = "message %d", *args) -> logging.LogRecord:
+    """The function creates a log record without a logger"""
+    return logging.LogRecord(name, level, __file__, 1, msg, args or (1,), None)
+
+
+def test_json_formatter() -> None:
+    """Testing that the record with its extra fields is formatted as JSON"""
+    record = _record("routes_logger", logging.INFO)
+    record.duration_ms = 1.5
+
+    result = json.loads(JsonFormatter().format(record))
+    assert result["message"] == "message 1"
+    assert result["level"] == "INFO"
+    assert result["logger"] == "routes_logger"
+    assert result["duration_ms"] == 1.5
+    assert "args" not in result
+
+
+def test_lazy_queue_handler_does_not_format() -> None:
+    """Testing that the message is not formatted on the caller's thread"""
+    queue: "SimpleQueue[logging.LogRecord]" = SimpleQueue()
+    record = _record("routes_logger", logging.INFO)
+
+    LazyQueueHandler(queue).handle(record)
+    assert queue.get_nowait() is record
+    assert record.args == (1,)
+    assert not hasattr(record, "message")
+
+
+def test_sampling_filter() -> None:
+    """Testing that only every n-th DEBUG/INFO record is kept, warnings always"""
+    sampling = SamplingFilter({"query_logger": 3})
+
+    kept = [sampling.filter(_record("query_logger", logging.INFO)) for _ in range(6)]
+    assert kept == [True, False, False, True, False, False]
+    # children are sampled with the parent's rate
+    assert sampling.filter(_record("query_logger.child", logging.DEBUG))
+    assert not sampling.filter(_record("query_logger.child", logging.DEBUG))
+    # other loggers and warnings are not sampled
+    assert all(
+        sampling.filter(_record("routes_logger", logging.INFO)) for _ in range(3)
+    )
+    assert all(
+        sampling.filter(_record("query_logger", logging.WARNING)) for _ in range(3)
+    )
@@ -0,0 +1,98 @@
+import os
+import re
+import signal
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+import httpx
+import pytest
+
+from src.config.config import Server
+from src.server import WORKER_CLASS, cpu_count, gunicorn_options, worker_count
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_worker_count() -> None:
+    """Testing that the workers are sized to the CPUs by default"""
+    assert worker_count(Server()) == cpu_count() >= 1
+    assert worker_count(Server(workers=3)) == 3
+
+
+def test_gunicorn_options() -> None:
+    """Testing that the server config is passed to gunicorn"""
+    options = gunicorn_options(
+        Server(host="127.0.0.1", port=8000, workers=2, max_requests=100)
+    )
+    assert options["bind"] == "127.0.0.1:8000"
+    assert options["workers"] == 2
+    assert options["worker_class"] == WORKER_CLASS
+    assert options["max_requests"] == 100
+    assert options["preload_app"] is True
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="gunicorn runs on Unix")
+def test_server_restarts_workers_and_shuts_down_gracefully(tmp_path: Path) -> None:
+    """
+    Testing that the server restarts a worker after max_requests requests,
+    keeps the metrics of the exited workers, and stops the workers
+    (with the app shutdown) on SIGTERM
+    """
+    port: int = _free_port()
+    env = dict(
+        os.environ,
+        SERVER_HOST="127.0.0.1",
+        SERVER_PORT=str(port),
+        SERVER_WORKERS="1",
+        SERVER_MAX_REQUESTS="2",
+        SERVER_MAX_REQUESTS_JITTER="0",
+        METRICS_TOKEN="metrics_token",
+        PROMETHEUS_MULTIPROC_DIR=str(tmp_path / "prometheus"),
+    )
+    process = subprocess.Popen(
+        [sys.executable, "-m", "src.server"],
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+    )
+    try:
+        deadline: float = time.monotonic() + 30
+        responses: List[httpx.Response] = list()
+        while len(responses) < 5 and time.monotonic() < deadline:
+            try:
+                responses.append(
+                    httpx.get(
+                        f"http://127.0.0.1:{port}/metrics",
+                        headers={"authorization": "Bearer metrics_token"},
+                    )
+                )
+            except httpx.TransportError:
+                # the server or the restarted worker is starting
+                time.sleep(0.1)
+        assert [response.status_code for response in responses] == [200] * 5
+        assert httpx.get(f"http://127.0.0.1:{port}/metrics").status_code == 401
+    finally:
+        process.send_signal(signal.SIGTERM)
+        output, _ = process.communicate(timeout=30)
+
+    assert process.returncode == 0, output
+    # the worker exits after max_requests requests, and gunicorn boots another one
+    assert output.count("Booting worker") >= 2
+    # the last scrape merges the requests of the exited workers
+    count = re.search(
+        r'^http_request_duration_seconds_count\{method="GET",route="/metrics"\} (\S+)$',
+        responses[-1].text,
+        re.MULTILINE,
+    )
+    assert count is not None and float(count.group(1)) == 4
+    # the lifespan of the app ran on shutdown and disposed the engines
+    assert '"message":"Shutdown"' in output
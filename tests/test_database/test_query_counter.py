@@ -0,0 +1,57 @@
+import copy
+
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.database.models import User
+from src.database.query_counter import assert_max_queries, count_queries
+
+
+@pytest.mark.asyncio
+async def test_count_queries(engine: AsyncEngine) -> None:
+    """Testing that the statements, rows and time are counted in nested blocks"""
+    async with engine.connect() as conn:
+        with count_queries() as outer:
+            await conn.execute(text("SELECT 1"))
+            with count_queries() as inner:
+                await conn.execute(text("SELECT generate_series(1, 5)"))
+        await conn.execute(text("SELECT 1"))
+
+    assert (inner.statements, inner.rows) == (1, 5)
+    assert (outer.statements, outer.rows) == (2, 6)
+    assert outer.seconds >= inner.seconds > 0
+
+
+@pytest.mark.asyncio
+async def test_count_queries_after_failed_statement(engine: AsyncEngine) -> None:
+    """Testing that a failed statement leaves nothing on the connection"""
+    async with engine.connect() as conn:
+        info = copy.deepcopy(conn.info)
+        with count_queries() as stats:
+            for _ in range(3):
+                with pytest.raises(DBAPIError):
+                    await conn.execute(text("SELECT 1 / 0"))
+                await conn.rollback()
+            await conn.execute(text("SELECT 1"))
+        assert conn.info == info
+
+    assert stats.statements == 1
+    assert stats.seconds > 0
+
+
+@pytest.mark.asyncio
+async def test_assert_max_queries(engine: AsyncEngine) -> None:
+    """Testing that too many queries and N+1 queries fail the block"""
+    async with engine.connect() as conn:
+        with pytest.raises(AssertionError, match="2 queries, expected at most 1"):
+            with assert_max_queries(1):
+                await conn.execute(text("SELECT 1"))
+                await conn.execute(text("SELECT 2"))
+
+        # a query per item
+        with pytest.raises(AssertionError, match="N\\+1 queries"):
+            with assert_max_queries(10, max_repeats=1):
+                for user_id in range(3):
+                    await conn.execute(select(User).where(User.id == user_id))
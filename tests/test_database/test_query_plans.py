@@ -0,0 +1,232 @@
+import inspect
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+import src.database.queries as q
+from src.database.models import Tweet, User
+
+# Tables with the number of seeded rows. Sequential scans on them are forbidden
+LARGE_TABLES: Dict[str, int] = {
+    "users": 20000,
+    "tweets": 100000,
+    "likes": 200000,
+    "following": 100000,
+    "images": 50000,
+    "tweet_hashtags": 100000,
+    "mentions": 50000,
+}
+# Queries which read the whole table by design
+ALLOWED_SEQ_SCANS: Dict[str, Tuple[str, ...]] = {
+    "count_users": ("users",),
+    "get_all_images_ids": ("images",),
+}
+
+SEED_SQL: Tuple[str, ...] = (
+    "INSERT INTO users (name, api_key)"
+    " SELECT 'user_' || n, 'api_key_' || n FROM generate_series(1, {users}) n",
+    # a tweet a minute, so most of the tweets are older than a day
+    "INSERT INTO tweets (tweet_data, user_id, created_at)"
+    " SELECT 'tweet ' || n, 1 + n % {users}, now() - n * interval '1 minute'"
+    " FROM generate_series(1, {tweets}) n",
+    "INSERT INTO likes (user_id, tweet_id)"
+    " SELECT 1 + n % {users}, 1 + (n * 7919) % {tweets}"
+    " FROM generate_series(1, {likes}) n ON CONFLICT DO NOTHING",
+    "INSERT INTO following (author_id, follower_id)"
+    " SELECT 1 + (n * 31) % {users}, 1 + n % {users}"
+    " FROM generate_series(1, {following}) n"
+    " WHERE (n * 31) % {users} != n % {users} ON CONFLICT DO NOTHING",
+    "INSERT INTO images (tweet_id)"
+    " SELECT CASE WHEN n % 10 = 0 THEN NULL ELSE 1 + n % {tweets} END"
+    " FROM generate_series(1, {images}) n",
+    "INSERT INTO hashtags (name) SELECT 'tag' || n FROM generate_series(1, 1000) n",
+    "INSERT INTO tweet_hashtags (hashtag_id, tweet_id)"
+    " SELECT 1 + n % 1000, 1 + (n * 7) % {tweets}"
+    " FROM generate_series(1, {tweet_hashtags}) n ON CONFLICT DO NOTHING",
+    "INSERT INTO mentions (user_id, tweet_id)"
+    " SELECT 1 + n % {users}, 1 + (n * 13) % {tweets}"
+    " FROM generate_series(1, {mentions}) n ON CONFLICT DO NOTHING",
+    "UPDATE tweets SET likes_count = counts.n, score = counts.n"
+    " FROM (SELECT tweet_id, count(*) AS n FROM likes GROUP BY tweet_id) counts"
+    " WHERE tweets.id = counts.tweet_id",
+    "ANALYZE",
+)
+
+
+@pytest_asyncio.fixture(scope="function")
+async def seeded_session(engine: AsyncEngine) -> Any:
+    """Fixture. Returns a session to the database with the large dataset"""
+    async with engine.begin() as conn:
+        for sql in SEED_SQL:
+            await conn.execute(text(sql.format(**LARGE_TABLES)))
+    Session = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    async with Session() as session:
+        yield session
+
+
+async def _get_user(session: AsyncSession, user_id: int) -> User:
+    user: Optional[User] = await q.get_user_by_id(session, user_id)
+    assert user is not None
+    return user
+
+
+async def _get_tweet(session: AsyncSession, tweet_id: int) -> Tweet:
+    tweet: Optional[Tweet] = await q.get_tweet_by_id(session, tweet_id)
+    assert tweet is not None
+    return tweet
+
+
+async def _like_tweet(session: AsyncSession) -> None:
+    tweet, user = await _get_tweet(session, 10), await _get_user(session, 5)
+    await q.like_tweet(session, tweet, user)
+
+
+async def _unlike_tweet(session: AsyncSession) -> None:
+    tweet, user = await _get_tweet(session, 10), await _get_user(session, 5)
+    await q.unlike_tweet(session, tweet, user)
+
+
+async def _follow_author(session: AsyncSession) -> None:
+    follower, author = await _get_user(session, 3), await _get_user(session, 4)
+    await q.follow_author(session, follower, author)
+
+
+async def _unfollow_author(session: AsyncSession) -> None:
+    follower, author = await _get_user(session, 3), await _get_user(session, 4)
+    await q.unfollow_author(session, follower, author)
+
+
+async def _get_user_tweets(session: AsyncSession) -> None:
+    tweets = await q.get_user_tweets(session, 7, 2)
+    await q.get_user_tweets(session, 7, 2, tweets[-1].id)
+
+
+async def _get_tweet_likers(session: AsyncSession) -> None:
+    likers = await q.get_tweet_likers(session, 10, 2)
+    await q.get_tweet_likers(session, 10, 2, (likers[-1][2], likers[-1][0]))
+
+
+async def _get_hashtag_tweets(session: AsyncSession) -> None:
+    tweets = await q.get_hashtag_tweets(session, "tag42", 10)
+    await q.get_hashtag_tweets(session, "tag42", 10, tweets[-1].id)
+
+
+async def _get_mentions(session: AsyncSession) -> None:
+    tweets = await q.get_mentions(session, 42, 10)
+    await q.get_mentions(session, 42, 10, tweets[-1].id)
+
+
+async def _search_tweets(session: AsyncSession) -> None:
+    found = await q.search_tweets(session, "tweet 4242", 10)
+    tweet, rank, max_id = found[-1]
+    await q.search_tweets(session, "tweet 4242", 10, (rank, tweet.id, max_id))
+
+
+# query name -> the call of the query. The calls are made in this order
+QUERIES: Dict[str, Callable[[AsyncSession], Awaitable[Any]]] = {
+    "count_users": q.count_users,
+    "create_user": lambda s: q.create_user(s, {"api_key": "new", "name": "new"}),
+    "get_user_by_api_key": lambda s: q.get_user_by_api_key(s, "api_key_42"),
+    "get_user_by_id": lambda s: q.get_user_by_id(s, 42),
+    "get_users_ids_by_api_keys": lambda s: q.get_users_ids_by_api_keys(
+        s, ["api_key_1", "api_key_2", "unknown"]
+    ),
+    "add_tweets_entities": lambda s: q.add_tweets_entities(
+        s, [(10, "#tag1 #new_tag @user_42"), (20, "@user_1 @unknown")]
+    ),
+    "add_image": q.add_image,
+    "get_images_by_ids": lambda s: q.get_images_by_ids(s, [10, 20, 30]),
+    "create_tweet": lambda s: q.create_tweet(
+        s, 42, {"tweet_data": "new #tag1 @user_1", "tweet_media_ids": [10, 20]}
+    ),
+    "lock_free_images": lambda s: q.lock_free_images(s, [5, 10, 15, 20]),
+    "attach_images": lambda s: q.attach_images(s, {10: 42, 20: 42}),
+    "get_all_images_ids": q.get_all_images_ids,
+    "get_tweet_by_id": lambda s: q.get_tweet_by_id(s, 42),
+    "get_images_ids_by_tweet_id": lambda s: q.get_images_ids_by_tweet_id(s, 42),
+    "like_tweet": _like_tweet,
+    "unlike_tweet": _unlike_tweet,
+    "follow_author": _follow_author,
+    "unfollow_author": _unfollow_author,
+    "get_user_tweets": _get_user_tweets,
+    "delete_tweet_by_id": lambda s: q.delete_tweet_by_id(s, 42),
+    "get_feed_streams": lambda s: q.get_feed_streams(s, 42, 100),
+    "get_tweets_by_ids": lambda s: q.get_tweets_by_ids(s, [10, 20, 30]),
+    "get_popular_feed": lambda s: q.get_popular_feed(s, 42, 100),
+    "get_top_likers": lambda s: q.get_top_likers(s, list(range(1, 101)), 42, 3),
+    "get_tweet_likers": _get_tweet_likers,
+    "search_tweets": _search_tweets,
+    "get_hashtag_tweets": _get_hashtag_tweets,
+    "get_mentions": _get_mentions,
+    "allocate_tweets_ids": lambda s: q.allocate_tweets_ids(s, 100),
+    "get_tweets_texts": lambda s: q.get_tweets_texts(s, 50000, 5000),
+    "get_backfill_progress": lambda s: q.get_backfill_progress(s, "job"),
+    "save_backfill_progress": lambda s: q.save_backfill_progress(s, "job", 42),
+    # the periodic refresh reads only the recent tweets
+    "refresh_scores": lambda s: q.refresh_scores(s, max_age=24),
+}
+
+
+def _seq_scans(plan: Dict[str, Any]) -> Iterator[str]:
+    """The function yields the tables which are scanned sequentially in the plan"""
+    if plan.get("Node Type") == "Seq Scan":
+        yield plan["Relation Name"]
+    for subplan in plan.get("Plans", list()):
+        yield from _seq_scans(subplan)
+
+
+def test_all_queries_are_checked() -> None:
+    """Testing that every query from queries.py has its plan checked"""
+    query_names = {
+        name
+        for name, func in inspect.getmembers(q, inspect.iscoroutinefunction)
+        if func.__module__ == q.__name__ and not name.startswith("_")
+    }
+    assert query_names == set(QUERIES)
+
+
+@pytest.mark.asyncio
+async def test_queries_do_not_seq_scan_large_tables(
+    engine: AsyncEngine, seeded_session: AsyncSession
+) -> None:
+    """Testing that no query scans a large table sequentially"""
+    # capture every statement sent to the database
+    statements: List[Tuple[str, Any]] = list()
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        # executemany runs the same plan for every set of parameters
+        statements.append((statement, parameters[0] if many else parameters))
+
+    errors: List[str] = list()
+    for name, query in QUERIES.items():
+        statements.clear()
+        event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            await query(seeded_session)
+        finally:
+            event.remove(
+                engine.sync_engine, "before_cursor_execute", before_cursor_execute
+            )
+
+        async with engine.connect() as conn:
+            for statement, parameters in statements:
+                if (
+                    not statement.lstrip()
+                    .upper()
+                    .startswith(("SELECT", "INSERT", "UPDATE", "DELETE"))
+                ):
+                    continue
+                explain = await conn.exec_driver_sql(
+                    "EXPLAIN (FORMAT JSON) " + statement, parameters
+                )
+                plan: Dict[str, Any] = explain.scalar_one()[0]["Plan"]
+                for table in _seq_scans(plan):
+                    if table in LARGE_TABLES and table not in ALLOWED_SEQ_SCANS.get(
+                        name, ()
+                    ):
+                        errors.append(f"{name}: Seq Scan on {table}\n{statement}")
+
+    assert not errors, "\n\n".join(errors)
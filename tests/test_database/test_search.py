@@ -0,0 +1,111 @@
+from typing import AsyncGenerator, List
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, inspect, update
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+import src.database.queries as q
+from src.database.models import Base, Tweet
+
+
+@pytest_asyncio.fixture(scope="function")
+async def sqlite_session() -> AsyncGenerator[AsyncSession, None]:
+    """Fixture. Returns a session to the in-memory SQLite database"""
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        yield session
+    await engine.dispose()
+
+
+def test_fts5_query() -> None:
+    """Testing that the FTS5 syntax of the search words is not interpreted"""
+    assert q.fts5_query(' fast  "cache" OR-x* ') == '"fast" """cache""" "OR-x*"'
+
+
+@pytest.mark.asyncio
+async def test_search_tweets_sqlite(sqlite_session: AsyncSession) -> None:
+    """Testing the FTS5 fallback: the ranking, the pages and the sync of the index"""
+    user = await q.create_user(sqlite_session, {"api_key": "key", "name": "test"})
+    texts: List[str] = [
+        "fast cache",
+        "fast fast fast cache",
+        "slow database",
+        'fast "quoted" cache',
+    ]
+    tweets_ids: List[int] = [
+        await q.create_tweet(
+            sqlite_session, user.id, {"tweet_data": text, "tweet_media_ids": None}
+        )
+        for text in texts
+    ]
+
+    statements: List[str] = list()
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        statements.append(statement)
+
+    sync_engine = sqlite_session.get_bind()
+    event.listen(sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        found = await q.search_tweets(sqlite_session, "fast cache", 10)
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", before_cursor_execute)
+    # the FTS5 table is queried, not the tsvector of Postgres
+    assert any("tweets_fts MATCH" in statement for statement in statements)
+    assert not any("search_vector" in statement for statement in statements)
+    assert [tweet.id for tweet, _, _ in found][0] == tweets_ids[1]
+    assert {tweet.id for tweet, _, _ in found} == {
+        tweets_ids[0],
+        tweets_ids[1],
+        tweets_ids[3],
+    }
+    ranks: List[float] = [rank for _, rank, _ in found]
+    assert ranks == sorted(ranks, reverse=True)
+
+    first_page = await q.search_tweets(sqlite_session, "fast cache", 2)
+    last_tweet, last_rank, max_id = first_page[-1]
+    assert max_id == tweets_ids[3]
+    second_page = await q.search_tweets(
+        sqlite_session, "fast cache", 2, (last_rank, last_tweet.id, max_id)
+    )
+    assert [tweet.id for tweet, _, _ in first_page + second_page] == [
+        tweet.id for tweet, _, _ in found
+    ]
+
+    # only the columns of the requested fields are loaded
+    sqlite_session.expunge_all()
+    projected = await q.search_tweets(sqlite_session, "fast cache", 10, fields={"id"})
+    assert [tweet.id for tweet, _, _ in projected] == [
+        tweet.id for tweet, _, _ in found
+    ]
+    assert all("tweet_data" in inspect(tweet).unloaded for tweet, _, _ in projected)
+
+    # the newest matches are ranked first, the pages go on with the older ones
+    found = await q.search_tweets(sqlite_session, "fast cache", 10, candidates=2)
+    assert {tweet.id for tweet, _, _ in found[:2]} == {tweets_ids[1], tweets_ids[3]}
+    assert [tweet.id for tweet, _, _ in found[2:]] == [tweets_ids[0]]
+    first_page = await q.search_tweets(sqlite_session, "fast cache", 2, candidates=2)
+    last_tweet, last_rank, max_id = first_page[-1]
+    second_page = await q.search_tweets(
+        sqlite_session,
+        "fast cache",
+        2,
+        (last_rank, last_tweet.id, max_id),
+        candidates=2,
+    )
+    assert [tweet.id for tweet, _, _ in first_page + second_page] == [
+        tweet.id for tweet, _, _ in found
+    ]
+    assert second_page[0][2] == tweets_ids[0]
+
+    # the triggers keep the FTS5 table in sync with the tweets
+    await sqlite_session.execute(
+        update(Tweet).where(Tweet.id == tweets_ids[2]).values(tweet_data="fast cache")
+    )
+    assert len(await q.search_tweets(sqlite_session, "database", 10)) == 0
+    assert len(await q.search_tweets(sqlite_session, "fast cache", 10)) == 4
+    assert await q.search_tweets(sqlite_session, '"', 10) == []
+    assert await q.search_tweets(sqlite_session, "  ", 10) == []
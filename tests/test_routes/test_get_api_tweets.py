@@ -1,8 +1,14 @@
+import json
+import re
 from typing import Any, Dict, List, Tuple
 
+import msgpack
 import pytest
 from httpx import AsyncClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
 
+from src.api import tweets_router
 from src.service.images import delete_images_by_ids
 
 BASE_ROUTE: str = "/api/tweets"
@@ -97,7 +103,7 @@ async def test_get_list_of_tweets_with_images(
         response = await client.post(
             "/api/medias",
             files={
-                "image": (
+                "file": (
                     "test.jpg",
                     open("tests/test_routes/images/test.jpg", "rb"),
                     "multipart/form-data",
@@ -160,3 +166,269 @@ async def test_get_info_about_user_with_invalid_api_key(client: AsyncClient) ->
     # try getting info about user
     response = await client.get(BASE_ROUTE, headers={"api-key": invalid_api_key})
     assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_get_chronological_list_of_tweets(
+    client: AsyncClient, user_data: Tuple[int, str], other_user_data: Tuple[int, str]
+) -> None:
+    """Testing getting a tweet feed in chronological order"""
+    user_id, api_key = user_data
+    other_user_id, other_api_key = other_user_data
+
+    # 1) Subscribe users to each other
+    response = await client.post(
+        f"/api/users/{other_user_id}/follow", headers={"api-key": api_key}
+    )
+    assert response.status_code == 200
+    response = await client.post(
+        f"/api/users/{user_id}/follow", headers={"api-key": other_api_key}
+    )
+    assert response.status_code == 200
+
+    # 2) Create tweets from both users in turn
+    tweets_ids: List[int] = list()
+    for num in range(6):
+        response = await client.post(
+            "/api/tweets",
+            json={"tweet_data": f"tweet {num}"},
+            headers={"api-key": api_key if num % 2 else other_api_key},
+        )
+        assert response.status_code == 201
+        tweets_ids.append(response.json()["tweet_id"])
+
+    # 3) Like the oldest tweet - it must not affect the order
+    response = await client.post(
+        f"/api/tweets/{tweets_ids[0]}/likes", headers={"api-key": api_key}
+    )
+    assert response.status_code == 200
+
+    # 4) get the feed of the other user - only tweets of the user, newest first
+    response = await client.get(
+        BASE_ROUTE, params={"mode": "chronological"}, headers={"api-key": other_api_key}
+    )
+    assert response.status_code == 200
+    response_json: Dict[str, Any] = response.json()
+    assert [tweet["id"] for tweet in response_json["tweets"]] == tweets_ids[::-2]
+    assert all(tweet["author"]["id"] == user_id for tweet in response_json["tweets"])
+
+    # 5) get the page of the feed
+    response = await client.get(
+        BASE_ROUTE,
+        params={"mode": "chronological", "limit": 2},
+        headers={"api-key": api_key},
+    )
+    assert response.status_code == 200
+    response_json = response.json()
+    assert [tweet["id"] for tweet in response_json["tweets"]] == [
+        tweets_ids[4],
+        tweets_ids[2],
+    ]
+
+
+@pytest.mark.asyncio
+async def test_get_list_of_tweets_in_msgpack(
+    client: AsyncClient,
+    user_data: Tuple[int, str],
+    other_user_data: Tuple[int, str],
+    tweet_id_with_like: int,
+) -> None:
+    """Testing that the feed is returned in MessagePack if the client accepts it"""
+    user_id, _ = user_data
+    _, other_api_key = other_user_data
+    response = await client.post(
+        f"/api/users/{user_id}/follow", headers={"api-key": other_api_key}
+    )
+    assert response.status_code == 200
+
+    response = await client.get(BASE_ROUTE, headers={"api-key": other_api_key})
+    assert response.status_code == 200
+    assert response.headers["vary"] == "Accept"
+    response_json: Dict[str, Any] = response.json()
+    # the liked tweet with the images
+    assert [tweet["id"] for tweet in response_json["tweets"]] == [tweet_id_with_like]
+    assert len(response_json["tweets"][0]["attachments"]) == 3
+
+    response = await client.get(
+        BASE_ROUTE,
+        headers={"api-key": other_api_key, "accept": "application/msgpack"},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/msgpack"
+    assert response.headers["vary"] == "Accept"
+    # the same data, but smaller
+    assert msgpack.unpackb(response.content) == response_json
+    assert len(response.content) < len(json.dumps(response_json))
+
+
+@pytest.mark.asyncio
+async def test_get_list_of_tweets_with_fields(
+    client: AsyncClient,
+    session_engine: AsyncEngine,
+    user_data: Tuple[int, str],
+    other_user_data: Tuple[int, str],
+    tweet_id_with_like: int,
+) -> None:
+    """Testing that the feed loads and returns only the requested fields"""
+    user_id, _ = user_data
+    _, other_api_key = other_user_data
+    response = await client.post(
+        f"/api/users/{user_id}/follow", headers={"api-key": other_api_key}
+    )
+    assert response.status_code == 200
+
+    statements: List[str] = list()
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        statements.append(statement)
+
+    event.listen(
+        session_engine.sync_engine, "before_cursor_execute", before_cursor_execute
+    )
+    try:
+        response = await client.get(
+            BASE_ROUTE,
+            params={"fields": "id,content,author,likes_count"},
+            headers={"api-key": other_api_key},
+        )
+    finally:
+        event.remove(
+            session_engine.sync_engine, "before_cursor_execute", before_cursor_execute
+        )
+    assert response.status_code == 200
+    assert response.json()["tweets"] == [
+        {
+            "id": tweet_id_with_like,
+            "content": "test_tweet_text",
+            "author": {"id": user_id, "name": "test"},
+            "likes_count": 1,
+        }
+    ]
+    # the likes and the images are not read
+    assert not [
+        statement
+        for statement in statements
+        if re.search(r"\b(likes|images)\b", statement)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_get_list_of_tweets_with_attachments_field(
+    client: AsyncClient,
+    session_engine: AsyncEngine,
+    user_data: Tuple[int, str],
+    other_user_data: Tuple[int, str],
+    images_ids: List[int],
+    tweet_id_with_like: int,
+) -> None:
+    """Testing that the projection with the attachments returns the images"""
+    user_id, _ = user_data
+    _, other_api_key = other_user_data
+    response = await client.post(
+        f"/api/users/{user_id}/follow", headers={"api-key": other_api_key}
+    )
+    assert response.status_code == 200
+
+    statements: List[str] = list()
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        statements.append(statement)
+
+    event.listen(
+        session_engine.sync_engine, "before_cursor_execute", before_cursor_execute
+    )
+    try:
+        response = await client.get(
+            BASE_ROUTE,
+            params={"fields": "id,attachments"},
+            headers={"api-key": other_api_key},
+        )
+    finally:
+        event.remove(
+            session_engine.sync_engine, "before_cursor_execute", before_cursor_execute
+        )
+    assert response.status_code == 200
+    assert response.json()["tweets"] == [
+        {
+            "id": tweet_id_with_like,
+            "attachments": [
+                f"client/static/images/{image_id}.jpg" for image_id in images_ids
+            ],
+        }
+    ]
+    # the likes are not read
+    assert not [
+        statement for statement in statements if re.search(r"\blikes\b", statement)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_get_list_of_tweets_with_unknown_fields(
+    client: AsyncClient, user_data: Tuple[int, str]
+) -> None:
+    """Negative test of getting the feed with unknown fields"""
+    _, api_key = user_data
+
+    response = await client.get(
+        BASE_ROUTE, params={"fields": "id,api_key"}, headers={"api-key": api_key}
+    )
+    assert response.status_code == 422
+    assert response.json()["result"] is False
+
+
+@pytest.mark.asyncio
+async def test_errors_in_msgpack(
+    client: AsyncClient, user_data: Tuple[int, str]
+) -> None:
+    """Testing that the errors are returned in MessagePack if the client accepts it"""
+    _, api_key = user_data
+    accept = {"accept": "application/msgpack"}
+
+    responses = (
+        await client.get(BASE_ROUTE, headers={"api-key": "invalid_api_key", **accept}),
+        await client.get(
+            BASE_ROUTE, params={"limit": 0}, headers={"api-key": api_key, **accept}
+        ),
+        await client.get("/api/unknown", headers={"api-key": api_key, **accept}),
+    )
+    assert [response.status_code for response in responses] == [401, 422, 404]
+    for response in responses:
+        assert response.headers["content-type"] == "application/msgpack"
+        assert response.headers["vary"] == "Accept"
+    assert msgpack.unpackb(responses[0].content)["result"] is False
+    assert msgpack.unpackb(responses[1].content)["detail"][0]["loc"] == [
+        "query",
+        "limit",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_get_list_of_tweets_top_likers(
+    client: AsyncClient,
+    monkeypatch,
+    user_data: Tuple[int, str],
+    other_user_data: Tuple[int, str],
+    tweet_id_without_img: int,
+) -> None:
+    """Testing that the feed shows likes_count and the followed likers first"""
+    monkeypatch.setattr(tweets_router, "FEED_TOP_LIKERS", 1)
+    user_id, api_key = user_data
+    _, other_api_key = other_user_data
+    response = await client.post(
+        f"/api/users/{user_id}/follow", headers={"api-key": other_api_key}
+    )
+    assert response.status_code == 200
+
+    # the author likes the tweet first, then the other user
+    for key in (api_key, other_api_key):
+        response = await client.post(
+            f"/api/tweets/{tweet_id_without_img}/likes", headers={"api-key": key}
+        )
+        assert response.status_code == 200
+
+    response = await client.get(BASE_ROUTE, headers={"api-key": other_api_key})
+    assert response.status_code == 200
+    tweet_json: Dict[str, Any] = response.json()["tweets"][0]
+    assert tweet_json["likes_count"] == 2
+    # the author is followed by the viewer, so they go before the latest liker
+    assert tweet_json["likes"] == [{"user_id": user_id, "name": "test"}]
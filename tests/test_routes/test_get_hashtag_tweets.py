@@ -0,0 +1,109 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+import pytest
+from httpx import AsyncClient
+
+from tests.test_routes.test_search_tweets import _post_tweets
+
+BASE_ROUTE: str = "/api/hashtags/{hashtag}/tweets"
+
+
+@pytest.mark.asyncio
+async def test_get_hashtag_tweets(
+    client: AsyncClient, user_data: Tuple[int, str]
+) -> None:
+    """Testing that the tweets are found by the hashtag in any case, the newest first"""
+    user_id, api_key = user_data
+    first, _, second, _ = await _post_tweets(
+        client,
+        api_key,
+        [
+            "#Release is out",
+            "no hashtags, see mail@release.com",
+            "the #release #notes and #release again",
+            "#released",
+        ],
+    )
+
+    for hashtag in ("release", "RELEASE", "%23Release"):
+        response = await client.get(
+            BASE_ROUTE.format(hashtag=hashtag), headers={"api-key": api_key}
+        )
+        assert response.status_code == 200
+        response_json: Dict[str, Any] = response.json()
+        assert response_json["result"] is True
+        assert response_json["next_cursor"] is None
+        assert [tweet["id"] for tweet in response_json["tweets"]] == [second, first]
+        assert response_json["tweets"][1]["content"] == "#Release is out"
+        assert response_json["tweets"][1]["author"]["id"] == user_id
+
+
+@pytest.mark.asyncio
+async def test_get_hashtag_tweets_pages(
+    client: AsyncClient, user_data: Tuple[int, str]
+) -> None:
+    """Testing listing the tweets of the hashtag page by page"""
+    _, api_key = user_data
+    tweets_ids: List[int] = await _post_tweets(
+        client, api_key, [f"#coffee number {num}" for num in range(5)]
+    )
+
+    found: List[int] = list()
+    cursor: Optional[str] = None
+    for page in range(4):
+        if page == 1:
+            # the tweets posted after the first page do not shift the pages
+            await _post_tweets(client, api_key, ["#coffee again"])
+        params: Dict[str, Any] = {"limit": 2, "fields": "id"}
+        if cursor is not None:
+            params["cursor"] = cursor
+        response = await client.get(
+            BASE_ROUTE.format(hashtag="coffee"),
+            params=params,
+            headers={"api-key": api_key},
+        )
+        assert response.status_code == 200
+        found.extend(tweet["id"] for tweet in response.json()["tweets"])
+        cursor = response.json()["next_cursor"]
+        if cursor is None:
+            break
+
+    assert cursor is None
+    assert found == sorted(tweets_ids, reverse=True)
+
+
+@pytest.mark.asyncio
+async def test_get_hashtag_tweets_after_delete(
+    client: AsyncClient, user_data: Tuple[int, str]
+) -> None:
+    """Testing that the deleted tweet is removed from the hashtag"""
+    _, api_key = user_data
+    (tweet_id,) = await _post_tweets(client, api_key, ["#gone soon"])
+
+    response = await client.delete(
+        f"/api/tweets/{tweet_id}", headers={"api-key": api_key}
+    )
+    assert response.status_code == 200
+    response = await client.get(
+        BASE_ROUTE.format(hashtag="gone"), headers={"api-key": api_key}
+    )
+    assert response.status_code == 200
+    assert response.json()["tweets"] == []
+
+
+@pytest.mark.parametrize("hashtag", ("unknown", "x" * 102))
+@pytest.mark.asyncio
+async def test_get_hashtag_tweets_unknown(
+    client: AsyncClient, user_data: Tuple[int, str], hashtag: str
+) -> None:
+    """Testing the hashtag without tweets and the too long hashtag"""
+    _, api_key = user_data
+
+    response = await client.get(
+        BASE_ROUTE.format(hashtag=hashtag), headers={"api-key": api_key}
+    )
+    if len(hashtag) > 101:
+        assert response.status_code == 422
+    else:
+        assert response.status_code == 200
+        assert response.json()["tweets"] == []
@@ -0,0 +1,116 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from src.database import queries as q
+from tests.test_routes.test_search_tweets import _post_tweets
+
+BASE_ROUTE: str = "/api/users/me/mentions"
+
+
+@pytest_asyncio.fixture(scope="function")
+async def mentioned_api_key(
+    client: AsyncClient, session_factory: async_sessionmaker
+) -> str:
+    """Fixture. Returns api_key of the user with the name alice"""
+    async with session_factory() as session:
+        await q.create_user(session, {"api_key": "alice_api_key", "name": "alice"})
+    return "alice_api_key"
+
+
+@pytest.mark.asyncio
+async def test_get_mentions(
+    client: AsyncClient, mentioned_api_key: str, user_data: Tuple[int, str]
+) -> None:
+    """Testing that the tweets mentioning the user are found, the newest first"""
+    user_id, api_key = user_data
+    first, _, _, second = await _post_tweets(
+        client,
+        api_key,
+        [
+            "hi @alice",
+            "hi @Alice, the names are case-sensitive",
+            "write to alice@example.com",
+            "@alice @alice and @nobody",
+        ],
+    )
+
+    response = await client.get(BASE_ROUTE, headers={"api-key": mentioned_api_key})
+    assert response.status_code == 200
+    response_json: Dict[str, Any] = response.json()
+    assert response_json["result"] is True
+    assert response_json["next_cursor"] is None
+    assert [tweet["id"] for tweet in response_json["tweets"]] == [second, first]
+    assert response_json["tweets"][1]["author"]["id"] == user_id
+
+    # the author is not mentioned
+    response = await client.get(BASE_ROUTE, headers={"api-key": api_key})
+    assert response.status_code == 200
+    assert response.json()["tweets"] == []
+
+
+@pytest.mark.asyncio
+async def test_get_mentions_with_ambiguous_name(
+    client: AsyncClient,
+    user_data: Tuple[int, str],
+    other_user_data: Tuple[int, str],
+    mentioned_api_key: str,
+) -> None:
+    """Testing that a name of several users does not mention any of them"""
+    _, api_key = user_data
+    _, other_api_key = other_user_data
+    # both users are named "test"
+    (tweet_id,) = await _post_tweets(client, api_key, ["hi @test and @alice"])
+
+    for user_api_key in (api_key, other_api_key):
+        response = await client.get(BASE_ROUTE, headers={"api-key": user_api_key})
+        assert response.status_code == 200
+        assert response.json()["tweets"] == []
+    # the unique name in the same tweet is mentioned
+    response = await client.get(BASE_ROUTE, headers={"api-key": mentioned_api_key})
+    assert [tweet["id"] for tweet in response.json()["tweets"]] == [tweet_id]
+
+
+@pytest.mark.asyncio
+async def test_get_mentions_pages(
+    client: AsyncClient, mentioned_api_key: str, user_data: Tuple[int, str]
+) -> None:
+    """Testing listing the mentions page by page"""
+    _, api_key = user_data
+    tweets_ids: List[int] = await _post_tweets(
+        client, api_key, [f"@alice number {num}" for num in range(5)]
+    )
+
+    found: List[int] = list()
+    cursor: Optional[str] = None
+    for _ in range(4):
+        params: Dict[str, Any] = {"limit": 2, "fields": "id"}
+        if cursor is not None:
+            params["cursor"] = cursor
+        response = await client.get(
+            BASE_ROUTE, params=params, headers={"api-key": mentioned_api_key}
+        )
+        assert response.status_code == 200
+        found.extend(tweet["id"] for tweet in response.json()["tweets"])
+        cursor = response.json()["next_cursor"]
+        if cursor is None:
+            break
+
+    assert cursor is None
+    assert found == sorted(tweets_ids, reverse=True)
+
+
+@pytest.mark.asyncio
+async def test_get_mentions_with_invalid_cursor(
+    client: AsyncClient, user_data: Tuple[int, str]
+) -> None:
+    """Negative test of the mentions with an invalid cursor"""
+    _, api_key = user_data
+
+    response = await client.get(
+        BASE_ROUTE, params={"cursor": "invalid"}, headers={"api-key": api_key}
+    )
+    assert response.status_code == 422
@@ -0,0 +1,72 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+import pytest
+from httpx import AsyncClient
+
+BASE_ROUTE: str = "/api/tweets/{tweet_id}/likes"
+
+
+@pytest.mark.asyncio
+async def test_get_tweet_likes_pages(
+    client: AsyncClient,
+    user_data: Tuple[int, str],
+    other_user_data: Tuple[int, str],
+    tweet_id_without_img: int,
+) -> None:
+    """Testing listing the likers of the tweet page by page, the latest first"""
+    user_id, api_key = user_data
+    other_user_id, other_api_key = other_user_data
+    route: str = BASE_ROUTE.format(tweet_id=tweet_id_without_img)
+    for key in (api_key, other_api_key):
+        response = await client.post(route, headers={"api-key": key})
+        assert response.status_code == 200
+
+    likes: List[Dict[str, Any]] = list()
+    cursor: Optional[str] = None
+    for _ in range(3):
+        params: Dict[str, Any] = {"limit": 1}
+        if cursor is not None:
+            params["cursor"] = cursor
+        response = await client.get(route, params=params, headers={"api-key": api_key})
+        assert response.status_code == 200
+        response_json: Dict[str, Any] = response.json()
+        assert response_json["result"] is True
+        likes.extend(response_json["likes"])
+        cursor = response_json["next_cursor"]
+        if cursor is None:
+            break
+
+    assert cursor is None
+    assert likes == [
+        {"user_id": other_user_id, "name": "test"},
+        {"user_id": user_id, "name": "test"},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_get_tweet_likes_with_invalid_cursor(
+    client: AsyncClient, user_data: Tuple[int, str], tweet_id_without_img: int
+) -> None:
+    """Negative test of listing the likers with an invalid cursor"""
+    _, api_key = user_data
+
+    response = await client.get(
+        BASE_ROUTE.format(tweet_id=tweet_id_without_img),
+        params={"cursor": "invalid"},
+        headers={"api-key": api_key},
+    )
+    assert response.status_code == 422
+    assert response.json()["result"] is False
+
+
+@pytest.mark.asyncio
+async def test_get_likes_of_nonexistent_tweet(
+    client: AsyncClient, user_data: Tuple[int, str]
+) -> None:
+    """Negative test of listing the likers of a nonexistent tweet"""
+    _, api_key = user_data
+
+    response = await client.get(
+        BASE_ROUTE.format(tweet_id=100000), headers={"api-key": api_key}
+    )
+    assert response.status_code == 404
@@ -1,5 +1,6 @@
 from typing import Any, Dict, Tuple
 
+import msgpack
 import pytest
 from httpx import AsyncClient
 
@@ -150,3 +151,40 @@ async def test_get_info_about_other_user_with_following_and_followers(
     assert len(response_json["following"]) == 1
     assert response_json["following"][0]["id"] == user_id
     assert response_json["followers"][0]["id"] == user_id
+
+
+@pytest.mark.asyncio
+async def test_get_info_about_user_in_msgpack(
+    client: AsyncClient, user_data: Tuple[int, str]
+) -> None:
+    """Testing getting info about user in MessagePack"""
+    user_id, _ = user_data
+
+    response = await client.get(
+        BASE_ROUTE.format(user_id=user_id),
+        headers={"accept": "application/msgpack, application/json;q=0.9"},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/msgpack"
+    user_dict: Dict[str, Any] = msgpack.unpackb(response.content)["user"]
+    assert user_dict["id"] == user_id
+    assert "api_key" not in user_dict
+
+
+@pytest.mark.asyncio
+async def test_get_info_about_user_with_fields(
+    client: AsyncClient, user_data: Tuple[int, str]
+) -> None:
+    """Testing getting only the requested fields of the user"""
+    user_id, _ = user_data
+
+    response = await client.get(
+        BASE_ROUTE.format(user_id=user_id), params={"fields": "id,following"}
+    )
+    assert response.status_code == 200
+    assert response.json() == {"result": True, "user": {"id": user_id, "following": []}}
+
+    response = await client.get(
+        BASE_ROUTE.format(user_id=user_id), params={"fields": "api_key"}
+    )
+    assert response.status_code == 422
@@ -0,0 +1,105 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+import pytest
+from httpx import AsyncClient
+
+from tests.test_routes.test_search_tweets import _post_tweets
+
+BASE_ROUTE: str = "/api/users/{user_id}/tweets"
+
+
+@pytest.mark.asyncio
+async def test_get_user_tweets(
+    client: AsyncClient,
+    user_data: Tuple[int, str],
+    other_user_data: Tuple[int, str],
+) -> None:
+    """Testing that only the tweets of the user are listed, the newest first"""
+    user_id, api_key = user_data
+    other_user_id, other_api_key = other_user_data
+    first, second = await _post_tweets(client, api_key, ["first", "second"])
+    await _post_tweets(client, other_api_key, ["other"])
+
+    # any user can read the tweets
+    response = await client.get(
+        BASE_ROUTE.format(user_id=user_id), headers={"api-key": other_api_key}
+    )
+    assert response.status_code == 200
+    response_json: Dict[str, Any] = response.json()
+    assert response_json["result"] is True
+    assert response_json["next_cursor"] is None
+    assert [tweet["id"] for tweet in response_json["tweets"]] == [second, first]
+    assert response_json["tweets"][0]["content"] == "second"
+    assert response_json["tweets"][0]["author"]["id"] == user_id
+
+
+@pytest.mark.asyncio
+async def test_get_user_tweets_pages(
+    client: AsyncClient, user_data: Tuple[int, str]
+) -> None:
+    """Testing listing the tweets of the user page by page"""
+    user_id, api_key = user_data
+    tweets_ids: List[int] = await _post_tweets(
+        client, api_key, [f"tweet number {num}" for num in range(5)]
+    )
+
+    found: List[int] = list()
+    cursor: Optional[str] = None
+    for page in range(4):
+        if page == 1:
+            # the tweets posted after the first page do not shift the pages
+            await _post_tweets(client, api_key, ["new tweet"])
+        params: Dict[str, Any] = {"limit": 2, "fields": "id"}
+        if cursor is not None:
+            params["cursor"] = cursor
+        response = await client.get(
+            BASE_ROUTE.format(user_id=user_id),
+            params=params,
+            headers={"api-key": api_key},
+        )
+        assert response.status_code == 200
+        found.extend(tweet["id"] for tweet in response.json()["tweets"])
+        cursor = response.json()["next_cursor"]
+        if cursor is None:
+            break
+
+    assert cursor is None
+    assert found == sorted(tweets_ids, reverse=True)
+
+
+@pytest.mark.asyncio
+async def test_get_user_tweets_without_tweets(
+    client: AsyncClient,
+    user_data: Tuple[int, str],
+    other_user_data: Tuple[int, str],
+) -> None:
+    """Testing the user without tweets"""
+    _, api_key = user_data
+    other_user_id, _ = other_user_data
+
+    response = await client.get(
+        BASE_ROUTE.format(user_id=other_user_id), headers={"api-key": api_key}
+    )
+    assert response.status_code == 200
+    assert response.json()["tweets"] == []
+
+
+@pytest.mark.parametrize(
+    "user_id, params, status_code",
+    ((100, {}, 404), (1, {"cursor": "invalid"}, 422), (1, {"limit": 0}, 422)),
+)
+@pytest.mark.asyncio
+async def test_get_user_tweets_negative(
+    client: AsyncClient,
+    user_data: Tuple[int, str],
+    user_id: int,
+    params: Dict[str, Any],
+    status_code: int,
+) -> None:
+    """Negative test of the tweets of a missing user, with invalid params"""
+    _, api_key = user_data
+
+    response = await client.get(
+        BASE_ROUTE.format(user_id=user_id), params=params, headers={"api-key": api_key}
+    )
+    assert response.status_code == status_code
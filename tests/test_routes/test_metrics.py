@@ -0,0 +1,75 @@
+import re
+from dataclasses import replace
+from typing import Dict, Tuple
+
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient
+
+from src.config.config import Metrics
+
+METRICS_TOKEN: str = "metrics_token"
+
+
+@pytest.fixture(scope="function")
+def metrics_headers(test_app: FastAPI) -> Dict[str, str]:
+    """Fixture. Configures the token of the metrics, returns the scrape headers"""
+    test_app.state.config = replace(
+        test_app.state.config, metrics=Metrics(token=METRICS_TOKEN)
+    )
+    return {"authorization": f"Bearer {METRICS_TOKEN}"}
+
+
+@pytest.mark.asyncio
+async def test_metrics(
+    client: AsyncClient,
+    metrics_headers: Dict[str, str],
+    user_data: Tuple[int, str],
+    tweet_id_without_img: int,
+) -> None:
+    """Testing that the metrics are exposed by route template"""
+    _, api_key = user_data
+    response = await client.get(
+        f"/api/tweets/{tweet_id_without_img}/likes", headers={"api-key": api_key}
+    )
+    assert response.status_code == 200
+    response = await client.get("/api/not_exists")
+    assert response.status_code == 404
+    response = await client.request("BREW", "/api/not_exists")
+    assert response.status_code == 404
+
+    response = await client.get("/metrics", headers=metrics_headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    metrics: str = response.text
+
+    count = re.search(
+        r'^http_request_duration_seconds_count\{method="GET",'
+        r'route="/api/tweets/\{tweet_id\}/likes"\} (\S+)$',
+        metrics,
+        re.MULTILINE,
+    )
+    assert count is not None and float(count.group(1)) >= 1
+    assert 'route="unmatched"' in metrics
+    # the unknown methods do not add labels
+    assert 'method="other",route="unmatched"' in metrics
+    assert "BREW" not in metrics
+    # the routes are bound in advance
+    assert 'method="DELETE",route="/api/tweets/{tweet_id}"' in metrics
+    # the scrape itself is in flight
+    assert re.search(r"^http_requests_in_flight 1\.0$", metrics, re.MULTILINE)
+    assert 'db_pool_checked_out_connections{pool="primary"}' in metrics
+    assert 'db_pool_overflow_connections{pool="primary"}' in metrics
+    for name in ("image_names_cache_lookups", "image_upload_bytes", "images_deleted"):
+        assert f"{name}_total" in metrics
+
+
+@pytest.mark.asyncio
+async def test_metrics_require_token(
+    client: AsyncClient, metrics_headers: Dict[str, str]
+) -> None:
+    """Negative test of scraping the metrics without the token"""
+    for headers in (dict(), {"authorization": "Bearer wrong_token"}):
+        response = await client.get("/metrics", headers=headers)
+        assert response.status_code == 401
+        assert response.headers["www-authenticate"] == "Bearer"
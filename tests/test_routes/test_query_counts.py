@@ -0,0 +1,88 @@
+from typing import List, Tuple
+
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from src.database import queries as q
+from src.database.models import User
+from src.database.query_counter import assert_max_queries
+
+NUM_AUTHORS: int = 6
+NUM_TWEETS: int = 3
+
+
+@pytest_asyncio.fixture(scope="function")
+async def feed_data(
+    session_factory: async_sessionmaker,
+    user_data: Tuple[int, str],
+    other_user_data: Tuple[int, str],
+) -> List[int]:
+    """
+    Fixture. The user follows several authors with several liked tweets.
+    Returns ids of the tweets
+    """
+    user_id, _ = user_data
+    other_user_id, _ = other_user_data
+    tweets_ids: List[int] = list()
+    async with session_factory() as session:
+        user = await q.get_user_by_id(session, user_id)
+        other_user = await q.get_user_by_id(session, other_user_id)
+        assert user is not None and other_user is not None
+        # both users are named "test", an ambiguous name is not mentioned
+        other_user.name = "other_test"
+        for num in range(NUM_AUTHORS):
+            author: User = await q.create_user(
+                session, {"api_key": f"author_{num}", "name": f"author_{num}"}
+            )
+            await q.follow_author(session, user, author)
+            await q.follow_author(session, other_user, author)
+            for _ in range(NUM_TWEETS):
+                tweet_id: int = await q.create_tweet(
+                    session,
+                    author.id,
+                    {"tweet_data": "tweet #tag @test", "tweet_media_ids": None},
+                )
+                tweet = await q.get_tweet_by_id(session, tweet_id)
+                assert tweet is not None
+                await q.like_tweet(session, tweet, author)
+                await q.like_tweet(session, tweet, other_user)
+                tweets_ids.append(tweet_id)
+    return tweets_ids
+
+
+# endpoint -> max number of queries, which must not depend on the amount of data
+@pytest.mark.parametrize(
+    "route, max_queries",
+    (
+        ("/api/tweets", 7),
+        ("/api/tweets?mode=chronological", 8),
+        ("/api/users/me", 4),
+        ("/api/users/{user_id}", 3),
+        ("/api/tweets/{tweet_id}/likes", 5),
+        ("/api/tweets/search?q=tweet", 7),
+        ("/api/hashtags/tag/tweets", 7),
+        ("/api/users/me/mentions", 7),
+        ("/api/users/{author_id}/tweets", 7),
+    ),
+)
+@pytest.mark.asyncio
+async def test_endpoint_query_count(
+    client: AsyncClient,
+    session_factory: async_sessionmaker,
+    user_data: Tuple[int, str],
+    feed_data: List[int],
+    route: str,
+    max_queries: int,
+) -> None:
+    """Testing that the endpoints make a fixed number of queries without N+1"""
+    user_id, api_key = user_data
+    async with session_factory() as session:
+        tweet = await q.get_tweet_by_id(session, feed_data[0])
+        assert tweet is not None
+    url: str = route.format(user_id=user_id, tweet_id=tweet.id, author_id=tweet.user_id)
+
+    with assert_max_queries(max_queries, max_repeats=1):
+        response = await client.get(url, headers={"api-key": api_key})
+    assert response.status_code == 200
@@ -0,0 +1,149 @@
+from functools import partial
+from typing import Any, Dict, List, Optional, Tuple
+
+import pytest
+from httpx import AsyncClient
+
+import src.database.queries as q
+
+BASE_ROUTE: str = "/api/tweets/search"
+
+
+async def _post_tweets(
+    client: AsyncClient, api_key: str, texts: List[str]
+) -> List[int]:
+    tweets_ids: List[int] = list()
+    for tweet_text in texts:
+        response = await client.post(
+            "/api/tweets", json={"tweet_data": tweet_text}, headers={"api-key": api_key}
+        )
+        assert response.status_code == 201
+        tweets_ids.append(response.json()["tweet_id"])
+    return tweets_ids
+
+
+@pytest.mark.asyncio
+async def test_search_tweets_ranked(
+    client: AsyncClient, user_data: Tuple[int, str]
+) -> None:
+    """Testing that the search finds the words in any form, the most relevant first"""
+    user_id, api_key = user_data
+    once, twice, _ = await _post_tweets(
+        client,
+        api_key,
+        [
+            "deploying the new release",
+            "deploy, deploy and deploy again",
+            "nothing to see here",
+        ],
+    )
+
+    response = await client.get(
+        BASE_ROUTE, params={"q": "deploy"}, headers={"api-key": api_key}
+    )
+    assert response.status_code == 200
+    response_json: Dict[str, Any] = response.json()
+    assert response_json["result"] is True
+    assert response_json["next_cursor"] is None
+    assert [tweet["id"] for tweet in response_json["tweets"]] == [twice, once]
+    assert response_json["tweets"][0]["content"] == "deploy, deploy and deploy again"
+    assert response_json["tweets"][0]["author"]["id"] == user_id
+
+
+@pytest.mark.asyncio
+async def test_search_tweets_pages(
+    client: AsyncClient, user_data: Tuple[int, str]
+) -> None:
+    """Testing listing the found tweets page by page, the ties in the order of ids"""
+    _, api_key = user_data
+    tweets_ids: List[int] = await _post_tweets(
+        client, api_key, [f"coffee number {num}" for num in range(5)]
+    )
+
+    found: List[int] = list()
+    cursor: Optional[str] = None
+    for page in range(4):
+        if page == 1:
+            # the tweets posted after the first page do not shift the pages
+            await _post_tweets(client, api_key, ["coffee again"])
+        params: Dict[str, Any] = {"q": "coffee", "limit": 2, "fields": "id"}
+        if cursor is not None:
+            params["cursor"] = cursor
+        response = await client.get(
+            BASE_ROUTE, params=params, headers={"api-key": api_key}
+        )
+        assert response.status_code == 200
+        found.extend(tweet["id"] for tweet in response.json()["tweets"])
+        cursor = response.json()["next_cursor"]
+        if cursor is None:
+            break
+
+    assert cursor is None
+    assert found == sorted(tweets_ids, reverse=True)
+
+
+@pytest.mark.parametrize("limit", (2, 3, 10))
+@pytest.mark.asyncio
+async def test_search_tweets_past_candidates(
+    client: AsyncClient,
+    user_data: Tuple[int, str],
+    monkeypatch: pytest.MonkeyPatch,
+    limit: int,
+) -> None:
+    """Testing that the pages go on with the older matches after the ranked ones"""
+    _, api_key = user_data
+    monkeypatch.setattr(q, "search_tweets", partial(q.search_tweets, candidates=2))
+    first, second, third, fourth, fifth = await _post_tweets(
+        client, api_key, ["tea", "tea, tea", "tea", "tea, tea", "tea"]
+    )
+
+    found: List[int] = list()
+    cursor: Optional[str] = None
+    for _ in range(5):
+        params: Dict[str, Any] = {"q": "tea", "limit": limit, "fields": "id"}
+        if cursor is not None:
+            params["cursor"] = cursor
+        response = await client.get(
+            BASE_ROUTE, params=params, headers={"api-key": api_key}
+        )
+        assert response.status_code == 200
+        found.extend(tweet["id"] for tweet in response.json()["tweets"])
+        cursor = response.json()["next_cursor"]
+        if cursor is None:
+            break
+
+    assert cursor is None
+    # every two newest matches are ranked together
+    assert found == [fourth, fifth, second, third, first]
+
+
+@pytest.mark.asyncio
+async def test_search_tweets_web_syntax(
+    client: AsyncClient, user_data: Tuple[int, str]
+) -> None:
+    """Testing the phrases and the excluded words of the query"""
+    _, api_key = user_data
+    coffee, _ = await _post_tweets(
+        client, api_key, ["morning coffee", "coffee in the morning rain"]
+    )
+
+    for query in ('"morning coffee"', "coffee -rain"):
+        response = await client.get(
+            BASE_ROUTE, params={"q": query}, headers={"api-key": api_key}
+        )
+        assert response.status_code == 200
+        assert [tweet["id"] for tweet in response.json()["tweets"]] == [coffee], query
+
+
+@pytest.mark.parametrize(
+    "params", ({"q": ""}, {"q": "x" * 257}, {"q": "coffee", "cursor": "invalid"})
+)
+@pytest.mark.asyncio
+async def test_search_tweets_with_invalid_params(
+    client: AsyncClient, user_data: Tuple[int, str], params: Dict[str, str]
+) -> None:
+    """Negative test of the search with an invalid query or cursor"""
+    _, api_key = user_data
+
+    response = await client.get(BASE_ROUTE, params=params, headers={"api-key": api_key})
+    assert response.status_code == 422
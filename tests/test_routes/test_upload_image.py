@@ -14,7 +14,7 @@ async def test_add_image(client: AsyncClient, user_data: tuple[int, str]) -> Non
     response = await client.post(
         BASE_ROUTE,
         files={
-            "image": ("test.jpg", open(TEST_IMAGE_PATH, "rb"), "multipart/form-data")
+            "file": ("test.jpg", open(TEST_IMAGE_PATH, "rb"), "multipart/form-data")
         },
         headers={"api-key": api_key},
     )
@@ -24,7 +24,7 @@ async def test_add_image(client: AsyncClient, user_data: tuple[int, str]) -> Non
     response = await client.post(
         BASE_ROUTE,
         files={
-            "image": ("test.jpg", open(TEST_IMAGE_PATH, "rb"), "multipart/form-data")
+            "file": ("test.jpg", open(TEST_IMAGE_PATH, "rb"), "multipart/form-data")
         },
         headers={"api-key": api_key},
     )
@@ -38,7 +38,7 @@ async def test_send_img_with_invalid_api_key(client: AsyncClient) -> None:
     response = await client.post(
         BASE_ROUTE,
         files={
-            "image": ("test.jpg", open(TEST_IMAGE_PATH, "rb"), "multipart/form-data")
+            "file": ("test.jpg", open(TEST_IMAGE_PATH, "rb"), "multipart/form-data")
         },
         headers={"api-key": "invalid_api_key"},
     )
@@ -52,7 +52,7 @@ async def test_large_image(client: AsyncClient, user_data: tuple[int, str]) -> N
     response = await client.post(
         BASE_ROUTE,
         files={
-            "image": (
+            "file": (
                 "large_image.png",
                 open(LARGE_IMAGE_PATH, "rb"),
                 "multipart/form-data",
@@ -72,7 +72,7 @@ async def test_file_with_wrong_format(
     response = await client.post(
         BASE_ROUTE,
         files={
-            "image": (
+            "file": (
                 "wrong_format.txt",
                 open(FILE_WITH_WRONG_FORMAT, "rb"),
                 "multipart/form-data",
@@ -0,0 +1,76 @@
+from typing import List, Tuple
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.database import queries as q
+from src.database.models import Hashtag, Mention, Tweet, TweetHashtag
+from src.service.backfill import ENTITIES_JOB, backfill_entities
+
+
+@pytest.mark.parametrize(
+    "tweet_data, hashtags, names",
+    (
+        ("plain text", [], []),
+        ("#One #one #TWO", ["one", "two"], []),
+        ("@bob and @alice, @bob", [], ["bob", "alice"]),
+        ("mail@example.com a#b #c#d ##e", ["c"], []),
+        ("#tag_1, (@user_2).", ["tag_1"], ["user_2"]),
+    ),
+)
+def test_extract_entities(tweet_data: str, hashtags: List[str], names: List[str]):
+    """Testing parsing of the hashtags and the mentions of the text"""
+    assert q.extract_entities(tweet_data) == (hashtags, names)
+
+
+async def _entities(session: AsyncSession) -> Tuple[List[tuple], List[tuple]]:
+    hashtags_q = await session.execute(
+        select(TweetHashtag.tweet_id, Hashtag.name)
+        .join(Hashtag)
+        .order_by(TweetHashtag.tweet_id, Hashtag.name)
+    )
+    mentions_q = await session.execute(
+        select(Mention.tweet_id, Mention.user_id).order_by(
+            Mention.tweet_id, Mention.user_id
+        )
+    )
+    return [tuple(row) for row in hashtags_q], [tuple(row) for row in mentions_q]
+
+
+@pytest.mark.asyncio
+async def test_backfill_entities(session_factory: async_sessionmaker) -> None:
+    """Testing that the job indexes the existing tweets by batches and resumes"""
+    async with session_factory() as session:
+        user = await q.create_user(session, {"api_key": "key", "name": "alice"})
+        # the tweets without the index, as before the migration
+        session.add_all(
+            [
+                Tweet(tweet_data=f"#tag{num % 3} hi @alice @bob", user_id=user.id)
+                for num in range(7)
+            ]
+        )
+        await session.commit()
+        tweets_ids: List[int] = list(await session.scalars(select(Tweet.id)))
+        assert await _entities(session) == ([], [])
+
+    assert await backfill_entities(session_factory, 2, max_batches=2) == 4
+    async with session_factory() as session:
+        assert await q.get_backfill_progress(session, ENTITIES_JOB) == tweets_ids[3]
+        hashtags, mentions = await _entities(session)
+        assert [tweet_id for tweet_id, _ in hashtags] == tweets_ids[:4]
+
+    # the job continues after the saved progress
+    assert await backfill_entities(session_factory, 2) == 3
+    assert await backfill_entities(session_factory, 2) == 0
+    async with session_factory() as session:
+        hashtags, mentions = await _entities(session)
+        assert hashtags == [
+            (tweet_id, f"tag{num % 3}") for num, tweet_id in enumerate(tweets_ids)
+        ]
+        assert mentions == [(tweet_id, user.id) for tweet_id in tweets_ids]
+
+    # the tweets indexed again keep the index unchanged
+    assert await backfill_entities(session_factory, 5, restart=True) == 7
+    async with session_factory() as session:
+        assert await _entities(session) == (hashtags, mentions)
@@ -0,0 +1,152 @@
+import json
+from io import StringIO
+from pathlib import Path
+from typing import Any, Dict, List
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from src.database import queries as q
+from src.database.models import Hashtag, Image, Tweet, TweetHashtag
+from src.service.bulk_import import import_job, import_tweets
+
+
+def _write_lines(path: Path, lines: List[Any]) -> None:
+    with open(path, "a", encoding="utf-8") as file:
+        for line in lines:
+            file.write((line if isinstance(line, str) else json.dumps(line)) + "\n")
+
+
+@pytest.mark.asyncio
+async def test_import_tweets(session_factory: async_sessionmaker, tmp_path: Path):
+    """Testing the import of the valid lines by batches and the rejected lines"""
+    async with session_factory() as session:
+        user = await q.create_user(session, {"api_key": "author", "name": "author"})
+        images_ids: List[int] = [await q.add_image(session) for _ in range(3)]
+        attached_tweet: int = await q.create_tweet(
+            session,
+            user.id,
+            {"tweet_data": "attached", "tweet_media_ids": [images_ids[2]]},
+        )
+    path: Path = tmp_path / "tweets.jsonl"
+    _write_lines(
+        path,
+        [
+            {"api_key": "author", "tweet_data": "first #Import"},
+            {
+                "api_key": "author",
+                "tweet_data": "with images",
+                "tweet_media_ids": images_ids[:2],
+                "created_at": "2024-01-01T12:00:00+00:00",
+            },
+            "",
+            {"api_key": "unknown", "tweet_data": "unknown author"},
+            "not json",
+            {"api_key": "author"},
+            # the images are attached already
+            {
+                "api_key": "author",
+                "tweet_data": "taken",
+                "tweet_media_ids": [images_ids[0], images_ids[2]],
+            },
+            {"api_key": "author", "tweet_data": "last #import"},
+        ],
+    )
+    rejects = StringIO()
+
+    stats = await import_tweets(session_factory, str(path), 2, rejects_file=rejects)
+    assert (stats.lines, stats.imported) == (7, 3)
+    assert stats.rejected == {"unknown_user": 1, "invalid": 2, "invalid_media": 1}
+    assert [json.loads(line) for line in rejects.getvalue().splitlines()] == [
+        {"line": 4, "reason": "unknown_user"},
+        {"line": 5, "reason": "invalid"},
+        {"line": 6, "reason": "invalid"},
+        {"line": 7, "reason": "invalid_media"},
+    ]
+
+    async with session_factory() as session:
+        tweets: Dict[str, Tweet] = {
+            tweet.tweet_data: tweet
+            for tweet in await session.scalars(
+                select(Tweet).where(Tweet.id != attached_tweet)
+            )
+        }
+        assert list(tweets) == ["first #Import", "with images", "last #import"]
+        assert {tweet.user_id for tweet in tweets.values()} == {user.id}
+        assert tweets["with images"].created_at.year == 2024
+        images_q = await session.execute(
+            select(Image.tweet_id).where(Image.id.in_(images_ids[:2]))
+        )
+        assert set(images_q.scalars()) == {tweets["with images"].id}
+        hashtags_q = await session.execute(
+            select(TweetHashtag.tweet_id).join(Hashtag).where(Hashtag.name == "import")
+        )
+        assert set(hashtags_q.scalars()) == {
+            tweets["first #Import"].id,
+            tweets["last #import"].id,
+        }
+        assert await q.get_backfill_progress(session, import_job(str(path))) == 8
+        # the next tweets get the next ids
+        new_tweet_id: int = await q.create_tweet(
+            session, user.id, {"tweet_data": "new", "tweet_media_ids": None}
+        )
+        assert new_tweet_id > max(tweet.id for tweet in tweets.values())
+
+
+@pytest.mark.asyncio
+async def test_import_tweets_resumes(
+    session_factory: async_sessionmaker, tmp_path: Path
+):
+    """Testing that the import continues after the last imported line"""
+    async with session_factory() as session:
+        await q.create_user(session, {"api_key": "author", "name": "author"})
+    path: Path = tmp_path / "tweets.jsonl"
+    _write_lines(path, [{"api_key": "author", "tweet_data": "first"}])
+    assert (await import_tweets(session_factory, str(path))).imported == 1
+
+    _write_lines(path, [{"api_key": "author", "tweet_data": "second"}])
+    stats = await import_tweets(session_factory, str(path))
+    assert (stats.lines, stats.imported) == (1, 1)
+    assert (await import_tweets(session_factory, str(path))).lines == 0
+
+    async with session_factory() as session:
+        texts = list(await session.scalars(select(Tweet.tweet_data).order_by(Tweet.id)))
+    assert texts == ["first", "second"]
+
+
+@pytest.mark.asyncio
+async def test_import_tweets_rejected_by_database(
+    session_factory: async_sessionmaker, tmp_path: Path
+):
+    """Testing that the tweets, which the database rejects, do not stop the import"""
+    async with session_factory() as session:
+        await q.create_user(session, {"api_key": "author", "name": "author"})
+    path: Path = tmp_path / "tweets.jsonl"
+    _write_lines(
+        path,
+        [
+            {"api_key": "author", "tweet_data": "before #nul"},
+            # valid JSON and a valid tweet, but Postgres does not store NUL in text
+            {"api_key": "author", "tweet_data": "with \u0000 nul"},
+            {"api_key": "author", "tweet_data": "after #nul"},
+        ],
+    )
+    rejects = StringIO()
+
+    stats = await import_tweets(session_factory, str(path), 10, rejects_file=rejects)
+    assert (stats.lines, stats.imported) == (3, 2)
+    assert stats.rejected == {"rejected_by_database": 1}
+    assert [json.loads(line) for line in rejects.getvalue().splitlines()] == [
+        {"line": 2, "reason": "rejected_by_database"}
+    ]
+    # the progress is saved, so the import does not fail on the line again
+    assert (await import_tweets(session_factory, str(path))).lines == 0
+
+    async with session_factory() as session:
+        texts = list(await session.scalars(select(Tweet.tweet_data).order_by(Tweet.id)))
+        hashtags_q = await session.execute(
+            select(TweetHashtag.tweet_id).join(Hashtag).where(Hashtag.name == "nul")
+        )
+        assert len(list(hashtags_q.scalars())) == 2
+    assert texts == ["before #nul", "after #nul"]
@@ -0,0 +1,33 @@
+from datetime import datetime, timedelta
+from typing import List, Tuple
+
+from src.service.feed import merge_streams
+
+NOW: datetime = datetime(2026, 1, 1)
+
+
+def _stream(*minutes_ago: int) -> List[Tuple[datetime, int]]:
+    """The function creates a sorted stream of (created_at, tweet_id)"""
+    return [(NOW - timedelta(minutes=minutes), minutes) for minutes in minutes_ago]
+
+
+def test_merge_streams() -> None:
+    """Testing k-way merge of several authors' streams"""
+    streams = [_stream(1, 5, 9), _stream(2, 3), _stream(4, 6, 7, 8)]
+
+    merged = merge_streams(streams, limit=100)
+    assert [tweet_id for _, tweet_id in merged] == [1, 2, 3, 4, 5, 6, 7, 8, 9]
+
+
+def test_merge_streams_stops_after_limit() -> None:
+    """Testing that the merge returns only the page"""
+    streams = [_stream(1, 5, 9), _stream(2, 3), _stream(4, 6, 7, 8)]
+
+    merged = merge_streams(streams, limit=4)
+    assert [tweet_id for _, tweet_id in merged] == [1, 2, 3, 4]
+
+
+def test_merge_empty_streams() -> None:
+    """Testing the merge of a user without authors or tweets"""
+    assert merge_streams([], limit=10) == []
+    assert merge_streams([[], []], limit=10) == []
@@ -1,8 +1,10 @@
 import asyncio
+from collections import OrderedDict
 from typing import List, Optional
 
 import pytest
 
+from src.service import images
 from src.service.func import get_image_name_by_id
 from src.service.images import _file_extension, delete_images_by_ids
 
@@ -109,3 +111,40 @@ async def test_delete_images_by_ids_with_not_existing_images(
     except Exception as exc:
         print(exc)
         pytest.fail()
+
+
+@pytest.mark.asyncio
+async def test_get_images_names_caches_missing_files(
+    images_ids: List[int], monkeypatch
+) -> None:
+    """Testing that the ids without files are looked up once"""
+    monkeypatch.setattr(images, "_images_names", OrderedDict())
+    missing_id: int = max(images_ids) + 1
+    lookups: List[int] = list()
+    find_image_name = images._find_image_name
+
+    async def _find_image_name(image_id: int) -> Optional[str]:
+        lookups.append(image_id)
+        return await find_image_name(image_id)
+
+    monkeypatch.setattr(images, "_find_image_name", _find_image_name)
+    for _ in range(2):
+        images_names = await images.get_images_names([*images_ids, missing_id])
+        assert images_names == {image_id: f"{image_id}.jpg" for image_id in images_ids}
+    assert sorted(lookups) == sorted([*images_ids, missing_id])
+
+
+@pytest.mark.asyncio
+async def test_get_images_names_cache_is_bounded(
+    images_ids: List[int], monkeypatch
+) -> None:
+    """Testing that the least recently used names are evicted"""
+    monkeypatch.setattr(images, "_images_names", OrderedDict())
+    monkeypatch.setattr(images, "IMAGES_NAMES_CACHE_SIZE", 2)
+    for image_id in images_ids:
+        await images.get_images_names([image_id])
+    assert list(images._images_names) == images_ids[-2:]
+    # the evicted name is looked up again
+    assert await images.get_images_names(images_ids[:1]) == {
+        images_ids[0]: f"{images_ids[0]}.jpg"
+    }
@@ -0,0 +1,43 @@
+from collections import OrderedDict
+from typing import List
+
+import pytest
+
+from src.service import images
+from src.service.metrics import REGISTRY
+
+
+def _sample(name: str, **labels: str) -> float:
+    """The function returns the current value of the metric"""
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+@pytest.mark.asyncio
+async def test_image_names_cache_metrics(images_ids: List[int], monkeypatch) -> None:
+    """Testing that the hits and the misses of the image names cache are counted"""
+    monkeypatch.setattr(images, "_images_names", OrderedDict())
+    hits: float = _sample("image_names_cache_lookups_total", result="hit")
+    misses: float = _sample("image_names_cache_lookups_total", result="miss")
+
+    await images.get_images_names(images_ids)
+    await images.get_images_names(images_ids)
+
+    assert _sample("image_names_cache_lookups_total", result="miss") == misses + len(
+        images_ids
+    )
+    assert _sample("image_names_cache_lookups_total", result="hit") == hits + len(
+        images_ids
+    )
+
+
+@pytest.mark.asyncio
+async def test_upload_and_deletion_metrics(images_ids: List[int]) -> None:
+    """Testing that the uploaded bytes and the deleted images are counted"""
+    assert _sample("image_upload_bytes_total") > 0
+    deleted: float = _sample("images_deleted_total")
+
+    await images.delete_images_by_ids(images_ids)
+    # the files are already removed
+    await images.delete_images_by_ids(images_ids)
+
+    assert _sample("images_deleted_total") == deleted + len(images_ids)
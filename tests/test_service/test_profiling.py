@@ -0,0 +1,108 @@
+import os
+from typing import AsyncGenerator, Callable, Tuple
+
+import orjson
+import pytest
+import pytest_asyncio
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from src.config.config import Profiling
+from src.service.profiling import ProfilingMiddleware
+
+
+@pytest_asyncio.fixture(scope="function")
+async def profiled_client(
+    test_app: FastAPI,
+) -> AsyncGenerator[Callable[..., AsyncClient], None]:
+    """Fixture. Returns a factory of clients of the app with the profiling"""
+    clients = list()
+
+    def make_client(profiling: Profiling, debug: bool = False) -> AsyncClient:
+        app = ProfilingMiddleware(test_app, profiling=profiling, debug=debug)
+        client = AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://localhost:8000"
+        )
+        clients.append(client)
+        return client
+
+    yield make_client
+    for client in clients:
+        await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_profile_on_demand(
+    profiled_client: Callable[..., AsyncClient], user_data: Tuple[int, str]
+) -> None:
+    """Testing that the profile is returned instead of the response"""
+    _, api_key = user_data
+    client = profiled_client(Profiling(token="secret"))
+
+    response = await client.get(
+        "/api/tweets",
+        params={"profile": "speedscope"},
+        headers={"api-key": api_key, "x-profile-token": "secret"},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert "speedscope" in orjson.loads(response.content)["$schema"]
+
+    response = await client.get(
+        "/api/tweets",
+        headers={"api-key": api_key, "x-profile-token": "secret", "x-profile": "html"},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/html")
+
+
+@pytest.mark.asyncio
+async def test_profile_is_not_allowed(
+    profiled_client: Callable[..., AsyncClient], user_data: Tuple[int, str]
+) -> None:
+    """Testing that the profile flag is ignored without the token"""
+    _, api_key = user_data
+    for client, token in (
+        (profiled_client(Profiling()), "secret"),
+        (profiled_client(Profiling(token="secret")), "wrong"),
+    ):
+        response = await client.get(
+            "/api/tweets",
+            params={"profile": "html"},
+            headers={"api-key": api_key, "x-profile-token": token},
+        )
+        assert response.status_code == 200
+        assert response.json()["result"] is True
+
+    # in the debug mode the token is not needed
+    client = profiled_client(Profiling(), debug=True)
+    response = await client.get(
+        "/api/tweets", params={"profile": "html"}, headers={"api-key": api_key}
+    )
+    assert response.headers["content-type"].startswith("text/html")
+
+
+@pytest.mark.asyncio
+async def test_sampled_profiles_rotation(
+    profiled_client: Callable[..., AsyncClient], user_data: Tuple[int, str], tmp_path
+) -> None:
+    """Testing that every n-th request is profiled and the oldest are removed"""
+    _, api_key = user_data
+    client = profiled_client(
+        Profiling(sample_every=2, directory=str(tmp_path), max_files=2)
+    )
+
+    for _ in range(4):
+        response = await client.get("/api/tweets", headers={"api-key": api_key})
+        assert response.status_code == 200
+        assert response.json()["result"] is True
+    first = sorted(os.listdir(tmp_path))
+    assert len(first) == 2
+    assert all(name.endswith("_GET_api_tweets.speedscope.json") for name in first)
+
+    for _ in range(2):
+        await client.get("/api/users/me", headers={"api-key": api_key})
+    profiles = sorted(os.listdir(tmp_path))
+    assert len(profiles) == 2
+    assert profiles[0] == first[1]
+    assert profiles[1].endswith("_GET_api_users_me.speedscope.json")
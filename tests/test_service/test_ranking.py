@@ -0,0 +1,124 @@
+from typing import List
+
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+import src.database.queries as q
+from src.database.models import BackfillProgress, Following, ScoreRefresh, Tweet
+
+
+@pytest.mark.asyncio
+async def test_old_popular_tweet_sinks(session_factory: async_sessionmaker) -> None:
+    """Testing that the score of a tweet decays with its age"""
+    async with session_factory() as session:
+        users = [
+            await q.create_user(session, {"api_key": f"key_{num}", "name": "test"})
+            for num in range(4)
+        ]
+        reader, author = users[0], users[1]
+        session.add(Following(follower_id=reader.id, author_id=author.id))
+        old_tweet, new_tweet = Tweet(tweet_data="old"), Tweet(tweet_data="new")
+        for tweet in (old_tweet, new_tweet):
+            tweet.user_id = author.id
+            session.add(tweet)
+        await session.commit()
+
+        # the old tweet has more likes
+        for user in users[1:]:
+            await q.like_tweet(session, old_tweet, user)
+        await q.like_tweet(session, new_tweet, users[1])
+        feed: List[Tweet] = await q.get_popular_feed(session, reader.id, 10)
+        assert [tweet.id for tweet in feed] == [old_tweet.id, new_tweet.id]
+
+        # but it was posted two days ago
+        await session.execute(
+            text(
+                "UPDATE tweets SET created_at = now() - interval '2 days'"
+                " WHERE id = :id"
+            ),
+            {"id": old_tweet.id},
+        )
+        assert await q.refresh_scores(session) == 2
+        feed = await q.get_popular_feed(session, reader.id, 10)
+        assert [tweet.id for tweet in feed] == [new_tweet.id, old_tweet.id]
+        assert feed[1].likes_count == 3
+
+
+@pytest.mark.asyncio
+async def test_unlike_decreases_likes_count(
+    session_factory: async_sessionmaker,
+) -> None:
+    """Testing that likes_count follows likes and unlikes"""
+    async with session_factory() as session:
+        user = await q.create_user(session, {"api_key": "key", "name": "test"})
+        tweet_id: int = await q.create_tweet(
+            session, user.id, {"tweet_data": "tweet", "tweet_media_ids": None}
+        )
+        tweet = await q.get_tweet_by_id(session, tweet_id)
+        assert tweet is not None
+
+        await q.like_tweet(session, tweet, user)
+        await q.unlike_tweet(session, tweet, user)
+        tweet = await q.get_tweet_by_id(session, tweet_id)
+        assert tweet is not None
+        assert tweet.likes_count == 0
+        assert tweet.score == 0
+        assert await session.scalar(text("SELECT count(*) FROM likes")) == 0
+
+
+@pytest.mark.asyncio
+async def test_refresh_scores_once_per_interval(
+    session_factory: async_sessionmaker,
+) -> None:
+    """Testing that the scores are not refreshed again by another worker"""
+    async with session_factory() as session:
+        user = await q.create_user(session, {"api_key": "key", "name": "test"})
+        tweet_id: int = await q.create_tweet(
+            session, user.id, {"tweet_data": "tweet", "tweet_media_ids": None}
+        )
+        tweet = await q.get_tweet_by_id(session, tweet_id)
+        assert tweet is not None
+        await q.like_tweet(session, tweet, user)
+
+        assert await q.refresh_scores(session, min_interval=60) == 1
+        # the refresh of another worker during the interval is skipped
+        assert await q.refresh_scores(session, min_interval=60) == 0
+        assert await q.refresh_scores(session, min_interval=0) == 1
+
+        # the refresh keeps its own state, not the progress of a backfill
+        refresh = await session.scalar(select(ScoreRefresh))
+        assert refresh is not None
+        assert (refresh.id, refresh.refreshed_tweets) == (q.SCORE_REFRESH_ID, 1)
+        assert await session.scalar(select(BackfillProgress)) is None
+
+
+@pytest.mark.asyncio
+async def test_refresh_scores_of_recent_tweets(
+    session_factory: async_sessionmaker,
+) -> None:
+    """Testing that the old tweets keep their scores"""
+    async with session_factory() as session:
+        user = await q.create_user(session, {"api_key": "key", "name": "test"})
+        tweets_ids: List[int] = [
+            await q.create_tweet(
+                session, user.id, {"tweet_data": text, "tweet_media_ids": None}
+            )
+            for text in ("old", "new")
+        ]
+        for tweet_id in tweets_ids:
+            tweet = await q.get_tweet_by_id(session, tweet_id)
+            assert tweet is not None
+            await q.like_tweet(session, tweet, user)
+        await session.execute(
+            text(
+                "UPDATE tweets SET created_at = now() - interval '10 days'"
+                " WHERE id = :id"
+            ),
+            {"id": tweets_ids[0]},
+        )
+        scores_q = text("SELECT score FROM tweets WHERE id = :id")
+        old_score = await session.scalar(scores_q, {"id": tweets_ids[0]})
+
+        assert await q.refresh_scores(session, max_age=7 * 24) == 1
+        assert await session.scalar(scores_q, {"id": tweets_ids[0]}) == old_score
@@ -0,0 +1,234 @@
+import time
+from types import SimpleNamespace
+from typing import Any, List, Optional
+
+import httpx
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from starlette.datastructures import State
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+
+from src.api.routes import create_app
+from src.config.config import DB, Config
+from src.database import queries as q
+from src.database.engine import Database
+from src.service import web
+
+WINDOW: float = 5.0
+DB_CONFIG: DB = DB(url="postgresql://primary", read_your_writes_window=WINDOW)
+
+
+def _request(
+    method: str,
+    path: str,
+    api_key: Optional[str] = None,
+    app: Any = None,
+    cookie: Optional[str] = None,
+) -> Request:
+    """The function creates a request object, the app only has the state"""
+    headers = [(b"api-key", api_key.encode())] if api_key else []
+    if cookie:
+        headers.append((b"cookie", f"{web.LAST_WRITE_COOKIE}={cookie}".encode()))
+    return Request(
+        {
+            "type": "http",
+            "method": method,
+            "path": path,
+            "headers": headers,
+            "app": app,
+        }
+    )
+
+
+@pytest.mark.parametrize(
+    "method, path, result",
+    (
+        ("GET", "/api/tweets", True),
+        ("GET", "/api/users/me", True),
+        ("GET", "/api/users/1", True),
+        ("POST", "/api/tweets", False),
+        ("POST", "/api/users/1/follow", False),
+        ("DELETE", "/api/tweets/1/likes", False),
+        ("GET", "/docs", False),
+    ),
+)
+def test_use_replica_for_read_only_routes(method: str, path: str, result: bool) -> None:
+    """Testing that only read-only endpoints go to the replica"""
+    assert web.use_replica(_request(method, path, "test_api_key"), DB_CONFIG) is result
+
+
+def test_read_your_writes() -> None:
+    """Testing that the user's reads go to the primary right after their mutation"""
+    cookie: str = web.last_write_cookie(DB_CONFIG, "test_api_key", time.time())
+
+    request: Request = _request("GET", "/api/tweets", "test_api_key", cookie=cookie)
+    assert web.use_replica(request, DB_CONFIG) is False
+    # other users still read from the replica
+    assert web.use_replica(
+        _request("GET", "/api/tweets", "other_test_api_key"), DB_CONFIG
+    )
+
+
+@pytest.mark.parametrize(
+    "api_key, offset, forged",
+    (
+        # the window has expired
+        ("test_api_key", -10.0, False),
+        # the cookie of another user
+        ("other_test_api_key", 0.0, False),
+        # the forged time
+        ("test_api_key", 3600.0, True),
+    ),
+)
+def test_read_your_writes_invalid_cookie(
+    api_key: str, offset: float, forged: bool
+) -> None:
+    """Testing that reads go to the replica after the window or with a bad cookie"""
+    # the time is taken here, so the ids of the tests do not depend on it
+    value: str = web.last_write_cookie(
+        DB_CONFIG, "test_api_key", time.time() + (0.0 if forged else offset)
+    )
+    if forged:
+        value = f"{time.time() + offset:.3f}." + value.rpartition(".")[2]
+
+    request: Request = _request("GET", "/api/tweets", api_key, cookie=value)
+    assert web.use_replica(request, DB_CONFIG) is True
+
+
+@pytest.mark.asyncio
+async def test_read_your_writes_across_workers() -> None:
+    """
+    Testing that the mutation served by one worker sends the next read
+    to the primary in another worker: the state comes with the client
+    """
+
+    async def endpoint(scope: Any, receive: Any, send: Any) -> None:
+        await PlainTextResponse("ok")(scope, receive, send)
+
+    # the worker, which serves the mutation
+    worker = web.ReadYourWritesMiddleware(endpoint, db=DB_CONFIG)
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=worker), base_url="http://test"
+    ) as client:
+        response = await client.post("/api/tweets", headers={"api-key": "test_api_key"})
+    cookie: Optional[str] = response.cookies.get(web.LAST_WRITE_COOKIE)
+    assert cookie
+
+    # another worker with its own copy of the config
+    other_worker_db = DB(url=DB_CONFIG.url, read_your_writes_window=WINDOW)
+    request: Request = _request("GET", "/api/tweets", "test_api_key", cookie=cookie)
+    assert web.use_replica(request, other_worker_db) is False
+    # the workers without the same key do not trust the cookie
+    other_secret = DB(url=DB_CONFIG.url, read_your_writes_secret="other")
+    assert web.use_replica(request, other_secret) is True
+
+
+@pytest.mark.parametrize("method, status", (("GET", 200), ("POST", 403)))
+@pytest.mark.asyncio
+async def test_read_your_writes_cookie_only_after_mutation(
+    method: str, status: int
+) -> None:
+    """Testing that reads and failed mutations do not set the cookie"""
+
+    async def endpoint(scope: Any, receive: Any, send: Any) -> None:
+        await PlainTextResponse("", status_code=status)(scope, receive, send)
+
+    worker = web.ReadYourWritesMiddleware(endpoint, db=DB_CONFIG)
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=worker), base_url="http://test"
+    ) as client:
+        response = await client.request(
+            method, "/api/tweets", headers={"api-key": "test_api_key"}
+        )
+    assert web.LAST_WRITE_COOKIE not in response.cookies
+
+
+@pytest.mark.asyncio
+async def test_get_session_binds_replica(engine: AsyncEngine) -> None:
+    """Testing that get_session gives the replica session to read-only routes"""
+    config = Config(db=DB_CONFIG, env="test")
+    database = Database(engine)
+    replica_sessions: List[AsyncSession] = list()
+
+    def replica_session() -> AsyncSession:
+        session = AsyncSession(bind=engine)
+        replica_sessions.append(session)
+        return session
+
+    database.ReplicaSession = replica_session  # type: ignore[assignment]
+    app = SimpleNamespace(state=State({"config": config, "database": database}))
+
+    # read-only route
+    request: Request = _request("GET", "/api/users/me", "test_api_key", app)
+    async for _ in web.get_session(request):
+        assert request.state.session is replica_sessions[0]
+    # mutation
+    request = _request("POST", "/api/tweets", "test_api_key", app)
+    async for _ in web.get_session(request):
+        assert request.state.session not in replica_sessions
+    # the same user reads their own writes from the primary
+    cookie: str = web.last_write_cookie(DB_CONFIG, "test_api_key", time.time())
+    request = _request("GET", "/api/tweets", "test_api_key", app, cookie)
+    async for _ in web.get_session(request):
+        assert request.state.session not in replica_sessions
+    assert len(replica_sessions) == 1
+
+
+@pytest.mark.asyncio
+async def test_replica_serves_reads_until_write(engine: AsyncEngine) -> None:
+    """
+    Testing with two distinct engines that GET /api/tweets is served by the replica,
+    and by the primary right after the user's mutation
+    """
+    async with AsyncSession(engine) as session:
+        await q.create_user(session, {"api_key": "test_api_key", "name": "test"})
+    # the replica is a separate engine (pool) of the same test database
+    replica_engine: AsyncEngine = create_async_engine(engine.url)
+    served_by: List[str] = list()
+
+    def spy(name: str):
+        def before_cursor_execute(*args: Any) -> None:
+            served_by.append(name)
+
+        return before_cursor_execute
+
+    primary_spy, replica_spy = spy("primary"), spy("replica")
+    event.listen(engine.sync_engine, "before_cursor_execute", primary_spy)
+    event.listen(replica_engine.sync_engine, "before_cursor_execute", replica_spy)
+    config = Config(
+        db=DB(url=str(engine.url), read_your_writes_window=WINDOW), env="test"
+    )
+    app = create_app(config, Database(engine, replica_engine))
+    try:
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://localhost:8000"
+        ) as client:
+            headers = {"api-key": "test_api_key"}
+
+            response = await client.get("/api/tweets", headers=headers)
+            assert response.status_code == 200
+            assert served_by and set(served_by) == {"replica"}
+
+            served_by.clear()
+            response = await client.post(
+                "/api/tweets", headers=headers, json={"tweet_data": "tweet"}
+            )
+            assert response.status_code == 201
+            assert served_by and set(served_by) == {"primary"}
+            cookie: Optional[str] = response.cookies.get(web.LAST_WRITE_COOKIE)
+            assert cookie
+
+            # the user reads their own write from the primary
+            served_by.clear()
+            response = await client.get(
+                "/api/tweets",
+                headers={**headers, "cookie": f"{web.LAST_WRITE_COOKIE}={cookie}"},
+            )
+            assert response.status_code == 200
+            assert served_by and set(served_by) == {"primary"}
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", primary_spy)
+        event.remove(replica_engine.sync_engine, "before_cursor_execute", replica_spy)
+        await replica_engine.dispose()
@@ -0,0 +1,52 @@
+import json
+
+import msgpack
+import pytest
+from starlette.requests import Request
+
+from src.schemas.schemas import ErrorSchema
+from src.service.responses import FastJSONResponse, MsgPackResponse, accepts_msgpack
+
+
+def test_render_pydantic_model() -> None:
+    """Testing that a pydantic model is rendered as its JSON"""
+    content = ErrorSchema(error_type="HTTPException", error_message="Not found")
+    response = FastJSONResponse(content, status_code=404)
+
+    assert response.headers["content-type"] == "application/json"
+    assert json.loads(response.body) == content.model_dump(mode="json")
+
+
+def test_render_dict() -> None:
+    """Testing that a plain dict is rendered by orjson"""
+    content = {"result": True, "tweets": [{"id": 1, "content": "текст"}]}
+
+    assert json.loads(FastJSONResponse(content).body) == content
+
+
+@pytest.mark.parametrize(
+    "accept, result",
+    (
+        ("", False),
+        ("application/json", False),
+        ("*/*", False),
+        ("application/msgpack", True),
+        ("application/json;q=0.9, application/msgpack", True),
+        ("application/msgpack; q=0.5", True),
+        ("application/msgpack;q=0", False),
+        ("application/msgpack;q=0.0", False),
+    ),
+)
+def test_accepts_msgpack(accept: str, result: bool) -> None:
+    """Testing the negotiation of the MessagePack format"""
+    request = Request({"type": "http", "headers": [(b"accept", accept.encode())]})
+    assert accepts_msgpack(request) is result
+
+
+def test_render_msgpack() -> None:
+    """Testing that a pydantic model is rendered as MessagePack"""
+    content = ErrorSchema(error_type="HTTPException", error_message="Not found")
+    response = MsgPackResponse(content)
+
+    assert response.headers["content-type"] == "application/msgpack"
+    assert msgpack.unpackb(response.body) == content.model_dump()
@@ -0,0 +1,80 @@
+from typing import Any, Dict, List
+
+from src.database.models import Image, Tweet, User
+from src.schemas.schemas import FullTweetSchema
+from src.service.serializers import Likers, serialize_tweets, serialize_user
+
+
+def _tweet(tweet_id: int, num_images: int, num_likes: int) -> Tweet:
+    """The function creates a tweet with its relationships without the database"""
+    author = User(id=1, name="author", api_key="author_api_key")
+    return Tweet(
+        id=tweet_id,
+        tweet_data=f"tweet {tweet_id}",
+        user_id=author.id,
+        user=author,
+        likes_count=num_likes,
+        images=[Image(id=tweet_id * 10 + num) for num in range(num_images)],
+        users_like=[
+            User(id=num + 2, name=f"user {num}", api_key=f"api_key_{num}")
+            for num in range(num_likes)
+        ],
+    )
+
+
+def _likers(tweets: List[Tweet]) -> Likers:
+    """The function returns the likers of the tweets like get_top_likers"""
+    return {
+        tweet.id: [(user.id, user.name) for user in tweet.users_like or ()]
+        for tweet in tweets
+    }
+
+
+def test_serialize_tweets_matches_schema() -> None:
+    """Testing that the serialized tweets do not change after validation"""
+    tweets: List[Tweet] = [_tweet(1, 2, 3), _tweet(2, 0, 0)]
+    images_names: Dict[int, str] = {10: "10.jpg", 11: "11.png"}
+
+    result: List[Dict[str, Any]] = serialize_tweets(
+        tweets, images_names, _likers(tweets)
+    )
+    for tweet_json in result:
+        assert FullTweetSchema.model_validate(tweet_json).model_dump() == tweet_json
+    assert result[0]["attachments"] == [
+        "client/static/images/10.jpg",
+        "client/static/images/11.png",
+    ]
+    assert [like["user_id"] for like in result[0]["likes"]] == [2, 3, 4]
+    assert result[1]["attachments"] == []
+    assert result[1]["likes"] == []
+
+
+def test_serialize_tweets_hides_api_key() -> None:
+    """Testing that the api_keys of the author and the likers are not serialized"""
+    tweets: List[Tweet] = [_tweet(1, 0, 2)]
+    result: List[Dict[str, Any]] = serialize_tweets(tweets, dict(), _likers(tweets))
+    assert "api_key" not in str(result)
+
+
+def test_serialize_tweets_fields() -> None:
+    """Testing that only the requested fields are serialized"""
+    result: List[Dict[str, Any]] = serialize_tweets(
+        [_tweet(1, 2, 3)], dict(), dict(), {"id", "likes_count", "author"}
+    )
+    assert result == [
+        {"id": 1, "author": {"id": 1, "name": "author"}, "likes_count": 3}
+    ]
+
+
+def test_serialize_user_fields() -> None:
+    """Testing that the user is serialized without api_keys and with the fields"""
+    follower = User(id=2, name="follower", api_key="follower_api_key")
+    user = User(id=1, name="user", api_key="api_key", followers=[follower], authors=[])
+
+    assert serialize_user(user) == {
+        "id": 1,
+        "name": "user",
+        "followers": [{"id": 2, "name": "follower"}],
+        "following": [],
+    }
+    assert serialize_user(user, {"id", "following"}) == {"id": 1, "following": []}
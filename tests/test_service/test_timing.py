@@ -0,0 +1,46 @@
+import logging
+import re
+from typing import Dict, Tuple
+
+import pytest
+from httpx import AsyncClient
+
+from src.service import timing
+
+
+def test_add_timing_outside_request() -> None:
+    """Testing that the timings are ignored outside a request"""
+    with timing.measure("db"):
+        pass
+    assert timing._timings.get() is None
+
+
+def test_format_server_timing() -> None:
+    """Testing the value of the Server-Timing header"""
+    timings: Dict[str, float] = {"db": 0.00125, "total": 0.0035}
+    assert timing.format_server_timing(timings) == "db;dur=1.25, total;dur=3.50"
+
+
+@pytest.mark.asyncio
+async def test_server_timing_header(
+    client: AsyncClient, user_data: Tuple[int, str], caplog
+) -> None:
+    """Testing that the request is timed in the header and in the log"""
+    _, api_key = user_data
+
+    with caplog.at_level(logging.INFO, logger="routes_logger.timing"):
+        response = await client.get("/api/tweets", headers={"api-key": api_key})
+    assert response.status_code == 200
+
+    header: str = response.headers["server-timing"]
+    names = re.findall(r"(\w+);dur=\d+\.\d+", header)
+    assert set(names) == {"auth", "db", "serialization", "total"}
+
+    record = next(
+        record for record in caplog.records if record.name == "routes_logger.timing"
+    )
+    assert record.route == "/api/tweets"
+    assert record.status == 200
+    assert record.total_ms >= record.db_ms > 0
+    assert record.db_statements > 0
+    assert record.db_rows > 0